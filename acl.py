@@ -0,0 +1,196 @@
+import bisect
+import collections
+import hashlib
+import logging
+from typing import Union
+
+import fmc_api
+import journal
+import settings
+
+ACTIONS = {'permit': 'ALLOW', 'deny': 'BLOCK'}
+ZONE_FIELDS = ('sourceZones', 'destinationZones')
+FIELDS = ZONE_FIELDS + ('sourceNetworks', 'destinationNetworks', 'sourcePorts', 'destinationPorts')
+# the index namespace the objects of each field are looked up in
+FIELD_NAMESPACES = {
+    'sourceZones': 'zone',
+    'destinationZones': 'zone',
+    'sourceNetworks': 'network',
+    'destinationNetworks': 'network',
+    'sourcePorts': 'port',
+    'destinationPorts': 'port',
+}
+LITERAL_KEYS = ('type', 'value', 'protocol', 'port', 'icmpType', 'code')
+# rule attributes that are changed in place, everything else is the rule's identity
+ATTRIBUTES = ('name', 'enabled', 'logBegin', 'logEnd', 'sendEventsToFMC')
+# ownership namespace of the rules this tool created: rule id -> policy id
+OWNED_RULES = 'access_rule'
+
+
+def rule_key(access_rule: dict) -> str:
+    # what the rule matches and does, the same for a rule built here and its copy read back from FMC
+    parts = [access_rule['action']]
+    for field in FIELDS:
+        value = access_rule.get(field) or {}
+        parts.append(field)
+        parts += sorted(ref['name'] for ref in value.get('objects', []))
+        parts += sorted(','.join(f'{key}={literal[key]}' for key in LITERAL_KEYS if key in literal)
+                        for literal in value.get('literals', []))
+    return hashlib.sha1('\n'.join(parts).encode()).hexdigest()
+
+
+def to_access_rule(rule: dict, index: fmc_api.ObjectIndex, failed=()) -> Union[None, dict]:
+    access_rule = {
+        'action': ACTIONS[rule['action']],
+        'enabled': rule['enabled'],
+        'logBegin': False,
+        'logEnd': rule['log'],
+        'sendEventsToFMC': rule['log'],
+    }
+    if rule.get('remarks'):
+        access_rule['newComments'] = rule['remarks']
+    for field in FIELDS:
+        objects = []
+        for ref in rule[field]['objects']:
+            entry = index.get(FIELD_NAMESPACES[field], ref['name'])
+            if entry is None or (FIELD_NAMESPACES[field], ref['name']) in failed:
+                # leaving the member out would widen the rule, an incomplete group would change it
+                logging.error(f"{rule['name']}: {ref['name']} has no FMC id, rule skipped")
+                return None
+            objects.append({'name': ref['name'], 'id': entry['id'], 'type': entry['type']})
+        value = {}
+        if objects:
+            value['objects'] = objects
+        if rule[field]['literals']:
+            value['literals'] = rule[field]['literals']
+        if value:
+            access_rule[field] = value
+    # named after its content, not its line: a rule inserted above must not take over the name of the next one
+    access_rule['name'] = f"{rule['acl']}_{rule_key(access_rule)[:8]}"
+    return access_rule
+
+
+def _longest_increasing(pairs: list) -> list:
+    # (i, j) pairs sorted by i -> the longest subsequence with increasing j
+    tails, tail_pairs, previous = [], [], []
+    for pair in pairs:
+        k = bisect.bisect_left(tails, pair[1])
+        previous.append(tail_pairs[k - 1] if k else None)
+        if k == len(tails):
+            tails.append(pair[1])
+            tail_pairs.append(len(previous) - 1)
+        else:
+            tails[k] = pair[1]
+            tail_pairs[k] = len(previous) - 1
+    result = []
+    position = tail_pairs[-1] if tail_pairs else None
+    while position is not None:
+        result.append(pairs[position])
+        position = previous[position]
+    return result[::-1]
+
+
+class RuleUploader:
+    def __init__(self, fmc: fmc_api.FMC, policy_name=settings.ACCESS_POLICY, chunk_size=settings.FMC_BULK_LIMIT,
+                 ownership=None):
+        self.fmc = fmc
+        self.policy_name = policy_name
+        self.chunk_size = chunk_size
+        # journal.Ownership of the rules this tool created
+        self.ownership = ownership if ownership is not None else journal.Ownership(settings.OWNED_RULES_FILE)
+        self.stats = {'parsed': 0, 'skipped': 0, 'unchanged': 0, 'updated': 0, 'moved': 0, 'deleted': 0, 'created': 0}
+
+    def _translated(self, rules, count=False):
+        # FMC payloads of the rules that can be expressed exactly, named the same way on every pass
+        names = collections.Counter()
+        for rule in rules:
+            access_rule = to_access_rule(rule, self.fmc.index, self.fmc.failed)
+            if count:
+                self.stats['parsed'] += 1
+                self.stats['skipped'] += access_rule is None
+            if access_rule is None:
+                continue
+            names[access_rule['name']] += 1
+            if names[access_rule['name']] > 1:
+                # the same rule twice in an ACL
+                access_rule['name'] += f"_{names[access_rule['name']]}"
+            yield access_rule
+
+    def _owned(self, policy_id: str) -> list:
+        # (1-based index in the policy, id, content digest, attributes) of the rules this tool created
+        owned = []
+        for position, rule in enumerate(self.fmc.access_rules(policy_id), start=1):
+            if self.ownership.owns(OWNED_RULES, rule['id'], policy_id):
+                owned.append((position, rule['id'], rule_key(rule), tuple(rule.get(key) for key in ATTRIBUTES)))
+        return owned
+
+    def upload(self, rule_source) -> dict:
+        # rule_source() yields the parsed rules in ACL order, it is read twice: once to match them against the
+        # policy, once to send them. Only digests and ids are held for the whole ACL, payloads one chunk at a time
+        policy_id = self.fmc.access_policy_id(self.policy_name)
+        owned = self._owned(policy_id)
+        by_key = {}
+        for number, (_, _, key, _) in enumerate(owned):
+            by_key.setdefault(key, collections.deque()).append(number)
+        matches = []
+        for i, access_rule in enumerate(self._translated(rule_source(), count=True)):
+            numbers = by_key.get(rule_key(access_rule))
+            if numbers:
+                matches.append((i, numbers.popleft()))
+        del by_key
+        # rules already in the right order stay, the others are deleted and created again in their new place
+        kept = dict(_longest_increasing(matches))
+        self.stats['moved'] = len(matches) - len(kept)
+        del matches
+        kept_numbers = set(kept.values())
+
+        stale = [{'id': obj_id, 'name': attributes[0]}
+                 for number, (_, obj_id, _, attributes) in enumerate(owned) if number not in kept_numbers]
+        deleted = {rule['id'] for rule in self.fmc.delete_access_rules(policy_id, stale)}
+        self.ownership.discard((OWNED_RULES, obj_id) for obj_id in deleted)
+        self.stats['deleted'] = len(deleted)
+        # index of every kept rule once the stale ones are gone, rules this tool doesn't own stay where they are
+        index = {}
+        removed = 0
+        for number, (position, obj_id, _, _) in enumerate(owned):
+            if obj_id in deleted:
+                removed += 1
+            elif number in kept_numbers:
+                index[number] = position - removed
+
+        # new rules go in front of the kept rule that follows them, or at the end
+        following = iter(sorted(kept))
+        next_kept = next(following, None)
+        created = 0
+        run = []
+
+        def post_run():
+            nonlocal created, run
+            insert_before = index[kept[next_kept]] + created if next_kept is not None else None
+            ids = self.fmc.post_access_rules(policy_id, run, insert_before)
+            self.ownership.add({(OWNED_RULES, obj_id): policy_id for obj_id in ids})
+            created += len(ids)
+            run = []
+
+        for i, access_rule in enumerate(self._translated(rule_source())):
+            if i != next_kept:
+                run.append(access_rule)
+                if len(run) == self.chunk_size:
+                    post_run()
+                continue
+            if run:
+                post_run()
+            _, obj_id, _, attributes = owned[kept[i]]
+            if attributes == tuple(access_rule[key] for key in ATTRIBUTES):
+                self.stats['unchanged'] += 1
+            else:
+                # FMC would add the remarks a second time
+                update = {key: value for key, value in access_rule.items() if key != 'newComments'}
+                if self.fmc.put_access_rule(policy_id, {**update, 'id': obj_id}):
+                    self.stats['updated'] += 1
+            next_kept = next(following, None)
+        if run:
+            post_run()
+        self.stats['created'] = created
+        logging.info(f'Access rules: {self.stats}')
+        return self.stats
@@ -0,0 +1,104 @@
+import ipaddress
+import logging
+
+from model import Literal
+
+
+def to_interval(item_type: str, value: str) -> tuple:
+    # Host/Network/Range in parsed or FMC notation -> (ip version, first address, last address) as integers
+    if item_type in ('Host', 'host'):
+        address = ipaddress.ip_address(value)
+        return address.version, int(address), int(address)
+    if item_type in ('Network', 'subnet'):
+        network = ipaddress.ip_network(value, strict=False)
+        return network.version, int(network.network_address), int(network.broadcast_address)
+    if item_type in ('Range', 'range'):
+        start, stop = (ipaddress.ip_address(address) for address in value.split('-'))
+        return start.version, int(start), int(stop)
+    raise ValueError(f'{item_type} has no address interval')
+
+
+def merge(intervals: list) -> list:
+    # sort-and-sweep, overlapping and adjacent intervals are joined
+    merged = []
+    for version, start, stop in sorted(intervals):
+        if merged and merged[-1][0] == version and start <= merged[-1][2] + 1:
+            if stop > merged[-1][2]:
+                merged[-1][2] = stop
+        else:
+            merged.append([version, start, stop])
+    return merged
+
+
+def to_literals(intervals: list) -> list:
+    literals = []
+    for version, start, stop in intervals:
+        address_class = ipaddress.IPv4Address if version == 4 else ipaddress.IPv6Address
+        for network in ipaddress.summarize_address_range(address_class(start), address_class(stop)):
+            if network.num_addresses == 1:
+                literals.append(Literal(type='Host', value=str(network.network_address)))
+            else:
+                literals.append(Literal(type='Network', value=network.exploded))
+    return literals
+
+
+def coalesce_ports(literals: list) -> list:
+    # port literals of one protocol -> minimal non-overlapping ranges, a protocol-only literal covers all ports
+    intervals = []
+    any_port = set()
+    others = []
+    for literal in literals:
+        if literal['type'] != 'PortLiteral':
+            if literal not in others:
+                others.append(literal)
+        elif 'port' not in literal:
+            any_port.add(literal['protocol'])
+        else:
+            start, _, stop = literal['port'].partition('-')
+            intervals.append((literal['protocol'], int(start), int(stop or start)))
+
+    result = [{'protocol': protocol, 'type': 'PortLiteral'} for protocol in sorted(any_port)]
+    for protocol, start, stop in merge([interval for interval in intervals if interval[0] not in any_port]):
+        port = str(start) if start == stop else f'{start}-{stop}'
+        result.append({'protocol': protocol, 'type': 'PortLiteral', 'port': port})
+    return result + others
+
+
+class Aggregator:
+    def __init__(self, include_objects=False):
+        self.include_objects = include_objects
+        # literals removed from the groups, a member object folded into the literals counts as one
+        self.removed = 0
+
+    def run(self, config_elements: dict) -> int:
+        objects = config_elements.get('object_network', {})
+        for group in config_elements.get('object-group_network', {}).values():
+            self.aggregate_group(group, objects)
+        logging.info(f'Aggregation: {self.removed} group literals removed')
+        return self.removed
+
+    def aggregate_group(self, group: dict, objects: dict) -> int:
+        intervals = [to_interval(literal['type'], literal['value']) for literal in group['literals']]
+        members = len(group['literals'])
+
+        kept = group['objects']
+        if self.include_objects:
+            kept = []
+            for ref in group['objects']:
+                obj = objects.get(ref['name'])
+                if ref.get('type') != 'NetworkGroup' and obj and obj.get('type') in ('host', 'subnet', 'range', 'Host', 'Network', 'Range'):
+                    intervals.append(to_interval(obj['type'], obj['value']))
+                    members += 1
+                else:
+                    kept.append(ref)
+
+        literals = to_literals(merge(intervals))
+        removed = members - len(literals)
+        if removed <= 0:
+            # a folded range can take more CIDRs than the members it replaces, the group stays as it is
+            return 0
+        group['objects'] = kept
+        group['literals'] = literals
+        self.removed += removed
+        logging.debug(f"{group['name']}: {members} members aggregated into {len(literals)} literals")
+        return removed
@@ -0,0 +1,271 @@
+import argparse
+import bisect
+import heapq
+import json
+import logging
+import os
+
+import aggregate
+import asa_api
+import resolver
+import settings
+
+WIDTHS = {4: 32, 6: 128}
+PORT_WIDTH = 16
+PORTS = (0, 65535)
+ICMP_TYPES = (0, 255)
+
+
+class Unanalyzable(Exception):
+    pass
+
+
+class Space:
+    # merged (key, start, stop) intervals, key is the ip version for addresses and the protocol for ports
+    __slots__ = ('intervals', 'starts', 'opaque', 'full')
+
+    def __init__(self, intervals=(), opaque=frozenset(), full=False):
+        self.intervals = tuple(tuple(interval) for interval in aggregate.merge(list(intervals)))
+        self.starts = [interval[:2] for interval in self.intervals]
+        # members without an interval (fqdn), only covered by the same name or by a full space
+        self.opaque = frozenset(opaque)
+        self.full = full
+
+    @property
+    def key(self) -> tuple:
+        return self.full, self.intervals, self.opaque
+
+    def covers(self, other: 'Space') -> bool:
+        if self.full:
+            return True
+        if other.full or not other.opaque <= self.opaque:
+            return False
+        for version, start, stop in other.intervals:
+            i = bisect.bisect_right(self.starts, (version, start)) - 1
+            if i < 0 or self.intervals[i][0] != version or self.intervals[i][2] < stop:
+                return False
+        return True
+
+
+FULL = Space(full=True)
+
+
+class Rule:
+    __slots__ = ('number', 'name', 'action', 'dims', 'exact')
+
+    def __init__(self, name: str, action: str, dims: tuple, exact: bool):
+        # position among the rules indexed for its access-list
+        self.number = None
+        self.name = name
+        self.action = action
+        # source networks, destination networks, source ports, destination ports
+        self.dims = dims
+        # the product of dims is exactly what the rule matches, required to cover another rule
+        self.exact = exact
+
+    def covers(self, other: 'Rule') -> bool:
+        return all(mine.covers(theirs) for mine, theirs in zip(self.dims, other.dims))
+
+
+class AccessList:
+    # dims a rule is indexed by, the first one it restricts wins: destination, source, destination ports
+    INDEXED = (1, 0, 3)
+
+    def __init__(self):
+        self.rules = []
+        # (dim, interval key, prefix length, block) -> numbers of the rules whose dim fits in that block
+        self.buckets = {}
+        # rules matching any address and any port
+        self.anywhere = []
+        self.previous = None
+
+    @staticmethod
+    def _width(dim: int, key: int) -> int:
+        return WIDTHS[key] if dim in (0, 1) else PORT_WIDTH
+
+    def _keys(self, dim: int, space: Space):
+        hulls = {}
+        for key, start, stop in space.intervals:
+            low, high = hulls.get(key, (start, stop))
+            hulls[key] = min(low, start), max(high, stop)
+        for key, (start, stop) in hulls.items():
+            width = self._width(dim, key)
+            prefix = width - (start ^ stop).bit_length()
+            yield dim, key, prefix, start >> (width - prefix)
+
+    def add(self, rule: Rule):
+        rule.number = len(self.rules)
+        self.rules.append(rule)
+        for dim in self.INDEXED:
+            space = rule.dims[dim]
+            # a dim with fqdn members can cover rules that have no interval to look it up by
+            if not space.full and space.intervals and not space.opaque:
+                for key in self._keys(dim, space):
+                    self.buckets.setdefault(key, []).append(rule.number)
+                return
+        self.anywhere.append(rule.number)
+
+    def first_cover(self, rule: Rule):
+        # rules whose block holds the first interval of the same dim of this rule, in config order
+        candidates = [self.anywhere]
+        for dim in self.INDEXED:
+            space = rule.dims[dim]
+            if space.full or not space.intervals:
+                continue
+            key, start, _ = space.intervals[0]
+            width = self._width(dim, key)
+            for prefix in range(width + 1):
+                bucket = self.buckets.get((dim, key, prefix, start >> (width - prefix)))
+                if bucket:
+                    candidates.append(bucket)
+        for number in heapq.merge(*candidates):
+            if self.rules[number].covers(rule):
+                return self.rules[number]
+        return None
+
+
+class RuleAnalyzer:
+    def __init__(self, config_elements: dict, reused=None):
+        self.config_elements = config_elements
+        # network objects by name, including FMC objects that deduplication reused for config objects
+        self.objects = {**(reused or {}), **config_elements['object_network']}
+        self.acls = {}
+        self.resolver = resolver.GroupResolver(config_elements['object-group_network'])
+        # the same objects and groups show up in many rules, their spaces are built once
+        self._spaces = {}
+        self.report = {'shadowed': [], 'redundant': [], 'mergeable': [], 'unanalyzable': []}
+
+    @property
+    def unreachable(self) -> set:
+        return {entry['rule'] for entry in self.report['shadowed'] + self.report['redundant']}
+
+    def run(self, rules) -> dict:
+        count = 0
+        for rule in rules:
+            count += 1
+            self.analyze(rule)
+        logging.info(f'Rule analysis of {count} rules: ' + ', '.join(f'{len(entries)} {kind}'
+                                                                 for kind, entries in self.report.items()))
+        return self.report
+
+    def analyze(self, parsed: dict):
+        if not parsed['enabled']:
+            return
+        acl = self.acls.setdefault(parsed['acl'], AccessList())
+        try:
+            rule = self._rule(parsed)
+        except Unanalyzable as err:
+            self.report['unanalyzable'].append({'rule': parsed['name'], 'reason': str(err)})
+            acl.previous = None
+            return
+
+        cover = acl.first_cover(rule)
+        if cover is not None:
+            kind = 'redundant' if cover.action == rule.action else 'shadowed'
+            self.report[kind].append({'rule': rule.name, 'by': cover.name})
+            return
+        previous = acl.previous
+        if previous is not None and previous.action == rule.action and \
+                sum(mine.key != theirs.key for mine, theirs in zip(previous.dims, rule.dims)) == 1:
+            self.report['mergeable'].append({'rules': [previous.name, rule.name]})
+        acl.previous = rule
+        if rule.exact:
+            acl.add(rule)
+
+    def _rule(self, parsed: dict) -> Rule:
+        source_ports, source_protocols = self._ports(parsed['sourcePorts'])
+        destination_ports, destination_protocols = self._ports(parsed['destinationPorts'])
+        if destination_ports is None:
+            # source ports alone still limit the protocols
+            destination_ports = FULL if source_ports is None else \
+                Space((protocol, *PORTS) for protocol in source_protocols)
+            destination_protocols = source_protocols
+        exact = source_ports is None or len(destination_protocols | source_protocols) == 1
+        dims = (self._networks(parsed['sourceNetworks']), self._networks(parsed['destinationNetworks']),
+                source_ports or FULL, destination_ports)
+        return Rule(parsed['name'], parsed['action'], dims, exact)
+
+    def _networks(self, field: dict) -> Space:
+        if not field['objects'] and not field['literals']:
+            return FULL
+        key = (tuple(ref['name'] for ref in field['objects']),
+               tuple((literal['type'], literal['value']) for literal in field['literals']))
+        if key not in self._spaces:
+            self._spaces[key] = self._network_space(field)
+        return self._spaces[key]
+
+    def _network_space(self, field: dict) -> Space:
+        objects = set()
+        literals = {(literal['type'], literal['value']) for literal in field['literals']}
+        for ref in field['objects']:
+            if ref['name'] in self.objects:
+                objects.add(ref['name'])
+                continue
+            try:
+                members = self.resolver.resolve(ref['name'])
+            except resolver.ResolveError as err:
+                raise Unanalyzable(str(err))
+            objects |= members.objects
+            literals |= members.literals
+
+        intervals = [aggregate.to_interval(literal_type, value) for literal_type, value in literals]
+        opaque = set()
+        for name in objects:
+            obj = self.objects.get(name)
+            if obj is None or 'type' not in obj:
+                raise Unanalyzable(f'object {name} has no address')
+            if obj['type'] in ('fqdn', 'FQDN'):
+                opaque.add(obj['value'].lower())
+            else:
+                intervals.append(aggregate.to_interval(obj['type'], obj['value']))
+        return Space(intervals, opaque)
+
+    def _ports(self, field: dict) -> tuple:
+        # -> (Space or None when the rule does not restrict these ports, protocols involved)
+        literals = list(field['literals'])
+        for ref in field['objects']:
+            service = self.config_elements['object_service'].get(ref['name'])
+            if service is None:
+                service = self.config_elements['object-group_service'][ref['name']]
+            if service.get('unsupported'):
+                raise Unanalyzable(f"service {ref['name']}: {service['unsupported']}")
+            if 'destinationPorts' not in service:
+                literals.append(service)
+                continue
+            if service['sourcePorts']['literals']:
+                raise Unanalyzable(f"service object-group {ref['name']} mixes source and destination ports")
+            literals += service['destinationPorts']['literals']
+        if not literals:
+            return None, set()
+
+        intervals = []
+        for literal in literals:
+            protocol = int(literal['protocol'])
+            if literal['type'] in ('ICMPv4PortLiteral', 'ICMPv6PortLiteral'):
+                icmp_type = literal.get('icmpType')
+                intervals.append((protocol, *((int(icmp_type),) * 2 if icmp_type else ICMP_TYPES)))
+            elif literal.get('port'):
+                start, _, stop = literal['port'].partition('-')
+                intervals.append((protocol, int(start), int(stop or start)))
+            else:
+                intervals.append((protocol, *PORTS))
+        return Space(intervals), {interval[0] for interval in intervals}
+
+    def save(self, file_name=settings.ANALYSIS_REPORT):
+        # run on its own, nothing has created ./log yet
+        os.makedirs(os.path.dirname(file_name) or '.', exist_ok=True)
+        with open(file_name, 'w') as f:
+            json.dump(self.report, f, indent=4)
+        logging.info(f'Rule analysis saved to {file_name}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report shadowed, redundant and mergeable access-list rules')
+    parser.add_argument('config', nargs='?', default=settings.ASA_CONFIG)
+    parser.add_argument('-o', '--output', default=settings.ANALYSIS_REPORT)
+    args = parser.parse_args()
+    asa = asa_api.Asa(args.config)
+    asa.read()
+    analyzer = RuleAnalyzer(asa.parse())
+    analyzer.run(asa.access_rules(settings.ACCESS_LISTS))
+    analyzer.save(args.output)
@@ -1,215 +1,651 @@
-import json
+import time
+from typing import Union
 
 import settings
 import logging
 import re
 import ipaddress
-from ciscoconfparse import CiscoConfParse, IOSCfgLine
+import aggregate
+from cache import ParseCache
+from metrics import METRICS
+import stream
+from model import NetworkObject, Literal, Ref
+
+# bump whenever the shape or content of config_elements changes, invalidates parse caches
+PARSER_VERSION = '7'
+
+
+# protocol number -> (literal type, type names) of the protocols that take an icmp type instead of ports
+ICMP_PROTOCOLS = {
+    '1': ('ICMPv4PortLiteral', settings.imcp_codes),
+    '58': ('ICMPv6PortLiteral', settings.icmp6_codes),
+}
+ACL_OPTIONS = ('log', 'inactive', 'time-range')
 
 
 class ConfigFileError(Exception):
     pass
 
 
+def _port(value: str) -> str:
+    return value if value.isdigit() else settings.port_mapping[value]
+
+
+def _protocols(value: str) -> list:
+    if value == 'tcp-udp':
+        return ['6', '17']
+    if value.isdigit():
+        return [value]
+    if value not in settings.protocol_mapping:
+        # passed through, the name would end up where FMC and the analyzer expect a number
+        raise ValueError(f'Unsupported protocol {value}')
+    return [settings.protocol_mapping[value]]
+
+
+def _port_ranges(tokens: list) -> tuple:
+    # [operator, port, (port)] -> (port values, tokens consumed), neq takes two ranges
+    operator_ = tokens[0]
+    port = int(_port(tokens[1]))
+    if operator_ == 'eq':
+        return [str(port)], 2
+    if operator_ == 'range':
+        return [f'{port}-{_port(tokens[2])}'], 3
+    if operator_ == 'gt':
+        ranges = [(port + 1, 65535)]
+    elif operator_ == 'lt':
+        ranges = [(1, port - 1)]
+    elif operator_ == 'neq':
+        ranges = [(1, port - 1), (port + 1, 65535)]
+    else:
+        raise ValueError(f'Unsupported port operator {operator_}')
+    ranges = [(start, stop) for start, stop in ranges if start <= stop]
+    if not ranges:
+        raise ValueError(f'{operator_} {port} matches no port')
+    return [str(start) if start == stop else f'{start}-{stop}' for start, stop in ranges], 2
+
+
+def _service_ports(tokens: list) -> dict:
+    # "[source op port] [destination op port]" or legacy "op port" -> {direction: [port values]}
+    ports = {}
+    i = 0
+    while i < len(tokens):
+        if tokens[i] in ('source', 'destination'):
+            direction = tokens[i]
+            i += 1
+        else:
+            direction = 'destination'
+        values, consumed = _port_ranges(tokens[i:])
+        ports[direction] = values
+        i += consumed
+    return ports
+
+
+def _icmp_type(value: str, protocol='1') -> str:
+    return value if value.isdigit() else ICMP_PROTOCOLS[protocol][1][value]
+
+
+def _network(ip: str, mask: Union[None, str]) -> str:
+    return ipaddress.ip_network(ip if mask is None else f'{ip}/{mask}').exploded
+
+
+# fills all object/object-group sections of config_elements in one scan over the config
+class SinglePassParser:
+    def __init__(self):
+        self.sections = {
+            'object_network': {},
+            'object-group_network': {},
+            'object_service': {},
+            'object-group_service': {},
+        }
+        # service-object object references, resolved once all service objects are known
+        self._serv_refs = []
+        # service group name -> nested group-object names
+        self._serv_group_refs = {}
+        self._group_protocols = None
+        self._element = None
+        self._children = None
+        self._name = None
+        self.blocks = {
+            ('object', 'network'): (self._start_netw_obj, {
+                'description': self._description,
+                'subnet': self._netw_obj_subnet,
+                'host': self._netw_obj_host,
+                'range': self._netw_obj_range,
+                'fqdn': self._netw_obj_fqdn,
+            }),
+            ('object-group', 'network'): (self._start_netw_obj_group, {
+                'description': self._description,
+                'network-object': self._netw_obj_group_member,
+                'group-object': self._netw_obj_group_group,
+            }),
+            ('object', 'service'): (self._start_serv_obj, {
+                'service': self._serv_obj_service,
+            }),
+            ('object-group', 'service'): (self._start_serv_obj_group, {
+                'service-object': self._serv_obj_group_member,
+                'port-object': self._serv_obj_group_port,
+                'group-object': self._serv_obj_group_group,
+            }),
+        }
+
+    def parse(self, lines) -> dict:
+        # time spent per block type, measured at block boundaries only
+        self.timings = dict.fromkeys(self.blocks, 0.0)
+        self.timings[None] = 0.0
+        current = None
+        started = time.perf_counter()
+        for line in lines:
+            if not line.startswith(' '):
+                tokens = line.split()
+                kind = tuple(tokens[:2])
+                block = self.blocks.get(kind)
+                if block is not None and len(tokens) < 3:
+                    logging.warning(f'{line.strip()} has no name, skipped')
+                    block = None
+                if block is None:
+                    kind = None
+                if kind != current:
+                    now = time.perf_counter()
+                    self.timings[current] += now - started
+                    current, started = kind, now
+                if block is None:
+                    self._children = None
+                    continue
+                start, self._children = block
+                self._name = tokens[2]
+                start(tokens)
+            elif self._children is not None:
+                tokens = line.split()
+                if tokens:
+                    handler = self._children.get(tokens[0])
+                    if handler is not None:
+                        handler(tokens, line)
+        self.timings[current] += time.perf_counter() - started
+        started = time.perf_counter()
+        self._resolve_serv_refs()
+        self._resolve_serv_group_refs()
+        for name, element in self.sections['object-group_service'].items():
+            for direction in ('destinationPorts', 'sourcePorts'):
+                element[direction]['literals'] = aggregate.coalesce_ports(element[direction]['literals'])
+            self._check_serv_group(name, element)
+        self.timings[('object-group', 'service')] += time.perf_counter() - started
+        return self.sections
+
+    def _description(self, tokens: list, line: str):
+        self._element['description'] = line.split('description', 1)[1].strip()
+
+    # object network
+    def _start_netw_obj(self, tokens: list):
+        # NAT statements re-open the object, keep what was already parsed
+        self._element = self.sections['object_network'].setdefault(self._name, NetworkObject(name=self._name))
+
+    def _netw_obj_subnet(self, tokens: list, line: str):
+        self._element['type'] = 'Network'
+        self._element['value'] = _network(tokens[1], tokens[2] if len(tokens) > 2 else None)
+
+    def _netw_obj_host(self, tokens: list, line: str):
+        self._element['type'] = 'Host'
+        self._element['value'] = tokens[1]
+
+    def _netw_obj_range(self, tokens: list, line: str):
+        self._element['type'] = 'Range'
+        self._element['value'] = f'{tokens[1]}-{tokens[2]}'
+
+    def _netw_obj_fqdn(self, tokens: list, line: str):
+        self._element['type'] = 'FQDN'
+        self._element['value'] = tokens[-1]
+        self._element['dnsResolution'] = 'IPV6_ONLY' if tokens[1] == 'v6' else 'IPV4_ONLY'
+
+    # object-group network
+    def _start_netw_obj_group(self, tokens: list):
+        self._element = {'name': self._name, 'type': 'NetworkGroup', 'objects': [], 'literals': []}
+        self.sections['object-group_network'][self._name] = self._element
+
+    def _netw_obj_group_member(self, tokens: list, line: str):
+        if tokens[1] == 'object':
+            self._element['objects'].append(Ref(name=tokens[2]))
+        elif tokens[1] == 'host':
+            self._element['literals'].append(Literal(type='Host', value=tokens[2]))
+        else:
+            self._element['literals'].append(
+                Literal(type='Network', value=_network(tokens[1], tokens[2] if len(tokens) > 2 else None)))
+
+    def _netw_obj_group_group(self, tokens: list, line: str):
+        self._element['objects'].append(Ref(name=tokens[1], type='NetworkGroup'))
+
+    # object service
+    def _start_serv_obj(self, tokens: list):
+        self._element = {}
+        self.sections['object_service'][self._name] = self._element
+
+    def _serv_obj_service(self, tokens: list, line: str):
+        element = self._element
+        try:
+            protocol = _protocols(tokens[1])[0]
+        except ValueError:
+            return self._unsupported(f'{tokens[1]} services', line)
+        element['protocol'] = protocol
+        if protocol == settings.protocol_mapping['ip']:
+            return self._unsupported('ip services', line)
+        if protocol in ICMP_PROTOCOLS:
+            element['type'] = ICMP_PROTOCOLS[protocol][0]
+            if len(tokens) > 2:
+                try:
+                    element['icmpType'] = _icmp_type(tokens[2], protocol)
+                except KeyError as err:
+                    return self._unsupported(f'icmp type {err}', line)
+        else:
+            element['type'] = 'PortLiteral'
+            try:
+                ports = _service_ports(tokens[2:])
+            except (KeyError, ValueError, IndexError) as err:
+                return self._unsupported(f'port {err}', line)
+            if len(ports) > 1:
+                # an FMC port object has one port, dropping a side would widen the object
+                return self._unsupported('source and destination ports', line)
+            for direction, values in ports.items():
+                if len(values) > 1:
+                    return self._unsupported(f'{len(values)} port ranges', line)
+                element['direction'] = direction
+                element['port'] = values[0]
+
+    def _unsupported(self, reason: str, line: str):
+        # kept in the section so references to it can be refused instead of silently changed
+        logging.warning(f'{self._name}: {reason} have no FMC equivalent: {line.strip()}')
+        self._element.setdefault('unsupported', reason)
+
+    # object-group service
+    def _start_serv_obj_group(self, tokens: list):
+        self._element = {
+            'destinationPorts': {'literals': []},
+            'sourcePorts': {'literals': []},
+        }
+        self.sections['object-group_service'][self._name] = self._element
+        # tcp/udp service-groups only hold port-objects of their protocols
+        self._group_protocols = None
+        if len(tokens) > 3:
+            try:
+                self._group_protocols = _protocols(tokens[3])
+            except ValueError:
+                self._unsupported(f'{tokens[3]} port-objects', ' '.join(tokens))
+
+    def _serv_obj_group_member(self, tokens: list, line: str):
+        if tokens[1] == 'object':
+            if tokens[2] in self.sections['object_service']:
+                self._add_serv_ref(self._element, tokens[2])
+            else:
+                self._serv_refs.append((self._element, tokens[2]))
+            return
+        try:
+            protocols = _protocols(tokens[1])
+        except ValueError:
+            return self._unsupported(f'{tokens[1]} members', line)
+        try:
+            ports = _service_ports(tokens[2:]) if protocols[0] not in ICMP_PROTOCOLS else {}
+        except (KeyError, ValueError, IndexError) as err:
+            return self._unsupported(f'port {err}', line)
+        if len(ports) > 1:
+            # a member matches both ports at once, the group's two port lists would match either
+            return self._unsupported('source and destination ports', line)
+        for protocol in protocols:
+            if protocol in ICMP_PROTOCOLS:
+                literal = {'protocol': protocol, 'type': ICMP_PROTOCOLS[protocol][0]}
+                if len(tokens) > 2:
+                    try:
+                        literal['icmpType'] = _icmp_type(tokens[2], protocol)
+                    except KeyError as err:
+                        return self._unsupported(f'icmp type {err}', line)
+                self._element['destinationPorts']['literals'].append(literal)
+                continue
+            if not ports:
+                self._element['destinationPorts']['literals'].append({'protocol': protocol, 'type': 'PortLiteral'})
+            for direction, values in ports.items():
+                for port in values:
+                    literal = {'protocol': protocol, 'type': 'PortLiteral', 'port': port}
+                    self._element[f'{direction}Ports']['literals'].append(literal)
+
+    def _serv_obj_group_port(self, tokens: list, line: str):
+        if self._group_protocols is None:
+            return
+        try:
+            values, _ = _port_ranges(tokens[1:])
+        except (KeyError, ValueError, IndexError) as err:
+            return self._unsupported(f'port {err}', line)
+        for protocol in self._group_protocols:
+            for port in values:
+                self._element['destinationPorts']['literals'].append({'protocol': protocol, 'type': 'PortLiteral', 'port': port})
+
+    @staticmethod
+    def _check_serv_group(name: str, element: dict):
+        # an FMC port object group holds destination ports of one protocol each, leaving members out would
+        # narrow every rule that uses the group
+        if element.get('unsupported'):
+            return
+        if element['sourcePorts']['literals']:
+            element['unsupported'] = 'source ports'
+        elif any(literal['protocol'] == settings.protocol_mapping['ip'] for literal in element['destinationPorts']['literals']):
+            element['unsupported'] = 'ip members'
+        else:
+            return
+        logging.warning(f"Service object-group {name}: {element['unsupported']} have no FMC equivalent")
+
+    def _serv_obj_group_group(self, tokens: list, line: str):
+        self._serv_group_refs.setdefault(self._name, []).append(tokens[1])
+
+    def _add_serv_ref(self, element: dict, serv_obj: str):
+        obj = self.sections['object_service'][serv_obj]
+        if obj.get('unsupported'):
+            element.setdefault('unsupported', f"service object {serv_obj}: {obj['unsupported']}")
+            return
+        literal = {key: obj[key] for key in ('type', 'protocol', 'port', 'icmpType') if key in obj}
+        direction = obj.get('direction', 'destination')
+        element[f'{direction}Ports']['literals'].append(literal)
+
+    def _resolve_serv_refs(self):
+        # references to service objects defined further down in the config
+        for element, serv_obj in self._serv_refs:
+            if serv_obj in self.sections['object_service']:
+                self._add_serv_ref(element, serv_obj)
+            else:
+                logging.warning(f'Service object {serv_obj} is not defined in config!')
+        self._serv_refs = []
+
+    def _resolve_serv_group_refs(self):
+        groups = self.sections['object-group_service']
+        done = set()
+
+        def flatten(name: str, path: tuple):
+            if name in done:
+                return
+            for child in self._serv_group_refs.get(name, []):
+                if child in path:
+                    logging.warning(f'Service object-group {child} references itself through {name}!')
+                    continue
+                if child not in groups:
+                    logging.warning(f'Service object-group {child} is not defined in config!')
+                    continue
+                flatten(child, path + (child,))
+                if groups[child].get('unsupported'):
+                    groups[name].setdefault('unsupported', f"object-group {child}: {groups[child]['unsupported']}")
+                for direction in ('destinationPorts', 'sourcePorts'):
+                    groups[name][direction]['literals'].extend(groups[child][direction]['literals'])
+            done.add(name)
+
+        for name in self._serv_group_refs:
+            flatten(name, (name,))
+        self._serv_group_refs = {}
+
+
+class AccessListError(Exception):
+    pass
+
+
+def access_groups(lines) -> dict:
+    # "access-group <acl> in|out interface <nameif>" and "access-group <acl> global" -> {acl: [(direction, nameif)]}
+    bindings = {}
+    for line in lines:
+        if not line.startswith('access-group '):
+            continue
+        tokens = line.split()
+        if len(tokens) > 4 and tokens[2] in ('in', 'out') and tokens[3] == 'interface':
+            bindings.setdefault(tokens[1], []).append((tokens[2], tokens[4]))
+        elif len(tokens) > 2 and tokens[2] == 'global':
+            bindings.setdefault(tokens[1], []).append(('global', None))
+    return bindings
+
+
+# turns access-list lines into rules whose references point into the parsed sections
+class AccessListParser:
+    PORT_OPERATORS = ('eq', 'gt', 'lt', 'range', 'neq')
+
+    def __init__(self, sections: dict, acl_names=None, aliases=None, bindings=None):
+        self.sections = sections
+        self.acl_names = set(acl_names) if acl_names else None
+        # objects dropped by deduplication -> the object kept in their place
+        self.aliases = aliases or {}
+        # access_groups() of the config, an FMC policy has one rule list for all interfaces
+        self.bindings = bindings
+        self._zones = {}
+        self._remarks = {}
+        self._numbers = {}
+
+    def parse(self, line: str) -> Union[None, dict]:
+        tokens = line.split()
+        acl = tokens[1]
+        if self.acl_names is not None and acl not in self.acl_names:
+            return None
+        zones = self._acl_zones(acl)
+        if zones is None:
+            return None
+        if tokens[2] == 'remark':
+            self._remarks.setdefault(acl, []).append(line.split('remark', 1)[1].strip())
+            return None
+        if tokens[2] == 'extended':
+            tokens = tokens[3:]
+        elif tokens[2] in ('permit', 'deny'):
+            tokens = tokens[2:]
+        else:
+            logging.warning(f'{tokens[2]} access-list {acl} is not supported, skipped: {line.strip()}')
+            return None
+
+        number = self._numbers[acl] = self._numbers.get(acl, 0) + 1
+        remarks = self._remarks.pop(acl, [])
+        try:
+            rule = self._rule(tokens)
+        except (AccessListError, KeyError, ValueError, IndexError) as err:
+            logging.warning(f'{acl} line {number} skipped ({err}): {line.strip()}')
+            return None
+        rule.update(zones, acl=acl, name=f'{acl}_{number}')
+        if remarks:
+            rule['remarks'] = remarks
+        return rule
+
+    def _acl_zones(self, acl: str) -> Union[None, dict]:
+        # source/destination zones that keep the rules of an ACL to the traffic it filters on the ASA
+        if acl in self._zones:
+            return self._zones[acl]
+        zones = {'sourceZones': {'objects': [], 'literals': []}, 'destinationZones': {'objects': [], 'literals': []}}
+        bindings = self.bindings.get(acl) if self.bindings is not None else [('global', None)]
+        if not bindings:
+            logging.warning(f'access-list {acl} is not applied by an access-group, skipped')
+            zones = None
+        elif any(direction == 'global' for direction, _ in bindings):
+            # a global ACL filters every interface
+            pass
+        elif len({direction for direction, _ in bindings}) > 1:
+            logging.warning(f'access-list {acl} is applied both in and out, no single zone pair matches it, skipped')
+            zones = None
+        else:
+            field = 'sourceZones' if bindings[0][0] == 'in' else 'destinationZones'
+            for _, interface in bindings:
+                zones[field]['objects'].append({'name': settings.SECURITY_ZONES.get(interface, interface)})
+        self._zones[acl] = zones
+        return zones
+
+    def _rule(self, tokens: list) -> dict:
+        rule = {
+            'action': tokens[0],
+            'enabled': True,
+            'log': False,
+            'sourceNetworks': {'objects': [], 'literals': []},
+            'destinationNetworks': {'objects': [], 'literals': []},
+            'sourcePorts': {'objects': [], 'literals': []},
+            'destinationPorts': {'objects': [], 'literals': []},
+        }
+        i = 1
+        protocol = None
+        if tokens[i] == 'object':
+            service = self._service_object(tokens[i + 1])
+            rule[f"{service.get('direction', 'destination')}Ports"]['objects'].append({'name': tokens[i + 1]})
+            i += 2
+        elif tokens[i] == 'object-group':
+            if tokens[i + 1] not in self.sections['object-group_service']:
+                raise AccessListError(f'object-group {tokens[i + 1]} is not a service object-group')
+            self._service_group(tokens[i + 1])
+            rule['destinationPorts']['objects'].append({'name': tokens[i + 1]})
+            i += 2
+        else:
+            protocol = _protocols(tokens[i])[0]
+            i += 1
+
+        i = self._address(tokens, i, rule['sourceNetworks'])
+        if protocol is not None and protocol not in ICMP_PROTOCOLS:
+            i = self._ports(tokens, i, protocol, rule['sourcePorts'])
+        i = self._address(tokens, i, rule['destinationNetworks'])
+        if protocol in ICMP_PROTOCOLS:
+            literal = {'protocol': protocol, 'type': ICMP_PROTOCOLS[protocol][0]}
+            if i < len(tokens) and tokens[i] not in ACL_OPTIONS:
+                # an unknown type name raises, ignoring it would let the rule match every type
+                literal['icmpType'] = _icmp_type(tokens[i], protocol)
+                i += 1
+            rule['destinationPorts']['literals'].append(literal)
+        elif protocol is not None:
+            i = self._ports(tokens, i, protocol, rule['destinationPorts'])
+            if protocol != settings.protocol_mapping['ip'] and not any(rule[ports]['literals'] or rule[ports]['objects']
+                                                                      for ports in ('sourcePorts', 'destinationPorts')):
+                rule['destinationPorts']['literals'].append({'protocol': protocol, 'type': 'PortLiteral'})
+
+        while i < len(tokens):
+            option = tokens[i]
+            if option == 'log':
+                rule['log'] = not (i + 1 < len(tokens) and tokens[i + 1] == 'disable')
+            elif option == 'inactive':
+                rule['enabled'] = False
+            elif option == 'time-range':
+                # without the time-range the rule would be active all the time
+                raise AccessListError(f'time-range {tokens[i + 1]} has no FMC equivalent')
+            i += 1
+        return rule
+
+    def _service_object(self, name: str) -> dict:
+        try:
+            service = self.sections['object_service'][name]
+        except KeyError:
+            raise AccessListError(f'service object {name} is not defined in config')
+        if service.get('unsupported'):
+            raise AccessListError(f"service object {name}: {service['unsupported']} have no FMC equivalent")
+        return service
+
+    def _service_group(self, name: str) -> dict:
+        group = self.sections['object-group_service'][name]
+        if group.get('unsupported'):
+            raise AccessListError(f"service object-group {name}: {group['unsupported']} have no FMC equivalent")
+        return group
+
+    def _address(self, tokens: list, i: int, networks: dict) -> int:
+        keyword = tokens[i]
+        if keyword in ('any', 'any4', 'any6'):
+            return i + 1
+        if keyword == 'host':
+            networks['literals'].append({'type': 'Host', 'value': tokens[i + 1]})
+            return i + 2
+        if keyword in ('object', 'object-group'):
+            section = 'object_network' if keyword == 'object' else 'object-group_network'
+            name = self.aliases.get(tokens[i + 1], tokens[i + 1]) if keyword == 'object' else tokens[i + 1]
+            # an alias may point to an FMC object that is reused instead of a config one
+            if name not in self.sections[section] and tokens[i + 1] not in self.aliases:
+                raise AccessListError(f'{keyword} {tokens[i + 1]} is not defined in config')
+            networks['objects'].append({'name': name})
+            return i + 2
+        if '/' in keyword:
+            networks['literals'].append({'type': 'Network', 'value': _network(keyword, None)})
+            return i + 1
+        if keyword[0].isdigit():
+            network = _network(keyword, tokens[i + 1])
+            literal_type = 'Host' if network.endswith('/32') else 'Network'
+            networks['literals'].append({'type': literal_type, 'value': keyword if literal_type == 'Host' else network})
+            return i + 2
+        raise AccessListError(f'address {keyword} is not supported')
+
+    def _ports(self, tokens: list, i: int, protocol: str, ports: dict) -> int:
+        if i >= len(tokens):
+            return i
+        if tokens[i] == 'object-group' and tokens[i + 1] in self.sections['object-group_service']:
+            self._service_group(tokens[i + 1])
+            ports['objects'].append({'name': tokens[i + 1]})
+            return i + 2
+        if tokens[i] not in self.PORT_OPERATORS:
+            return i
+        values, consumed = _port_ranges(tokens[i:])
+        for port in values:
+            ports['literals'].append({'protocol': protocol, 'type': 'PortLiteral', 'port': port})
+        return i + consumed
+
+
 class Asa:
-    def __init__(self, config_file = settings.ASA_CONFIG):
+    def __init__(self, config_file = settings.ASA_CONFIG, use_cache = settings.PARSE_CACHE):
         self.config_file = config_file
         self.config = None
         self.config_elements = {}
+        self.cache = ParseCache() if use_cache else None
+        self._cache_key = None
 
     def read(self):
         try:
-            with open(self.config_file, 'rt') as f:
-                self.config = CiscoConfParse(f.readlines(), syntax='asa')
+            with open(self.config_file, 'rb') as f:
+                data = f.read()
         except FileNotFoundError:
             logging.error('Config file not found!')
             raise ConfigFileError('Config file not found!')
+        self.config = data.decode().splitlines(keepends=True)
+        if self.cache:
+            self._cache_key = self.cache.key(data, PARSER_VERSION)
 
     def print_(self):
-        print(json.dumps(self.config_elements, indent=4))
+        self.export('-')
+
+    def export(self, file_name: str):
+        # NDJSON, rules are written one by one as the access-lists are parsed
+        with stream.open_output(file_name) as f:
+            writer = stream.Writer(f, PARSER_VERSION)
+            writer.write_sections(self.config_elements)
+            writer.write_rules(self.access_rules())
+        if file_name != '-':
+            logging.info(f'{writer.count} records exported to {file_name}')
+
+    def parse(self) -> dict:
+        if self.cache:
+            cached = self.cache.load(self._cache_key)
+            if cached is not None:
+                logging.info(f'{self.config_file} parsed config loaded from cache')
+                self.config_elements.update(cached)
+                return self.config_elements
+        parser = SinglePassParser()
+        with METRICS.phase('parse'):
+            self.config_elements.update(parser.parse(self.config))
+        for kind, seconds in parser.timings.items():
+            METRICS.add_phase(f"parse.{'_'.join(kind) if kind else 'other'}", seconds)
+        if self.cache:
+            self.cache.store(self._cache_key, self.config_elements)
+        return self.config_elements
+
+    def access_rules(self, acl_names=None, aliases=None):
+        # access-list entries one at a time in config order, objects must be parsed first
+        if not self.config_elements:
+            self.parse()
+        parser = AccessListParser(self.config_elements, acl_names, aliases, access_groups(self.config))
+        for line in self.config:
+            if line.startswith('access-list '):
+                rule = parser.parse(line)
+                if rule is not None:
+                    yield rule
+
+    def _section(self, section: str) -> dict:
+        if section not in self.config_elements:
+            self.parse()
+        return self.config_elements[section]
 
     def parse_serv_obj(self) -> dict:
-        result = {}
-        for serv_obj in self.config.find_objects(r'object service'):
-            serv_obj: IOSCfgLine
-            element = {}
-            name = serv_obj.re_match_typed('^object service (\S+)')
-            for child in serv_obj.children:
-                if child.re_match_typed('description (\S+)'):
-                    continue
-                protocol = child.re_match_typed('service (\S+)')
-                if not protocol.isdigit():
-                    protocol = settings.protocol_mapping[protocol]
-                element['protocol'] = protocol
-                if protocol == '1':
-                    element['type'] = 'ICMPv4PortLiteral'
-                    if child.re_match_typed('service \S+ (\S+)'):
-                        icmp_type = child.re_match_typed('service \S+ (\S+)')
-                        if not icmp_type.isdigit():
-                            icmp_type = settings.imcp_codes[icmp_type]
-                        element['icmpType'] = icmp_type
-                else:
-                    element['type'] = 'PortLiteral'
-                    if child.re_match_typed('service \S+ (\S+)'):
-                        direction = child.re_match_typed('service \S+ (\S+)')
-                        element['direction'] = direction
-                        operator_ = child.re_match_typed('service \S+ \S+ (\S+)')
-                        port = child.re_match_typed('service \S+ \S+ \S+ (\S+)')
-                        if not port.isdigit():
-                            port = settings.port_mapping[port]
-                        elif operator_ == 'gt':
-                            port = f'{port}-65535'
-                        elif operator_ == 'lt':
-                            port = f'0-{port}'
-                        elif operator_ == 'range':
-                            port_start = port
-                            port_stop = child.re_match_typed('service \S+ \S+ \S+ \S+ (\S+)')
-                            if not port_stop.isdigit():
-                                port_stop = settings.port_mapping[port_stop]
-                            port = f'{port_start}-{port_stop}'
-                        element['port'] = port
-            result[name] = element
-        self.config_elements['object_service'] = result
-        return result
-
-    def parse_serv_obj_group(self):
-        result = {}
-
-        for serv_obj_group in self.config.find_objects(r'object-group service'):
-            serv_obj_group: IOSCfgLine
-            # for tcp/udp service-groups
-            serv_obj_gr_type = serv_obj_group.re_match_typed('^object-group service \S+ (\S+)')
-            if serv_obj_gr_type in ['tcp', 'udp', 'tcp-udp']:
-                pass
-            # for regular service-groups
-            else:
-                name = serv_obj_group.re_match_typed('^object-group service (\S+)')
-                result[name] = {}
-                result[name]['destinationPorts'] = {}
-                result[name]['destinationPorts']['literals'] = []
-                result[name]['sourcePorts'] = {}
-                result[name]['sourcePorts']['literals'] = []
-
-                for child in serv_obj_group.children:
-                    child: IOSCfgLine
-                    if child.re_match_typed('description (\S+)'):
-                        continue
-                    if child.re_match_typed('service-object object (\S+)'):
-                        serv_obj = child.re_match_typed('service-object object (\S+)')
-                        element = {}
-                        element['type'] = self.config_elements['object_service'][serv_obj]['type']
-                        element['protocol'] = self.config_elements['object_service'][serv_obj]['protocol']
-                        element['port'] = self.config_elements['object_service'][serv_obj]['port']
-                        if self.config_elements['object_service'][serv_obj]['direction'] == 'destination':
-                            result[name]['destinationPorts']['literals'].append(element)
-                        elif self.config_elements['object_service'][serv_obj]['direction'] == 'source':
-                            result[name]['sourcePorts']['literals'].append(element)
-                    elif child.re_match_typed('service-object (\S+)'):
-                        element = {}
-                        protocol = child.re_match_typed('-object (\S+)')
-                        if not protocol.isdigit():
-                            protocol = settings.protocol_mapping[protocol]
-                        element['protocol'] = protocol
-                        if protocol == '1':
-                            element['type'] = 'ICMPv4PortLiteral'
-                            if child.re_match_typed('-object \S+ (\S+)'):
-                                icmp_type = child.re_match_typed('-object \S+ (\S+)')
-                                if not icmp_type.isdigit():
-                                    icmp_type = settings.imcp_codes[icmp_type]
-                                element['icmpType'] = icmp_type
-                        else:
-                            element['type'] = 'PortLiteral'
-                            element['protocol'] = protocol
-                            if child.re_match_typed('-object \S+ (\S+)'):
-                                direction = child.re_match_typed('-object \S+ (\S+)')
-                                operator_ = child.re_match_typed('-object \S+ \S+ (\S+)')
-                                port = child.re_match_typed('-object \S+ \S+ \S+ (\S+)')
-                                if not port.isdigit():
-                                    port = settings.port_mapping[port]
-                                elif operator_ == 'gt':
-                                    port = f'{port}-65535'
-                                elif operator_ == 'lt':
-                                    port = f'0-{port}'
-                                elif operator_ == 'range':
-                                    port_start = port
-                                    port_stop = child.re_match_typed('-object \S+ \S+ \S+ \S+ (\S+)')
-                                    if not port_stop.isdigit():
-                                        port_stop = settings.port_mapping[port_stop]
-                                    port = f'{port_start}-{port_stop}'
-                                element['port'] = port
-                                if direction == 'destination':
-                                    result[name]['destinationPorts']['literals'].append(element)
-                                elif direction == 'source':
-                                    result[name]['sourcePorts']['literals'].append(element)
-                                else:
-                                    result[name]['destinationPorts']['literals'].append(element)
-        self.config_elements['object-group_service'] = result
-        return result
+        return self._section('object_service')
+
+    def parse_serv_obj_group(self) -> dict:
+        return self._section('object-group_service')
 
     def parse_netw_obj(self) -> dict:
-        result = {}
-        for netw_obj in self.config.find_objects(r'^object network'):
-            netw_obj: IOSCfgLine
-            element = {}
-            name = netw_obj.re_match_typed('^object network (\S+)')
-            element['name'] = name
-            for child in netw_obj.children:
-                child: IOSCfgLine
-                if child.re_match_typed('description (.*)'):
-                    element['description'] = child.re_match_typed('description (.*)').strip()
-                elif child.re_match_typed('subnet (\S+)'):
-                    element['type'] = 'subnet'
-                    ip = child.re_match_typed(r' subnet (\S+) ')
-                    mask = child.re_match_typed(r' subnet \S+ (\S+)')
-                    element['value'] = ipaddress.ip_network(f'{ip}/{mask}').exploded
-                elif child.re_match_typed('host (\S+)'):
-                    element['type'] = 'host'
-                    element['value'] = child.re_match_typed('host (\S+)')
-                elif child.re_match_typed('range (\S+)'):
-                    element['type'] = 'range'
-                    start_val = child.re_match_typed('range (\S+)')
-                    stop_val = child.re_match_typed('range \S+ (\S+)')
-                    element['value'] = f'{start_val}-{stop_val}'
-                elif child.re_match_typed('fqdn (\S+)'):
-                    element['type'] = 'fqdn'
-                    element['value'] = child.re_match_typed('fqdn (\S+)')
-                    element['dnsResolution'] = 'IPV4_ONLY'
-            result[name] = element
-        self.config_elements['object_network'] = result
-        return result
+        return self._section('object_network')
 
     def parse_netw_obj_groups(self) -> dict:
-        result = {}
-        for netw_obj_group in self.config.find_objects(r'^object-group network'):
-            netw_obj_group: IOSCfgLine
-            element = {}
-            name = netw_obj_group.re_match_typed('^object-group network (\S+)')
-            element['name'] = name
-            element['type'] = 'NetworkGroup'
-            element['objects'] = []
-            element['literals'] = []
-            for child in netw_obj_group.children:
-                child: IOSCfgLine
-                literal = {}
-                object_ = {}
-                if child.re_match_typed(r'description (\S+)'):
-                    element['description'] = child.re_match_typed(r'description (.*)').strip()
-                elif child.re_match_typed(r'^ network-object object (\S+)'):
-                    object_['name'] = child.re_match_typed(r' object (\S+)')
-                    element['objects'].append(object_)
-                elif child.re_match_typed(r' network-object (\d+\.)'):
-                    literal['type'] = 'Network'
-                    ip = child.re_match_typed(r' network-object (\S+) ')
-                    mask = child.re_match_typed(r' network-object \S+ (\S+)')
-                    literal['value'] = ipaddress.ip_network(f'{ip}/{mask}').exploded
-                    element['literals'].append(literal)
-                elif child.re_match_typed(r' network-object host (\S+)'):
-                    literal['type'] = 'Host'
-                    literal['value'] = child.re_match_typed(r' network-object host (\S+)')
-                    element['literals'].append(literal)
-            result[name] = element
-        self.config_elements['object-group_network'] = result
-        return result
+        return self._section('object-group_network')
 
 
 
@@ -317,10 +753,9 @@ class Asa:
         return network_obj_groups
 """
 
-asa = Asa()
-asa.read()
-asa.parse_netw_obj()
-asa.parse_netw_obj_groups()
-asa.parse_serv_obj()
-asa.parse_serv_obj_group()
-asa.print_()
\ No newline at end of file
+
+if __name__ == '__main__':
+    asa = Asa()
+    asa.read()
+    asa.parse()
+    asa.print_()
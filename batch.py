@@ -0,0 +1,106 @@
+from concurrent.futures import ProcessPoolExecutor
+import json
+import logging
+import os
+import re
+
+import asa_api
+import model
+
+
+def collect_configs(paths: list) -> list:
+    config_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            config_files += sorted(os.path.join(path, file_name) for file_name in os.listdir(path)
+                                   if os.path.isfile(os.path.join(path, file_name)))
+        else:
+            config_files.append(path)
+    return config_files
+
+
+def parse_config(config_file: str) -> dict:
+    asa = asa_api.Asa(config_file)
+    asa.read()
+    return asa.parse()
+
+
+def parse_all(config_files: list, workers=None) -> dict:
+    parsed = {}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = {config_file: executor.submit(parse_config, config_file) for config_file in config_files}
+        for config_file, future in futures.items():
+            try:
+                parsed[config_file] = future.result()
+                logging.info(f'{config_file} parsed')
+            except asa_api.ConfigFileError:
+                logging.error(f'{config_file} is skipped!')
+    return parsed
+
+
+def merge(parsed: dict) -> dict:
+    # one config_elements for the shared upload, every item tagged with the config it came from
+    config_elements = {}
+    for config_file, elements in parsed.items():
+        source = os.path.basename(config_file)
+        renames = _conflicts(config_elements, elements, _prefix(source))
+        for section, items in elements.items():
+            merged = config_elements.setdefault(section, {})
+            for name, item in items.items():
+                new_name = renames.get((section, name), name)
+                item = _renamed(item, renames)
+                if new_name != name:
+                    existing = merged[name]
+                    logging.warning(f"{name} from {source} differs from the one in {existing['source']}, "
+                                    f"uploaded as {new_name}!")
+                    if 'name' in item:
+                        item['name'] = new_name
+                merged.setdefault(new_name, {**item, 'source': source})
+    return config_elements
+
+
+def _prefix(source: str) -> str:
+    return re.sub(r'[^\w.-]', '_', os.path.splitext(source)[0])
+
+
+def _conflicts(config_elements: dict, elements: dict, prefix: str) -> dict:
+    # (section, name) -> name in the merged config for items whose name is taken by different content,
+    # a group pointing to a renamed member differs as well, so this runs until nothing changes
+    renames = {}
+    changed = True
+    while changed:
+        changed = False
+        for section, items in elements.items():
+            merged = config_elements.get(section, {})
+            for name, item in items.items():
+                existing = merged.get(name)
+                if (section, name) in renames or existing is None or _content(existing) == _content(_renamed(item, renames)):
+                    continue
+                new_name, number = f'{prefix}_{name}', 1
+                while new_name in merged or new_name in items:
+                    number += 1
+                    new_name = f'{prefix}_{name}_{number}'
+                renames[(section, name)] = new_name
+                changed = True
+    return renames
+
+
+def _renamed(item: dict, renames: dict) -> dict:
+    if not renames or 'objects' not in item:
+        return item
+    objects = []
+    for ref in item['objects']:
+        section = 'object-group_network' if ref.get('type') == 'NetworkGroup' else 'object_network'
+        objects.append({**ref, 'name': renames.get((section, ref['name']), ref['name'])})
+    return {**item, 'objects': objects}
+
+
+def _content(item: dict) -> str:
+    return json.dumps({key: value for key, value in item.items() if key != 'source'}, sort_keys=True,
+                      default=model.plain)
+
+
+def load(paths: list, workers=None) -> dict:
+    config_files = collect_configs(paths)
+    logging.info(f'Parsing {len(config_files)} configs...')
+    return merge(parse_all(config_files, workers=workers))
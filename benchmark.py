@@ -0,0 +1,122 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from confgen import ConfigGenerator
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+BASELINE_FILE = 'benchmark_baseline.json'
+
+
+def _single_pass(config_file: str):
+    # imported here, the benchmark must not depend on what importing the parser does
+    import asa_api
+
+    asa = asa_api.Asa(config_file, use_cache=False)
+    asa.read()
+    return asa.parse()
+
+
+def _ciscoconfparse_parsers():
+    try:
+        from ciscoconfparse import CiscoConfParse
+        import config_parser
+    except ImportError:
+        return {}
+
+    def run(parser):
+        def parse(config_file: str):
+            with open(config_file) as f:
+                return {parser.__name__: parser(CiscoConfParse(f.readlines(), syntax='asa'))}
+        return parse
+
+    return {f'config_parser.{parser.__name__}': run(parser) for parser in (
+        config_parser.parse_netw_obj, config_parser.parse_netw_obj_groups, config_parser.parse_serv_obj)}
+
+
+def parsers() -> dict:
+    return {'asa_api.Asa.parse': _single_pass, **_ciscoconfparse_parsers()}
+
+
+def measure(parse, config_file: str, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = parse(config_file)
+        timings.append(time.perf_counter() - start)
+    objects = sum(len(section) for section in result.values())
+
+    # separate run, tracemalloc slows parsing down
+    gc.collect()
+    tracemalloc.start()
+    result = parse(config_file)
+    # what the pipeline keeps holding once parsing is done, as opposed to the transient peak
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    best = min(timings)
+    return {
+        'seconds': round(best, 4),
+        'peak_memory': peak,
+        'retained_memory': retained,
+        'objects': objects,
+        'objects_per_second': round(objects / best) if best else None,
+    }
+
+
+def run(sizes, repeat: int, seed: int) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            config_file = os.path.join(directory, f'asa_{size}.txt')
+            ConfigGenerator(seed=seed).write(config_file, size)
+            for name, parse in parsers().items():
+                key = f'{name}[{size}]'
+                results[key] = measure(parse, config_file, repeat)
+                print(f"{key}: {results[key]['seconds']}s, {results[key]['peak_memory'] / 2 ** 20:.1f} MiB peak, "
+                      f"{results[key]['retained_memory'] / 2 ** 20:.1f} MiB retained, "
+                      f"{results[key]['objects_per_second']} objects/s")
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        for metric in ('seconds', 'peak_memory', 'retained_memory'):
+            if metric not in baseline[key]:
+                continue
+            if result[metric] > baseline[key][metric] * (1 + threshold):
+                regressions.append(f'{key} {metric}: {baseline[key][metric]} -> {result[metric]}')
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark ASA config parsers on synthetic configs')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES[:3], help=f'config sizes in lines, e.g. {SIZES}')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown/memory growth, 0.2 = 20%%')
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat, args.seed)
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f'Baseline saved to {args.baseline}')
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,73 @@
+from typing import Union
+import hashlib
+import logging
+import os
+import pickle
+import zlib
+
+import settings
+
+
+class ParseCache:
+    SUFFIX = '.cache'
+
+    def __init__(self, directory=settings.PARSE_CACHE_DIR, max_size=settings.PARSE_CACHE_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    @staticmethod
+    def key(data: bytes, version: str) -> str:
+        digest = hashlib.sha256(data)
+        digest.update(version.encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def load(self, key: str) -> Union[None, dict]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                config_elements = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return None
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError) as err:
+            logging.warning(f'Parse cache entry {path} is unreadable --> {str(err)}')
+            return None
+        # mark as recently used for eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return config_elements
+
+    def store(self, key: str, config_elements: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(zlib.compress(pickle.dumps(config_elements, protocol=pickle.HIGHEST_PROTOCOL)))
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(self.SUFFIX):
+                try:
+                    stat = os.stat(os.path.join(self.directory, file_name))
+                except FileNotFoundError:
+                    # evicted by another process meanwhile
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, file_name))
+        total = sum(size for _, size, _ in entries)
+        # least recently used first
+        for _, size, file_name in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.directory, file_name))
+            except FileNotFoundError:
+                pass
+            total -= size
+            logging.debug(f'Parse cache entry {file_name} evicted')
@@ -0,0 +1,180 @@
+import argparse
+import random
+
+import settings
+
+# relative weight of every block type in a generated config
+DEFAULT_MIX = {
+    'host': 30,
+    'subnet': 20,
+    'range': 5,
+    'fqdn': 5,
+    'group': 15,
+    'service': 15,
+    'service_group': 10,
+}
+
+# access-list acl_<n> is applied inbound on INTERFACES[n]
+INTERFACES = ('outside', 'inside', 'dmz', 'management')
+
+
+def _dotted(value: int) -> str:
+    return '.'.join(str(value >> shift & 0xff) for shift in (24, 16, 8, 0))
+
+
+class ConfigGenerator:
+    def __init__(self, mix=None, seed=0):
+        self.mix = mix or DEFAULT_MIX
+        self.random = random.Random(seed)
+        self.objects = []
+        self.groups = []
+        self.services = []
+        self.service_groups = []
+        self.acls = set()
+        self._counter = 0
+
+    def _name(self, prefix: str) -> str:
+        self._counter += 1
+        return f'{prefix}_{self._counter}'
+
+    def _ip(self) -> str:
+        r = self.random
+        return f'10.{r.randrange(256)}.{r.randrange(256)}.{r.randrange(1, 255)}'
+
+    def _subnet(self) -> str:
+        prefix = self.random.randrange(16, 31)
+        network = self.random.getrandbits(prefix) << (32 - prefix)
+        mask = (0xffffffff << (32 - prefix)) & 0xffffffff
+        return f'{_dotted(network)} {_dotted(mask)}'
+
+    def _port(self) -> str:
+        r = self.random
+        choice = r.random()
+        if choice < 0.5:
+            return f'eq {r.choice(list(settings.port_mapping)) if r.random() < 0.3 else r.randrange(1, 65536)}'
+        if choice < 0.8:
+            start = r.randrange(1, 65000)
+            return f'range {start} {start + r.randrange(1, 500)}'
+        return f'{r.choice(("gt", "lt"))} {r.randrange(2, 65535)}'
+
+    def host(self) -> list:
+        name = self._name('host')
+        self.objects.append(name)
+        return [f'object network {name}', f' host {self._ip()}', f' description generated host {name}']
+
+    def subnet(self) -> list:
+        name = self._name('net')
+        self.objects.append(name)
+        return [f'object network {name}', f' subnet {self._subnet()}']
+
+    def range(self) -> list:
+        name = self._name('range')
+        self.objects.append(name)
+        start = self._ip()
+        stop = start.rsplit('.', 1)[0] + '.255'
+        return [f'object network {name}', f' range {start} {stop}']
+
+    def fqdn(self) -> list:
+        name = self._name('fqdn')
+        self.objects.append(name)
+        return [f'object network {name}', f' fqdn v4 {name}.example.com']
+
+    def group(self) -> list:
+        r = self.random
+        name = self._name('grp')
+        lines = [f'object-group network {name}', f' description generated group {name}']
+        for _ in range(r.randrange(1, 20)):
+            choice = r.random()
+            if choice < 0.4 and self.objects:
+                lines.append(f' network-object object {r.choice(self.objects)}')
+            elif choice < 0.5 and self.groups:
+                lines.append(f' group-object {r.choice(self.groups)}')
+            elif choice < 0.8:
+                lines.append(f' network-object host {self._ip()}')
+            else:
+                lines.append(f' network-object {self._subnet()}')
+        self.groups.append(name)
+        return lines
+
+    def service(self) -> list:
+        r = self.random
+        name = self._name('svc')
+        self.services.append(name)
+        if r.random() < 0.1:
+            return [f'object service {name}', ' service icmp echo']
+        return [f'object service {name}', f' service {r.choice(("tcp", "udp"))} destination {self._port()}']
+
+    def service_group(self) -> list:
+        r = self.random
+        name = self._name('svcgrp')
+        if r.random() < 0.5:
+            lines = [f'object-group service {name} {r.choice(("tcp", "udp", "tcp-udp"))}']
+            lines += [f' port-object {self._port()}' for _ in range(r.randrange(1, 15))]
+            return lines
+        lines = [f'object-group service {name}']
+        for _ in range(r.randrange(1, 15)):
+            if r.random() < 0.4 and self.services:
+                lines.append(f' service-object object {r.choice(self.services)}')
+            else:
+                lines.append(f' service-object {r.choice(("tcp", "udp"))} destination {self._port()}')
+        self.service_groups.append(name)
+        return lines
+
+    def _address(self) -> str:
+        r = self.random
+        choice = r.random()
+        if choice < 0.2:
+            return 'any'
+        if choice < 0.4:
+            return f'host {self._ip()}'
+        if choice < 0.55:
+            return self._subnet()
+        if choice < 0.8 and self.objects:
+            return f'object {r.choice(self.objects)}'
+        if self.groups:
+            return f'object-group {r.choice(self.groups)}'
+        return 'any'
+
+    def access_list(self) -> list:
+        r = self.random
+        number = r.randrange(len(INTERFACES))
+        acl = f'acl_{number}'
+        self.acls.add(number)
+        lines = [f'access-list {acl} remark generated rule'] if r.random() < 0.1 else []
+        action = 'permit' if r.random() < 0.8 else 'deny'
+        choice = r.random()
+        if choice < 0.2 and self.services:
+            service = f'object {r.choice(self.services)}'
+        elif choice < 0.35 and self.service_groups:
+            service = f'object-group {r.choice(self.service_groups)}'
+        else:
+            protocol = r.choice(('tcp', 'udp', 'ip', 'icmp'))
+            ports = f' {self._port()}' if protocol in ('tcp', 'udp') and r.random() < 0.8 else ''
+            rule = f'access-list {acl} extended {action} {protocol} {self._address()} {self._address()}{ports}'
+            return lines + [rule + (' log' if r.random() < 0.3 else '')]
+        return lines + [f'access-list {acl} extended {action} {service} {self._address()} {self._address()}']
+
+    def generate(self, size: int):
+        yield 'hostname generated-asa\n'
+        count = 1
+        kinds = list(self.mix)
+        weights = [self.mix[kind] for kind in kinds]
+        while count < size:
+            for line in getattr(self, self.random.choices(kinds, weights)[0])():
+                yield line + '\n'
+                count += 1
+        for number in sorted(self.acls):
+            yield f'access-group acl_{number} in interface {INTERFACES[number]}\n'
+
+    def write(self, file_name: str, size: int):
+        with open(file_name, 'w') as f:
+            f.writelines(self.generate(size))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic ASA config')
+    parser.add_argument('lines', type=int, help='approximate number of config lines')
+    parser.add_argument('-o', '--output', default='generated_asa_config.txt')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    ConfigGenerator(seed=args.seed).write(args.output, args.lines)
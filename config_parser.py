@@ -1,7 +1,8 @@
-import json
 import ipaddress
 from ciscoconfparse import CiscoConfParse, IOSCfgLine
 import settings
+import stream
+import sys
 
 
 def parse_serv_obj(config)->dict:
@@ -140,7 +141,8 @@ def main():
         config_elements['object_service'] = parse_serv_obj(config=parsed_config)
         config_elements['object_network'] = parse_netw_obj(config=parsed_config)
         config_elements['object-group_network'] = parse_netw_obj_groups(config=parsed_config)
-        print(json.dumps(config_elements, indent=4))
+        # records of this parser carry no parser version, upload --import only reads exports of main.py parse
+        stream.Writer(sys.stdout).write_sections(config_elements)
 
 
 if __name__ == '__main__':
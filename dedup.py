@@ -0,0 +1,96 @@
+import json
+import logging
+import os
+
+import fmc_api
+import settings
+
+
+class Deduplicator:
+    def __init__(self, index=None):
+        # prefetched FMC objects, a config object with the value of one of them reuses it
+        self.index = index
+        # (FMC type, normalized value) -> name of the object that is kept
+        self.canonical = {}
+        # name of a dropped duplicate -> canonical name
+        self.aliases = {}
+        # FMC object reused in place of config objects -> the config object it stands in for
+        self.reused = {}
+        self.stats = {'objects': 0, 'reused': 0, 'literals': 0, 'members': 0}
+
+    @staticmethod
+    def key(item: dict) -> tuple:
+        fmc_type = fmc_api.OBJECT_TYPES[item['type']]
+        return fmc_type, fmc_api.ObjectIndex.normalize(fmc_type, item['value'])
+
+    def run(self, config_elements: dict) -> dict:
+        self._dedup_objects(config_elements.get('object_network', {}))
+        for group in config_elements.get('object-group_network', {}).values():
+            self._dedup_group(group)
+        logging.info(f"Deduplication: {self.stats['objects']} objects aliased "
+                     f"({self.stats['reused']} to objects already on FMC), "
+                     f"{self.stats['literals']} literals replaced by objects, "
+                     f"{self.stats['members']} repeated members dropped")
+        return self.aliases
+
+    def _dedup_objects(self, objects: dict):
+        for name, item in list(objects.items()):
+            if 'type' not in item or 'value' not in item:
+                continue
+            key = self.key(item)
+            if key not in self.canonical and self.index is not None:
+                existing = self.index.find(*key)
+                # an FMC object that a config object of the same name is about to change is not reused
+                if existing is not None and existing != name and existing not in objects:
+                    self.canonical[key] = existing
+                    self.reused[existing] = {**item, 'name': existing}
+                    self.stats['reused'] += 1
+            canonical = self.canonical.setdefault(key, name)
+            if canonical != name:
+                self.aliases[name] = canonical
+                del objects[name]
+                self.stats['objects'] += 1
+
+    def _dedup_group(self, group: dict):
+        objects = []
+        seen = set()
+        for ref in group['objects']:
+            name = self.aliases.get(ref['name'], ref['name'])
+            if name in seen:
+                self.stats['members'] += 1
+                continue
+            seen.add(name)
+            objects.append(self._ref(ref, name) if name != ref['name'] else ref)
+
+        literals = []
+        seen_literals = set()
+        for literal in group['literals']:
+            key = self.key(literal)
+            canonical = self.canonical.get(key)
+            if canonical is not None:
+                # an object with the same value exists, reference it instead of repeating the value
+                self.stats['literals'] += 1
+                if canonical not in seen:
+                    seen.add(canonical)
+                    objects.append(self._ref({}, canonical))
+            elif key in seen_literals:
+                self.stats['members'] += 1
+            else:
+                seen_literals.add(key)
+                literals.append(literal)
+
+        group['objects'] = objects
+        group['literals'] = literals
+
+    def _ref(self, ref: dict, name: str) -> dict:
+        if name not in self.reused:
+            return {**ref, 'name': name}
+        # nothing in this run creates the FMC object, the reference carries its id like other reused members
+        entry = self.index.get(fmc_api.namespace(self.reused[name]['type']), name)
+        return {**ref, 'name': name, 'id': entry['id'], 'type': entry['type']}
+
+    def save(self, file_name=settings.ALIAS_MAP_FILE):
+        os.makedirs(os.path.dirname(file_name) or '.', exist_ok=True)
+        with open(file_name, 'w') as f:
+            json.dump(self.aliases, f, indent=4)
+        logging.info(f'Alias map saved to {file_name}')
@@ -1,70 +1,518 @@
 from typing import Union
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+import hashlib
+import ipaddress
+import random
+import threading
+import time
+from metrics import METRICS
+import model
 import settings
 import requests
+from requests.adapters import HTTPAdapter
 import logging
-import json
+
+# parsed (asa_api) and native FMC type names -> FMC object type
+OBJECT_TYPES = {
+    'host': 'Host',
+    'Host': 'Host',
+    'subnet': 'Network',
+    'Network': 'Network',
+    'range': 'Range',
+    'Range': 'Range',
+    'fqdn': 'FQDN',
+    'FQDN': 'FQDN',
+    'NetworkGroup': 'NetworkGroup',
+    'ProtocolPortObject': 'ProtocolPortObject',
+    'ICMPV4Object': 'ICMPV4Object',
+    'ICMPV6Object': 'ICMPV6Object',
+    'PortObjectGroup': 'PortObjectGroup',
+    'SecurityZone': 'SecurityZone',
+}
+
+OBJECT_PATHS = {
+    'Host': 'hosts',
+    'Network': 'networks',
+    'Range': 'ranges',
+    'FQDN': 'fqdns',
+    'NetworkGroup': 'networkgroups',
+    'ProtocolPortObject': 'protocolportobjects',
+    'ICMPV4Object': 'icmpv4objects',
+    'ICMPV6Object': 'icmpv6objects',
+    'PortObjectGroup': 'portobjectgroups',
+    # only looked up, zones come with the device interfaces
+    'SecurityZone': 'securityzones',
+}
+GROUP_TYPES = ('NetworkGroup', 'PortObjectGroup')
+# FMC object type -> the namespace its names are unique in
+NAMESPACES = {
+    'Host': 'network',
+    'Network': 'network',
+    'Range': 'network',
+    'FQDN': 'network',
+    'NetworkGroup': 'network',
+    'ProtocolPortObject': 'port',
+    'ICMPV4Object': 'port',
+    'ICMPV6Object': 'port',
+    'PortObjectGroup': 'port',
+    'SecurityZone': 'zone',
+}
+
 
 class ConnError(Exception):
     pass
 
+
+class RateGovernor:
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, rate=settings.FMC_RATE_LIMIT, burst=settings.FMC_RATE_BURST,
+                 max_retries=settings.FMC_MAX_RETRIES, backoff_base=settings.FMC_BACKOFF_BASE,
+                 backoff_max=settings.FMC_BACKOFF_MAX):
+        self.fill_rate = rate / 60
+        self.capacity = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        # wall-clock time with at least one caller held back, and the sum of every caller's waits
+        self.throttled_time = 0.0
+        self.thread_wait_time = 0.0
+        self._throttled_until = 0.0
+
+    def acquire(self, endpoint=None):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.fill_rate)
+            self._updated = now
+            # a negative balance reserves a slot for this caller in the queue
+            self._tokens -= 1
+            wait = max(-self._tokens / self.fill_rate, self._paused_until - now, 0.0)
+            self.requests += 1
+            self._throttle(now, wait)
+        if wait:
+            if endpoint:
+                METRICS.throttled(endpoint, wait)
+            time.sleep(wait)
+
+    def _throttle(self, now: float, wait: float):
+        # called under the lock with a non-decreasing now, so overlapping waits are counted once
+        end = now + wait
+        self.throttled_time += max(0.0, end - max(now, self._throttled_until))
+        self._throttled_until = max(self._throttled_until, end)
+        self.thread_wait_time += wait
+
+    def pause(self, delay: float):
+        # FMC answered 429: hold back every caller, not just the one that got it
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    def retry_delay(self, r: Union[requests.Response, None], attempt: int) -> float:
+        retry_after = r.headers.get('Retry-After') if r is not None else None
+        if retry_after:
+            try:
+                return max(float(retry_after), 0.0)
+            except ValueError:
+                try:
+                    return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+                except (TypeError, ValueError):
+                    pass
+        cap = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return random.uniform(cap / 2, cap)
+
+    def send(self, do_request, endpoint=None) -> requests.Response:
+        # endpoint: Metrics.endpoint() of the request, its retries and waits are counted for it as well
+        attempt = 0
+        while True:
+            self.acquire(endpoint)
+            try:
+                r = do_request()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as err:
+                if attempt >= self.max_retries:
+                    raise
+                r = None
+                reason = str(err)
+            else:
+                if r.status_code not in self.RETRY_STATUSES or attempt >= self.max_retries:
+                    return r
+                reason = f'HTTP {r.status_code}'
+            delay = self.retry_delay(r, attempt)
+            attempt += 1
+            with self._lock:
+                self.retries += 1
+            if endpoint:
+                METRICS.retry(endpoint)
+            logging.warning(f'{reason}, retrying in {delay:.1f}s (attempt {attempt}/{self.max_retries})')
+            if r is not None and r.status_code == 429:
+                # the wait is spent (and counted) in acquire()
+                self.pause(delay)
+            else:
+                with self._lock:
+                    self._throttle(time.monotonic(), delay)
+                if endpoint:
+                    METRICS.throttled(endpoint, delay)
+                time.sleep(delay)
+
+    def report(self) -> dict:
+        return {
+            'requests': self.requests,
+            'retries': self.retries,
+            'throttled_time': round(self.throttled_time, 3),
+            'thread_wait_time': round(self.thread_wait_time, 3),
+        }
+
+
+class TokenManager:
+    def __init__(self, fmc: 'FMC', lifetime=settings.FMC_TOKEN_LIFETIME,
+                 refresh_margin=settings.FMC_TOKEN_REFRESH_MARGIN, max_refreshes=settings.FMC_TOKEN_MAX_REFRESHES):
+        self.fmc = fmc
+        self.lifetime = lifetime
+        self.refresh_margin = refresh_margin
+        self.max_refreshes = max_refreshes
+        self.access_token = None
+        self.refresh_token = None
+        self.issued_at = 0.0
+        self.refresh_count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.issued_at
+
+    def get(self) -> str:
+        if self.age < self.lifetime - self.refresh_margin:
+            return self.access_token
+        if self.age < self.lifetime:
+            # token is still valid: one thread renews it, the others keep going with the old one
+            if self._lock.acquire(blocking=False):
+                try:
+                    if self.age >= self.lifetime - self.refresh_margin:
+                        self._renew()
+                finally:
+                    self._lock.release()
+            return self.access_token
+        with self._lock:
+            if self.age >= self.lifetime:
+                self._renew()
+        return self.access_token
+
+    def renew(self, stale: str) -> str:
+        with self._lock:
+            # another thread may already have replaced the rejected token
+            if self.access_token == stale:
+                self._renew()
+        return self.access_token
+
+    def generate(self):
+        auth_url = f'{self.fmc.base_url}/api/fmc_platform/v1/auth/generatetoken'
+        try:
+            r = self.fmc.governor.send(lambda: self.fmc._timed(
+                'POST', auth_url, headers={'Content-Type': 'application/json'},
+                auth=requests.auth.HTTPBasicAuth(self.fmc.login, self.fmc.password), timeout=5),
+                METRICS.endpoint('POST', auth_url))
+            r.raise_for_status()
+            self._store(r)
+            self.fmc.domain_uuid = r.headers['DOMAIN_UUID']
+        except Exception as err:
+            logging.error(f"Error in generating auth token --> {str(err)} !")
+            raise ConnError('Cannot get auth token!')
+        self.refresh_count = 0
+
+    def refresh(self):
+        refresh_url = f'{self.fmc.base_url}/api/fmc_platform/v1/auth/refreshtoken'
+        headers = {
+            'Content-Type': 'application/json',
+            'X-auth-access-token': self.access_token,
+            'X-auth-refresh-token': self.refresh_token,
+        }
+        r = self.fmc.governor.send(lambda: self.fmc._timed('POST', refresh_url, headers=headers, timeout=5),
+                                   METRICS.endpoint('POST', refresh_url))
+        r.raise_for_status()
+        self._store(r)
+        self.refresh_count += 1
+
+    def _renew(self):
+        if self.refresh_count < self.max_refreshes:
+            try:
+                self.refresh()
+                logging.info(f'Auth token refreshed ({self.refresh_count}/{self.max_refreshes})')
+                return
+            except Exception as err:
+                logging.warning(f'Error in refreshing auth token --> {str(err)}, re-authenticating...')
+        else:
+            logging.info('Refresh budget is used up, re-authenticating...')
+        self.generate()
+        logging.info('Auth token re-generated successfully')
+
+    def _store(self, r: requests.Response):
+        self.access_token = r.headers['X-auth-access-token']
+        self.refresh_token = r.headers['X-auth-refresh-token']
+        self.issued_at = time.monotonic()
+
+
+def namespace(item_type: str) -> str:
+    return NAMESPACES[OBJECT_TYPES[item_type]]
+
+
+class ObjectIndex:
+    def __init__(self):
+        # (namespace, name) -> entry, a network object, a port object and a zone may share a name
+        self.by_name = {}
+        self.by_value = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.by_name)
+
+    @staticmethod
+    def normalize(fmc_type: str, value: str) -> str:
+        try:
+            if fmc_type == 'Host':
+                return ipaddress.ip_address(value).exploded
+            if fmc_type == 'Network':
+                return ipaddress.ip_network(value, strict=False).exploded
+        except ValueError:
+            pass
+        return value.lower() if fmc_type == 'FQDN' else value
+
+    def add(self, name: str, obj_id: str, fmc_type: str, value: Union[None, str] = None,
+            fingerprint: Union[None, str] = None):
+        value_key = (fmc_type, self.normalize(fmc_type, value)) if value else None
+        with self._lock:
+            self.by_name[NAMESPACES[fmc_type], name] = {'id': obj_id, 'type': fmc_type, 'fingerprint': fingerprint,
+                                                        'value_key': value_key}
+            if value_key:
+                self.by_value.setdefault(value_key, name)
+
+    def remove(self, namespace: str, name: str):
+        with self._lock:
+            entry = self.by_name.pop((namespace, name), None)
+            if entry and self.by_value.get(entry['value_key']) == name:
+                del self.by_value[entry['value_key']]
+
+    def get(self, namespace: str, name: str) -> Union[None, dict]:
+        return self.by_name.get((namespace, name))
+
+    def get_id(self, namespace: str, name: str) -> Union[None, str]:
+        entry = self.by_name.get((namespace, name))
+        return entry['id'] if entry else None
+
+    def find(self, fmc_type: str, value: str) -> Union[None, str]:
+        # name of an object with this value, whatever it is called
+        return self.by_value.get((fmc_type, self.normalize(fmc_type, value)))
+
+
+def object_value(item: dict) -> Union[None, str]:
+    # port objects have no value field, their protocol and port identify them instead
+    fmc_type = item['type']
+    if fmc_type == 'ProtocolPortObject':
+        protocol = str(item.get('protocol', ''))
+        return f"{settings.protocol_mapping.get(protocol.lower(), protocol)}/{item.get('port', '')}"
+    if fmc_type in ('ICMPV4Object', 'ICMPV6Object'):
+        return f"{item.get('icmpType', '')}/{item.get('code', '')}"
+    return item.get('value')
+
+
+def fingerprint(item: dict) -> str:
+    # same digest for a parsed item and its FMC counterpart when their content matches
+    fmc_type = OBJECT_TYPES[item['type']]
+    parts = [fmc_type, (item.get('description') or '').strip()]
+    if fmc_type in GROUP_TYPES:
+        parts += sorted(ref['name'] for ref in item.get('objects', []))
+        parts += sorted(f"{literal['type']}:{ObjectIndex.normalize(literal['type'], literal['value'])}"
+                        for literal in item.get('literals', []))
+    else:
+        parts.append(ObjectIndex.normalize(fmc_type, object_value(item) or ''))
+    return hashlib.sha1('\n'.join(parts).encode()).hexdigest()
+
+
 class FMC:
-    def __init__(self, login=settings.FMC_LOGIN, password=settings.FMC_PASSWORD, host=settings.FMC_HOST):
+    def __init__(self, login=settings.FMC_LOGIN, password=settings.FMC_PASSWORD, host=settings.FMC_HOST,
+                 max_workers=settings.FMC_MAX_WORKERS, journal=None):
         self.login = login
         self.password = password
         self.host = host
+        self.base_url = f'{settings.FMC_SCHEME}://{host}'
         self.domain_uuid = None
-        self._auth_token = None
+        self.headers = {'Content-Type': 'application/json'}
+        self.governor = RateGovernor()
+        self.token = TokenManager(self)
+        self.index = ObjectIndex()
+        # (namespace, name) of the groups that were refused because a member has no FMC id
+        self.failed = set()
+        self.journal = journal
+        self.max_workers = max_workers
+        # one keep-alive pool shared by all worker threads
+        self.session = requests.Session()
+        self.session.verify = False
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fmc')
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 
     def connect(self):
         requests.packages.urllib3.disable_warnings()
-        auth_url = f'https://{self.host}/api/fmc_platform/v1/auth/generatetoken'
-        self.headers = {'Content-Type': 'application/json'}
-        logging.info(f'Connecting to FMC {settings.FMC_HOST}...')
+        logging.info(f'Connecting to FMC {self.host}...')
+        self.token.generate()
+        logging.info('...Connected! Auth token collected successfully')
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', settings.FMC_TIMEOUT)
+
+        def send():
+            token = self.token.get()
+            r = self._timed(method, url, headers={**self.headers, 'X-auth-access-token': token}, **kwargs)
+            if r.status_code == 401:
+                logging.warning('Auth token was rejected, renewing...')
+                token = self.token.renew(stale=token)
+                r = self._timed(method, url, headers={**self.headers, 'X-auth-access-token': token}, **kwargs)
+            return r
+
+        return self.governor.send(send, METRICS.endpoint(method, url, kwargs.get('params')))
+
+    def _timed(self, method: str, url: str, **kwargs) -> requests.Response:
+        start = time.perf_counter()
+        r = self.session.request(method, url, **kwargs)
+        METRICS.observe(METRICS.endpoint(method, url, kwargs.get('params')), r.status_code, time.perf_counter() - start)
+        return r
+
+    def prefetch(self, fmc_types=tuple(OBJECT_PATHS)) -> ObjectIndex:
+        logging.info('Fetching existing objects from FMC...')
+        first_pages = [(fmc_type, self._executor.submit(self._get_page, fmc_type, 0)) for fmc_type in fmc_types]
+        futures = []
+        for fmc_type, future in first_pages:
+            first_page = future.result()
+            self._index_page(first_page, fmc_type)
+            total = first_page.get('paging', {}).get('count', 0)
+            for offset in range(settings.FMC_PAGE_LIMIT, total, settings.FMC_PAGE_LIMIT):
+                futures.append((fmc_type, self._executor.submit(self._get_page, fmc_type, offset)))
+        for fmc_type, future in futures:
+            self._index_page(future.result(), fmc_type)
+        logging.info(f'...{len(self.index)} existing objects indexed')
+        return self.index
+
+    def _get_page(self, fmc_type: str, offset: int) -> dict:
+        params = {'limit': settings.FMC_PAGE_LIMIT, 'offset': offset, 'expanded': 'true'}
         try:
-            r = requests.post(auth_url, headers=self.headers,
-                              auth=requests.auth.HTTPBasicAuth(self.login, self.password), verify=False, timeout=5)
-            logging.info('...Connected! Auth token collected successfully')
-        except Exception as err:
-            logging.error(f"Error in generating auth token --> {str(err)} !")
-            raise ConnError('Cannot get auth token!')
+            r = self._request('GET', self._object_url(fmc_type), params=params)
+            r.raise_for_status()
+        except requests.exceptions.HTTPError as err:
+            logging.error(f"Error in fetching {OBJECT_PATHS[fmc_type]} --> {str(err)}")
+            raise ConnError
+        return r.json()
 
-        else:
-            self._auth_token = r.headers['X-auth-access-token']
-            self.domain_uuid = r.headers['DOMAIN_UUID']
-            self.headers['X-auth-access-token'] = self._auth_token
+    def _index_page(self, page: dict, fmc_type: str):
+        for obj in page.get('items', []):
+            obj.setdefault('type', fmc_type)
+            self.index.add(obj['name'], obj['id'], obj['type'], object_value(obj), fingerprint(obj))
 
+    def resolve_refs(self, obj_groups: list) -> None:
+        for obj_group in obj_groups:
+            # members are looked up among the objects a group of this type can hold
+            group_namespace = namespace(obj_group['type'])
+            for ref in obj_group['objects']:
+                if ref.get('id'):
+                    continue
+                entry = self.index.get(group_namespace, ref['name'])
+                if entry:
+                    ref['id'] = entry['id']
+                    ref['type'] = entry['type']
 
-    def post_objects(self, item: dict, item_type: str) -> Union[None,str]:
+    def existing_id(self, fmc_type: str, name: str) -> Union[None, str]:
+        # FMC says the name is taken. The object may be missing from the index: the first attempt of a
+        # retried POST was committed, or someone created it after the prefetch
+        item_namespace = NAMESPACES[fmc_type]
+        obj_id = self.index.get_id(item_namespace, name)
+        if obj_id:
+            return obj_id
+        # its own type first, FMC rejects the name for every type of the namespace
+        candidates = sorted((other for other in NAMESPACES if NAMESPACES[other] == item_namespace),
+                            key=lambda other: other != fmc_type)
+        for other in candidates:
+            params = {'filter': f'nameOrValue:{name}', 'limit': settings.FMC_PAGE_LIMIT, 'expanded': 'true'}
+            r = self._request('GET', self._object_url(other), params=params)
+            if r.status_code != 200:
+                logging.warning(f'Error in looking up {name} in {OBJECT_PATHS[other]} --> {r.text}')
+                continue
+            for obj in r.json().get('items', []):
+                if obj['name'] == name:
+                    obj.setdefault('type', other)
+                    self.index.add(obj['name'], obj['id'], obj['type'], object_value(obj), fingerprint(obj))
+                    return obj['id']
+        return None
 
-        api_path = f'/api/fmc_config/v1/domain/{self.domain_uuid}/object'
-
-        if item['type'] == 'Host':
-            api_path += '/hosts'
-        elif item['type'] == 'Range':
-            api_path += "/ranges"
-        elif item['type'] == 'Network':
-            api_path += "/networks"
-        elif item['type'] == 'FQDN':
-            api_path += "/fqdns"
-        elif item['type'] == 'NetworkGroup':
-            api_path += '/networkgroups'
-        else:
+    def _created(self, item: dict, obj_id: str, fmc_type: str):
+        item_fingerprint = fingerprint(item)
+        self.index.add(item['name'], obj_id, fmc_type, object_value(item), item_fingerprint)
+        if self.journal:
+            self.journal.record(item['name'], fmc_type, item_fingerprint, obj_id)
+
+    def restore(self, entries: dict):
+        for entry in entries.values():
+            self.index.add(entry['name'], entry['id'], entry['type'], fingerprint=entry['fingerprint'])
+
+    def _object_url(self, fmc_type: str) -> str:
+        api_path = f'/api/fmc_config/v1/domain/{self.domain_uuid}/object/{OBJECT_PATHS[fmc_type]}'
+        return f'{self.base_url}{api_path}'
+
+    @staticmethod
+    def _fmc_type(item: dict) -> str:
+        try:
+            return OBJECT_TYPES[item['type']]
+        except KeyError:
             raise ValueError('Wrong item type provided!')
 
-        url = f'https://{self.host}{api_path}'
+    def _payload(self, item: dict) -> dict:
+        return model.MODELS[self._fmc_type(item)].payload(item)
+
+    def complete(self, items: list, item_type: str) -> list:
+        # a group sent without some of its members would change what the rules using it match
+        accepted = []
+        for item in items:
+            item_namespace = namespace(item['type'])
+            missing = [ref['name'] for ref in item.get('objects', [])
+                       if not ref.get('id') or (item_namespace, ref['name']) in self.failed]
+            if missing:
+                self.failed.add((item_namespace, item['name']))
+                logging.error(f"{item_type} {item['name']}: members {', '.join(missing)} have no FMC id, not uploaded!")
+            else:
+                accepted.append(item)
+        return accepted
+
+    def post_objects(self, item: dict, item_type: str) -> Union[None,str]:
+
+        url = self._object_url(self._fmc_type(item))
         logging.info(f"Creating {item_type + item['name']}...")
 
         obj_id = None
 
         try:
-            r = requests.post(url, data=json.dumps(item), headers=self.headers, verify=False)
+            r = self._request('POST', url, data=model.dump(self._payload(item)))
             status_code = r.status_code
             resp = r.text
             if status_code == 201 or status_code == 202:
                 obj_id = r.json()['id']
+                self._created(item, obj_id, self._fmc_type(item))
                 logging.info(f"{item['name']} was successfully created!")
             elif status_code == 400:
+                obj_id = self.existing_id(self._fmc_type(item), item['name'])
                 logging.warning(f"{item['name']} already exists!")
             else:
                 r.raise_for_status()
@@ -75,3 +523,222 @@ class FMC:
 
         logging.info(f'POSTing of {item_type} is done!')
         return obj_id
+
+
+    def post_objects_bulk(self, items: list, item_type: str) -> dict:
+        by_type = {}
+        existing = 0
+        for item in items:
+            obj_id = self.index.get_id(namespace(item['type']), item['name'])
+            if obj_id:
+                item['id'] = obj_id
+                existing += 1
+            else:
+                by_type.setdefault(self._fmc_type(item), []).append(item)
+        by_type = {fmc_type: self.complete(typed_items, item_type) for fmc_type, typed_items in by_type.items()}
+        if existing:
+            logging.info(f'{existing} {item_type}s already exist on FMC and are skipped')
+
+        futures = []
+        for fmc_type, typed_items in by_type.items():
+            for start in range(0, len(typed_items), settings.FMC_BULK_LIMIT):
+                chunk = typed_items[start:start + settings.FMC_BULK_LIMIT]
+                futures.append(self._executor.submit(self._post_chunk, chunk, fmc_type, item_type))
+
+        ids = {}
+        for future in futures:
+            ids.update(future.result())
+
+        for item in items:
+            item['id'] = ids.get(item['name'], item.get('id'))
+        return ids
+
+    def _post_chunk(self, chunk: list, fmc_type: str, item_type: str) -> dict:
+        url = self._object_url(fmc_type)
+        logging.info(f'Creating {len(chunk)} {item_type}s of type {fmc_type} in bulk...')
+
+        ids = {}
+        pending = chunk
+        while pending:
+            try:
+                r = self._request('POST', url, data=model.dump_many(model.MODELS[fmc_type].payloads(pending)),
+                                  params={'bulk': 'true'})
+                status_code = r.status_code
+                resp = r.text
+                if status_code == 201 or status_code == 202:
+                    by_name = {item['name']: item for item in pending}
+                    for created in r.json().get('items', []):
+                        ids[created['name']] = created['id']
+                        item = by_name.get(created['name'], created)
+                        self._created(item, created['id'], fmc_type)
+                    for item in pending:
+                        if item['name'] not in ids:
+                            logging.error(f"{item['name']} is missing from bulk POST response!")
+                    if self.journal:
+                        self.journal.flush()
+                    pending = []
+                elif status_code == 400:
+                    failed = self._failed_items(r, pending)
+                    if not failed:
+                        # FMC did not say which items broke the batch, isolate them one by one
+                        logging.warning(f'Bulk POST of {fmc_type} rejected --> {resp}, falling back to single POSTs')
+                        for item in pending:
+                            ids[item['name']] = self.post_objects(item=item, item_type=item_type)
+                        pending = []
+                    else:
+                        for name, reason in failed.items():
+                            ids[name] = self.existing_id(fmc_type, name)
+                            logging.warning(f'{name} was rejected --> {reason}')
+                        pending = [item for item in pending if item['name'] not in failed]
+                else:
+                    r.raise_for_status()
+                    logging.error(f'Bulk POST of {fmc_type} encountered an error --> {resp}')
+                    raise ConnError(f'Bulk POST of {fmc_type} failed!')
+            except requests.exceptions.HTTPError as err:
+                logging.error(f"Error in connection --> {str(err)}")
+                raise ConnError
+
+        logging.info(f'Bulk POSTing of {len(chunk)} {item_type}s is done!')
+        return ids
+
+    @staticmethod
+    def _failed_items(r: requests.Response, items: list) -> dict:
+        try:
+            messages = r.json()['error']['messages']
+        except (ValueError, KeyError, TypeError):
+            return {}
+        names = {item['name'] for item in items}
+        failed = {}
+        for message in messages:
+            description = message.get('description', '')
+            for word in description.split():
+                word = word.strip('\'".,;:()')
+                if word in names:
+                    failed[word] = description
+        return failed
+
+    def put_objects(self, items: list, item_type: str) -> None:
+        items = self.complete(items, item_type)
+        for start in range(0, len(items), settings.FMC_BULK_LIMIT):
+            chunk = items[start:start + settings.FMC_BULK_LIMIT]
+            list(self._executor.map(lambda item: self._put_object(item, item_type), chunk))
+
+    def _put_object(self, item: dict, item_type: str) -> None:
+        fmc_type = self._fmc_type(item)
+        url = f"{self._object_url(fmc_type)}/{item['id']}"
+        logging.info(f"Updating {item_type + item['name']}...")
+        try:
+            r = self._request('PUT', url, data=model.dump(self._payload(item)))
+            if r.status_code == 200:
+                self.index.add(item['name'], item['id'], fmc_type, object_value(item), fingerprint(item))
+                logging.info(f"{item['name']} was successfully updated!")
+            else:
+                r.raise_for_status()
+                logging.error(f"{item['name']} encountered an error during PUT --> {r.text}")
+        except requests.exceptions.HTTPError as err:
+            logging.error(f"{item['name']} encountered an error during PUT --> {str(err)}: {r.text}")
+
+    def delete_objects(self, keys: list) -> None:
+        # keys: (namespace, name) of indexed objects
+        for start in range(0, len(keys), settings.FMC_BULK_LIMIT):
+            chunk = keys[start:start + settings.FMC_BULK_LIMIT]
+            list(self._executor.map(self._delete_object, chunk))
+
+    def _delete_object(self, key: tuple) -> None:
+        name = key[1]
+        entry = self.index.get(*key)
+        url = f"{self._object_url(entry['type'])}/{entry['id']}"
+        logging.info(f'Deleting {name}...')
+        try:
+            r = self._request('DELETE', url)
+            r.raise_for_status()
+            self.index.remove(*key)
+            logging.info(f'{name} was successfully deleted!')
+        except requests.exceptions.HTTPError as err:
+            # read-only and in-use objects are refused by FMC
+            logging.error(f'{name} encountered an error during DELETE --> {str(err)}: {r.text}')
+
+    def access_policy_id(self, name: str) -> str:
+        url = f'{self.base_url}/api/fmc_config/v1/domain/{self.domain_uuid}/policy/accesspolicies'
+        try:
+            r = self._request('GET', url, params={'name': name, 'limit': settings.FMC_PAGE_LIMIT})
+            r.raise_for_status()
+        except requests.exceptions.HTTPError as err:
+            logging.error(f"Error in fetching access policies --> {str(err)}")
+            raise ConnError
+        for policy in r.json().get('items', []):
+            if policy['name'] == name:
+                return policy['id']
+        logging.error(f'Access policy {name} not found on FMC!')
+        raise ConnError(f'Access policy {name} not found')
+
+    def _rules_url(self, policy_id: str) -> str:
+        return f'{self.base_url}/api/fmc_config/v1/domain/{self.domain_uuid}/policy/accesspolicies/{policy_id}/accessrules'
+
+    def access_rules(self, policy_id: str):
+        # every rule of the policy with its content, in policy order, one page held at a time
+        url = self._rules_url(policy_id)
+        offset, total = 0, 1
+        while offset < total:
+            params = {'limit': settings.FMC_PAGE_LIMIT, 'offset': offset, 'expanded': 'true'}
+            try:
+                r = self._request('GET', url, params=params)
+                r.raise_for_status()
+            except requests.exceptions.HTTPError as err:
+                logging.error(f"Error in fetching access rules --> {str(err)}")
+                raise ConnError
+            page = r.json()
+            yield from page.get('items', [])
+            total = page.get('paging', {}).get('count', 0)
+            offset += settings.FMC_PAGE_LIMIT
+
+    def post_access_rules(self, policy_id: str, rules: list, insert_before=None) -> list:
+        # one ordered chunk, appended or put in front of the rule at index insert_before (1-based)
+        # returns the ids of the rules that were created
+        url = self._rules_url(policy_id)
+        params = {'bulk': 'true'}
+        if insert_before is not None:
+            params['insertBefore'] = insert_before
+        logging.info(f'Creating {len(rules)} access rules in bulk...')
+        try:
+            r = self._request('POST', url, data=model.dump_many(model.AccessRule.payload(rule) for rule in rules),
+                              params=params)
+            if r.status_code == 201 or r.status_code == 202:
+                return [rule['id'] for rule in r.json().get('items', [])]
+            if r.status_code != 400:
+                r.raise_for_status()
+                logging.error(f'Bulk POST of access rules encountered an error --> {r.text}')
+                raise ConnError('Bulk POST of access rules failed!')
+            # one bad rule rejects the batch, post the rest one by one to keep their order
+            logging.warning(f'Bulk POST of access rules rejected --> {r.text}, falling back to single POSTs')
+            created = []
+            for rule in rules:
+                params = {} if insert_before is None else {'insertBefore': insert_before + len(created)}
+                r = self._request('POST', url, data=model.dump(model.AccessRule.payload(rule)), params=params)
+                if r.status_code == 201 or r.status_code == 202:
+                    created.append(r.json()['id'])
+                else:
+                    logging.error(f"Access rule {rule['name']} was rejected --> {r.text}")
+            return created
+        except requests.exceptions.HTTPError as err:
+            logging.error(f"Error in connection --> {str(err)}")
+            raise ConnError
+
+    def put_access_rule(self, policy_id: str, rule: dict) -> bool:
+        url = f"{self._rules_url(policy_id)}/{rule['id']}"
+        r = self._request('PUT', url, data=model.dump(model.AccessRule.payload(rule)))
+        if r.status_code == 200:
+            return True
+        logging.error(f"Access rule {rule['name']} encountered an error during PUT --> {r.text}")
+        return False
+
+    def delete_access_rules(self, policy_id: str, rules: list) -> list:
+        def delete(rule: dict) -> bool:
+            r = self._request('DELETE', f"{self._rules_url(policy_id)}/{rule['id']}")
+            if r.status_code == 200:
+                return True
+            logging.error(f"Access rule {rule['name']} encountered an error during DELETE --> {r.text}")
+            return False
+
+        # the rules that are gone, FMC may refuse some
+        return [rule for rule, deleted in zip(rules, self._executor.map(delete, rules)) if deleted]
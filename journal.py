@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+import threading
+
+import fmc_api
+import settings
+
+
+class Journal:
+    def __init__(self, file_name=settings.JOURNAL_FILE, batch_size=settings.JOURNAL_BATCH_SIZE):
+        self.file_name = file_name
+        self.batch_size = batch_size
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._file = None
+        # (namespace, name) -> id of the objects created by this run and the run it resumes
+        self.created = {}
+
+    def open(self, resume=False) -> dict:
+        entries = self.load() if resume else {}
+        self.created = {key: entry['id'] for key, entry in entries.items()}
+        self._file = open(self.file_name, 'a' if resume else 'w', encoding='utf-8')
+        if resume and self._file.tell():
+            with open(self.file_name, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    # a crash cut the last line short, the next record must not be appended to it
+                    self._file.write('\n')
+        return entries
+
+    def load(self) -> dict:
+        entries = {}
+        try:
+            with open(self.file_name, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # last line may be cut short by a crash
+                        logging.warning(f'Skipping damaged journal line: {line.strip()}')
+                        continue
+                    # a network object and a port object may share a name
+                    entries[fmc_api.NAMESPACES[entry['type']], entry['name']] = entry
+        except FileNotFoundError:
+            logging.warning(f'Journal {self.file_name} not found, starting from scratch')
+        logging.info(f'{len(entries)} completed creates read from journal')
+        return entries
+
+    def record(self, name: str, fmc_type: str, fingerprint: str, obj_id: str):
+        if self._file is None:
+            return
+        line = json.dumps({'name': name, 'type': fmc_type, 'fingerprint': fingerprint, 'id': obj_id})
+        with self._lock:
+            self.created[fmc_api.NAMESPACES[fmc_type], name] = obj_id
+            self._buffer.append(line)
+            if len(self._buffer) >= self.batch_size:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer or self._file is None:
+            return
+        self._file.write('\n'.join(self._buffer) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Ownership:
+    # the journal only covers one run, this keeps every object the tool ever created: namespace -> name -> id
+    # entries of files written before names were kept per namespace, their ids still tell the objects apart
+    LEGACY = '*'
+
+    def __init__(self, file_name=settings.OWNED_OBJECTS_FILE):
+        self.file_name = file_name
+        self.objects = self.load()
+
+    def load(self) -> dict:
+        try:
+            with open(self.file_name, encoding='utf-8') as f:
+                objects = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logging.error(f'{self.file_name} is damaged, no object is considered created by this tool')
+            return {}
+        if any(not isinstance(value, dict) for value in objects.values()):
+            return {self.LEGACY: objects}
+        return objects
+
+    def owns(self, namespace: str, name: str, obj_id: str) -> bool:
+        # same id, an object recreated by someone else under the name is not ours
+        if obj_id is None:
+            return False
+        return obj_id in (self.objects.get(namespace, {}).get(name), self.objects.get(self.LEGACY, {}).get(name))
+
+    def add(self, objects: dict):
+        # (namespace, name) -> id
+        for (namespace, name), obj_id in objects.items():
+            self.objects.setdefault(namespace, {})[name] = obj_id
+        self.save()
+
+    def discard(self, keys):
+        for namespace, name in keys:
+            self.objects.get(namespace, {}).pop(name, None)
+            self.objects.get(self.LEGACY, {}).pop(name, None)
+        self.save()
+
+    def save(self):
+        tmp_name = f'{self.file_name}.tmp'
+        with open(tmp_name, 'w', encoding='utf-8') as f:
+            json.dump(self.objects, f)
+        os.replace(tmp_name, self.file_name)
@@ -0,0 +1,69 @@
+import argparse
+import os
+import tempfile
+import time
+
+import settings
+from confgen import ConfigGenerator, DEFAULT_MIX, INTERFACES
+from mock_fmc import MockFMC
+
+
+def run(lines: int, latency: float, rate_limit: int, token_lifetime: int, seed: int) -> dict:
+    mock = MockFMC(latency=latency, rate_limit=rate_limit, token_lifetime=token_lifetime, zones=INTERFACES).start()
+    with tempfile.TemporaryDirectory() as directory:
+        config_file = os.path.join(directory, 'asa_config.txt')
+        ConfigGenerator(mix={**DEFAULT_MIX, 'access_list': 25}, seed=seed).write(config_file, lines)
+
+        # FMC/Asa take their defaults from settings at import time
+        settings.FMC_HOST = mock.address
+        settings.FMC_SCHEME = 'http'
+        settings.FMC_LOGIN = settings.FMC_LOGIN or 'loadtest'
+        settings.FMC_PASSWORD = settings.FMC_PASSWORD or 'loadtest'
+        settings.FMC_RATE_LIMIT = rate_limit or settings.FMC_RATE_LIMIT
+        settings.ASA_CONFIG = config_file
+        settings.PARSE_CACHE = False
+        # everything main() writes stays in the temp directory, ./log belongs to the real migration:
+        # --resume replays its journal, sync --delete trusts its ownership record, plan reads its report
+        settings.LOG_FILE = os.path.join(directory, 'app.log')
+        settings.ALIAS_MAP_FILE = os.path.join(directory, 'aliases.json')
+        settings.JOURNAL_FILE = os.path.join(directory, 'journal.jsonl')
+        settings.OWNED_OBJECTS_FILE = os.path.join(directory, 'owned.json')
+        settings.OWNED_RULES_FILE = os.path.join(directory, 'owned_rules.json')
+        settings.ANALYSIS_REPORT = os.path.join(directory, 'analysis.json')
+        settings.METRICS_REPORT = os.path.join(directory, 'report.json')
+        settings.METRICS_PROMETHEUS = None
+        settings.ACCESS_POLICY = MockFMC.ACCESS_POLICY
+        import main
+        main.setup_logging()
+
+        start = time.perf_counter()
+        governor = main.main()
+        duration = time.perf_counter() - start
+    mock.stop()
+
+    requests = sum(mock.stats.values())
+    return {
+        'config_lines': lines,
+        'duration': round(duration, 3),
+        'requests': requests,
+        'requests_per_second': round(requests / duration, 2),
+        'status_codes': dict(mock.stats),
+        'objects_created': len(mock.objects) - len(INTERFACES),
+        'rules_created': sum(len(policy['rules']) for policy in mock.policies.values()),
+        'throttled_time': governor['throttled_time'],
+        'thread_wait_time': governor['thread_wait_time'],
+        'retries': governor['retries'],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run main.main() end to end against a local mock FMC')
+    parser.add_argument('--lines', type=int, default=10_000, help='size of the generated ASA config')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every mock response')
+    parser.add_argument('--rate-limit', type=int, default=120, help='mock requests per minute, 0 disables it')
+    parser.add_argument('--token-lifetime', type=int, default=30 * 60, help='mock token lifetime in seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    report = run(args.lines, args.latency, args.rate_limit, args.token_lifetime, args.seed)
+    for key, value in report.items():
+        print(f'{key}: {value}')
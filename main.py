@@ -1,72 +1,270 @@
-import asa_api
-import settings
+import argparse
 import logging
 from logging.handlers import RotatingFileHandler
-import fmc_api
+import os
+import time
+
+import settings
+
+# everything else is imported by the function that needs it, so --help and imports stay instant
+
+
+def setup_logging():
+    os.makedirs(os.path.dirname(settings.LOG_FILE), exist_ok=True)
+    rotating_file_handler = RotatingFileHandler(
+        filename=settings.LOG_FILE,
+        mode='a',
+        maxBytes=settings.LOG_FILE_SIZE,
+        backupCount=2,
+        encoding='utf-8'
+    )
+    rotating_file_handler.setLevel(logging.DEBUG)
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setLevel(logging.DEBUG)
 
+    logging.basicConfig(format=u'%(filename)s [LINE:%(lineno)d] #%(levelname)-8s [%(asctime)s]  %(message)s',
+                        level=settings.LOGGING_LEVEL, handlers = [rotating_file_handler, stream_handler])
+
+
+def load_config(configs=None, workers=None) -> tuple:
+    import asa_api
+    import batch
+    from metrics import METRICS
+
+    config_file = settings.ASA_CONFIG
+    if configs:
+        config_files = batch.collect_configs(configs)
+        if len(config_files) != 1:
+            with METRICS.phase('batch_parse'):
+                return batch.load(config_files, workers=workers), None
+        # a single config is parsed like settings.ASA_CONFIG, its access-lists are migrated too
+        config_file = config_files[0]
+    asa = asa_api.Asa(config_file)
+    try:
+        with METRICS.phase('read'):
+            asa.read()
+    except asa_api.ConfigFileError:
+        exit()
+    return asa.parse(), asa
 
-rotating_file_handler = RotatingFileHandler(
-    filename='./log/app.log',
-    mode='a',
-    maxBytes=settings.LOG_FILE_SIZE,
-    backupCount=2,
-    encoding='utf-8'
-)
-rotating_file_handler.setLevel(logging.DEBUG)
 
-stream_handler = logging.StreamHandler()
-stream_handler.setLevel(logging.DEBUG)
+def export(file_name: str, configs=None, workers=None):
+    # parse only, the file can be uploaded later or elsewhere with --import
+    import asa_api
+    import stream
 
+    config_elements, asa = load_config(configs, workers)
+    if asa is not None:
+        asa.export(file_name)
+        return
+    with stream.open_output(file_name) as f:
+        writer = stream.Writer(f, asa_api.PARSER_VERSION)
+        writer.write_sections(config_elements)
+    logging.info(f'{writer.count} records exported to {file_name}')
 
-logging.basicConfig(format=u'%(filename)s [LINE:%(lineno)d] #%(levelname)-8s [%(asctime)s]  %(message)s',
-                    level=settings.LOGGING_LEVEL, handlers = [rotating_file_handler, stream_handler])
 
+def prepare(configs=None, workers=None, import_file=None, index=None, save=True) -> tuple:
+    # parse or import, then every transformation that happens before the upload
+    # save=False leaves the alias map and the analysis report of the last upload in place
+    # -> (config_elements, rule source or None, aliases of deduplicated objects)
+    import aggregate
+    import analyzer
+    import dedup
+    from metrics import METRICS
+    import resolver
+    import services
+    import stream
 
+    rule_source = None
+    if import_file:
+        try:
+            with METRICS.phase('import'):
+                config_elements = stream.load_sections(import_file)
+        except (OSError, stream.StreamError) as err:
+            logging.error(str(err))
+            exit()
+        rule_source = lambda: stream.access_rules(import_file, settings.ACCESS_LISTS, aliases)
+    else:
+        config_elements, asa = load_config(configs, workers)
+        if asa is not None:
+            rule_source = lambda: asa.access_rules(settings.ACCESS_LISTS, aliases)
+    aliases = {}
+    reused = {}
+    if settings.DEDUPLICATE:
+        with METRICS.phase('dedup'):
+            deduplicator = dedup.Deduplicator(index)
+            aliases = deduplicator.run(config_elements)
+            reused = deduplicator.reused
+            if save:
+                deduplicator.save()
+    if settings.FLATTEN_NESTED_GROUPS:
+        with METRICS.phase('flatten'):
+            try:
+                resolver.GroupResolver(config_elements.get('object-group_network', {})).flatten()
+            except resolver.ResolveError as err:
+                logging.error(str(err))
+                exit()
+    if settings.AGGREGATE_GROUPS:
+        with METRICS.phase('aggregate'):
+            aggregate.Aggregator(include_objects=settings.AGGREGATE_INCLUDE_OBJECTS).run(config_elements)
+    unreachable = set()
+    if settings.ANALYZE_RULES and rule_source:
+        # runs on the parsed service sections, before they are mapped to FMC port objects
+        with METRICS.phase('analyze'):
+            rule_analyzer = analyzer.RuleAnalyzer(config_elements, reused)
+            rule_analyzer.run(rule_source())
+            if save:
+                rule_analyzer.save()
+        if settings.EXCLUDE_UNREACHABLE_RULES:
+            unreachable = rule_analyzer.unreachable
+            logging.info(f'{len(unreachable)} shadowed and redundant rules are left out of the upload')
 
-# def get_id(obj_list:list[dict], obj_type: str) -> None:
-#     api_host = f"/api/fmc_config/v1/domain/{fmc.domain_uuid}/object/{obj_type}"
-#     url = settings.SERVER + api_host
-#     r = requests.get(url, headers=fmc.headers, verify=False)
-#     obj_amount = r.json()['paging']['count']
-#     params = {'limit': obj_amount}
-#     r = requests.get(url, headers=fmc.headers, verify=False, params=params)
-#     try:
-#         for i in r.json()['items']:
-#             for j in obj_list:
-#                 if j['name'] == i['name']:
-#                     j['id'] = i['id']
-#                     break
-#     except KeyError:
-#         pass
+    with METRICS.phase('services'):
+        services.ServiceMapper(index).run(config_elements)
+    if rule_source is None:
+        return config_elements, None, aliases
+    return config_elements, lambda: (rule for rule in rule_source() if rule['name'] not in unreachable), aliases
 
 
-def main():
-    logging.info('!!! Nested object-groups are not supported (group-object command inside object-group is ignored). Please add it manually!!!\n')
+def main(sync_mode=False, delete=False, configs=None, workers=None, resume=False, import_file=None):
+    import acl
+    import fmc_api
+    import journal
+    from metrics import METRICS
+    import scheduler
+    import sync
 
-    fmc = fmc_api.FMC()
+    run_start = time.perf_counter()
+    ownership = journal.Ownership()
+    create_journal = journal.Journal()
+    fmc = fmc_api.FMC(journal=create_journal)
+    fmc.restore(create_journal.open(resume=resume))
     try:
-        fmc.connect()
+        with METRICS.phase('connect'):
+            fmc.connect()
     except fmc_api.ConnError:
+        create_journal.close()
         exit()
+    if settings.PREFETCH:
+        with METRICS.phase('prefetch'):
+            fmc.prefetch()
 
-    asa = asa_api.Asa()
+    config_elements, rule_source, aliases = prepare(configs, workers, import_file, fmc.index)
+
+    def deploy_groups(obj_group_list: list, item_type: str):
+        fmc.resolve_refs(obj_group_list)
+        fmc.post_objects_bulk(items=obj_group_list, item_type=item_type)
+
+    if sync_mode:
+        syncer = sync.Sync(fmc, delete=delete, ownership=ownership)
+        # reused FMC objects stand in for config objects, they are not stale
+        syncer.seen.update(('network', name) for name in aliases.values())
+        handlers = syncer.handlers()
+    else:
+        handlers = {
+            'object': lambda network_obj_list: fmc.post_objects_bulk(items=network_obj_list, item_type='object'),
+            'object-group': lambda network_obj_group_list: deploy_groups(network_obj_group_list, 'object-group'),
+            'service': lambda serv_obj_list: fmc.post_objects_bulk(items=serv_obj_list, item_type='service'),
+            'service-group': lambda serv_obj_group_list: deploy_groups(serv_obj_group_list, 'service-group'),
+        }
     try:
-        asa.read()
-    except asa_api.ConfigFileError:
+        with METRICS.phase('upload'):
+            scheduler.run(scheduler.DeploymentGraph.from_config(config_elements), handlers)
+    except scheduler.CycleError as err:
+        logging.error(str(err))
         exit()
+    finally:
+        # whatever was created so far survives for --resume
+        create_journal.close()
+        ownership.add(create_journal.created)
+    if settings.ACCESS_POLICY:
+        if rule_source is None:
+            logging.warning('Access rules are migrated from a single config only, skipped for several --config files')
+        else:
+            uploader = acl.RuleUploader(fmc)
+            with METRICS.phase('access_rules'):
+                uploader.upload(rule_source)
+            METRICS.extra['access_rules'] = uploader.stats
+    if sync_mode:
+        with METRICS.phase('delete'):
+            syncer.remove_stale()
+        logging.info(f'Sync: {syncer.stats}')
+        METRICS.extra['sync'] = syncer.stats
+    if fmc.failed:
+        logging.error(f'{len(fmc.failed)} groups were not uploaded, their members have no FMC id')
+    METRICS.extra['failed_groups'] = sorted(name for _, name in fmc.failed)
+    fmc.close()
+    report = fmc.governor.report()
+    logging.info(f'FMC requests: {report}')
+    METRICS.extra['governor'] = report
+    METRICS.add_phase('total', time.perf_counter() - run_start)
+    METRICS.write(settings.METRICS_REPORT, prometheus_file=settings.METRICS_PROMETHEUS)
+    logging.info('Done!')
+    return report
 
-    network_obj_list = asa.parse_netw_obj()
 
-    for obj in network_obj_list:
-        obj['id'] = fmc.post_objects(item=obj, item_type='object')
+def plan(configs=None, workers=None, import_file=None, resume=False, latency=settings.PLAN_LATENCY,
+         output=settings.PLAN_REPORT):
+    # dry run: the requests an upload would send and how long they take, FMC is not contacted
+    import journal
+    import planner
 
-    # TODO: create model class, where data for posting is stored
+    dry_run = planner.Planner(latency=latency)
+    if resume:
+        dry_run.fmc.restore(journal.Journal().load())
+    config_elements, rule_source, _ = prepare(configs, workers, import_file, dry_run.fmc.index, save=False)
+    rules = rule_source() if settings.ACCESS_POLICY and rule_source else None
+    report = dry_run.run(config_elements, rules)
+    planner.save(report, output)
+    return report
 
-    network_obj_group_list = asa.parse_netw_obj_groups()
 
-    for obj_group in network_obj_group_list:
-        fmc.post_objects(item=obj_group, item_type='object-group')
-    logging.info('Done!')
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description='Migrate ASA objects and access-lists to FMC')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+
+    def add_source(subparser, importable=True):
+        subparser.add_argument('--config', nargs='+', metavar='PATH',
+                               help='config files or directories to migrate together instead of settings.ASA_CONFIG')
+        subparser.add_argument('--workers', type=int, help='parser processes for --config (default: CPU count)')
+        if importable:
+            subparser.add_argument('--import', dest='import_file', metavar='PATH',
+                                   help='read a `parse` export instead of parsing the config')
+
+    parse = commands.add_parser('parse', help='parse the config and write NDJSON records, FMC is not contacted')
+    add_source(parse, importable=False)
+    parse.add_argument('-o', '--output', default='-', metavar='PATH', help="output file, '-' for stdout (default)")
+
+    upload = commands.add_parser('upload', help='create objects and access rules on FMC (default)')
+    add_source(upload)
+    upload.add_argument('--resume', action='store_true', help='skip objects recorded in the journal of a previous run')
+
+    sync_ = commands.add_parser('sync', help='create new and update changed objects only')
+    add_source(sync_)
+    sync_.add_argument('--delete', action='store_true', help='delete FMC objects missing from config')
+    sync_.add_argument('--resume', action='store_true', help='skip objects recorded in the journal of a previous run')
+
+    plan_ = commands.add_parser('plan', help='project the FMC requests and duration of an upload without sending any')
+    add_source(plan_)
+    plan_.add_argument('--resume', action='store_true', help='skip objects recorded in the journal of a previous run')
+    plan_.add_argument('--latency', type=float, default=settings.PLAN_LATENCY,
+                       help='seconds per request for endpoints the last run report has no measurement for')
+    plan_.add_argument('-o', '--output', default=settings.PLAN_REPORT, metavar='PATH', help='plan report file')
+
+    args = parser.parse_args(argv)
+    setup_logging()
+    if args.command == 'parse':
+        export(args.output, configs=args.config, workers=args.workers)
+    elif args.command == 'plan':
+        plan(configs=args.config, workers=args.workers, import_file=args.import_file, resume=args.resume,
+             latency=args.latency, output=args.output)
+    elif args.command in ('upload', 'sync'):
+        main(sync_mode=args.command == 'sync', delete=getattr(args, 'delete', False), configs=args.config,
+             workers=args.workers, resume=args.resume, import_file=args.import_file)
+    else:
+        main()
+
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    cli()
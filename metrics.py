@@ -0,0 +1,137 @@
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import bisect
+import collections
+import json
+import logging
+import re
+import threading
+import time
+
+# upper bounds in seconds, the last bucket catches everything above
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_ID_SEGMENT = re.compile(r'/[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}(?=/|$)|/[0-9a-fA-F]{32}(?=/|$)')
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'buckets': {str(bound): count for bound, count in zip(self.buckets + ('+Inf',), self.counts)},
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.phases = collections.defaultdict(float)
+        self.latency = collections.defaultdict(Histogram)
+        self.status_codes = collections.defaultdict(collections.Counter)
+        # RateGovernor retries and seconds callers were held back, per endpoint as well
+        self.retries = collections.Counter()
+        self.throttle_wait = collections.defaultdict(float)
+        self.extra = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def add_phase(self, name: str, seconds: float):
+        with self._lock:
+            self.phases[name] += seconds
+
+    @staticmethod
+    def endpoint(method: str, url: str, params=None) -> str:
+        path = _ID_SEGMENT.sub('/{id}', urlsplit(url).path)
+        if params and params.get('bulk') == 'true':
+            path += '?bulk=true'
+        return f'{method} {path}'
+
+    def observe(self, endpoint: str, status: int, seconds: float):
+        with self._lock:
+            self.latency[endpoint].observe(seconds)
+            self.status_codes[endpoint][str(status)] += 1
+
+    def retry(self, endpoint: str):
+        with self._lock:
+            self.retries[endpoint] += 1
+
+    def throttled(self, endpoint: str, seconds: float):
+        with self._lock:
+            self.throttle_wait[endpoint] += seconds
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                'phases': {name: round(seconds, 6) for name, seconds in self.phases.items()},
+                'endpoints': {
+                    endpoint: {
+                        # a request that never got an answer has no latency
+                        'latency': self.latency.get(endpoint, Histogram()).to_dict(),
+                        'status_codes': dict(self.status_codes.get(endpoint, {})),
+                        'retries': self.retries[endpoint],
+                        'throttle_wait': round(self.throttle_wait.get(endpoint, 0.0), 6),
+                    }
+                    for endpoint in {**self.latency, **self.retries, **self.throttle_wait}
+                },
+                **self.extra,
+            }
+
+    def to_prometheus(self) -> str:
+        lines = ['# TYPE fmc_migration_phase_seconds gauge']
+        report = self.report()
+        for name, seconds in report['phases'].items():
+            lines.append(f'fmc_migration_phase_seconds{{phase="{name}"}} {seconds}')
+        lines.append('# TYPE fmc_request_duration_seconds histogram')
+        for endpoint, data in report['endpoints'].items():
+            labels = f'endpoint="{endpoint}"'
+            cumulative = 0
+            for bound, count in data['latency']['buckets'].items():
+                cumulative += count
+                lines.append(f'fmc_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"fmc_request_duration_seconds_sum{{{labels}}} {data['latency']['sum']}")
+            lines.append(f"fmc_request_duration_seconds_count{{{labels}}} {data['latency']['count']}")
+        lines.append('# TYPE fmc_requests_total counter')
+        for endpoint, data in report['endpoints'].items():
+            for status, count in data['status_codes'].items():
+                lines.append(f'fmc_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+        lines.append('# TYPE fmc_request_retries_total counter')
+        for endpoint, data in report['endpoints'].items():
+            lines.append(f'fmc_request_retries_total{{endpoint="{endpoint}"}} {data["retries"]}')
+        lines.append('# TYPE fmc_request_throttle_seconds_total counter')
+        for endpoint, data in report['endpoints'].items():
+            lines.append(f'fmc_request_throttle_seconds_total{{endpoint="{endpoint}"}} {data["throttle_wait"]}')
+        for key, value in report.items():
+            if isinstance(value, dict) and key not in ('phases', 'endpoints'):
+                for name, number in value.items():
+                    if isinstance(number, (int, float)):
+                        lines.append(f'fmc_migration_{key}_{name} {number}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, file_name: str, prometheus_file=None):
+        with open(file_name, 'w') as f:
+            json.dump(self.report(), f, indent=4)
+        logging.info(f'Run report saved to {file_name}')
+        if prometheus_file:
+            with open(prometheus_file, 'w') as f:
+                f.write(self.to_prometheus())
+            logging.info(f'Prometheus metrics saved to {prometheus_file}')
+
+
+METRICS = Metrics()
@@ -0,0 +1,321 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import collections
+import json
+import math
+import re
+import threading
+import time
+import uuid
+
+DOMAIN_UUID = 'e276abec-e0f2-11e3-8169-6d9ed49b625f'
+OBJECT_PATH = re.compile(r'^/api/fmc_config/v1/domain/(?P<domain>[^/]+)/object/(?P<kind>[a-z0-9]+)(?:/(?P<id>[^/]+))?$')
+TYPES = {
+    'hosts': 'Host',
+    'networks': 'Network',
+    'ranges': 'Range',
+    'fqdns': 'FQDN',
+    'networkgroups': 'NetworkGroup',
+    'protocolportobjects': 'ProtocolPortObject',
+    'icmpv4objects': 'ICMPV4Object',
+    'icmpv6objects': 'ICMPV6Object',
+    'portobjectgroups': 'PortObjectGroup',
+    'securityzones': 'SecurityZone',
+}
+# names are unique among network objects, among port objects and among zones, not across them
+NAMESPACES = {kind: 'network' for kind in ('hosts', 'networks', 'ranges', 'fqdns', 'networkgroups')}
+NAMESPACES.update({kind: 'port' for kind in
+                   ('protocolportobjects', 'icmpv4objects', 'icmpv6objects', 'portobjectgroups')})
+NAMESPACES['securityzones'] = 'zone'
+POLICY_PATH = re.compile(r'^/api/fmc_config/v1/domain/(?P<domain>[^/]+)/policy/accesspolicies'
+                         r'(?:/(?P<id>[^/]+)/accessrules(?:/(?P<rule>[^/]+))?)?$')
+
+
+class MockFMC:
+    ACCESS_POLICY = 'Mock Access Policy'
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, rate_limit=120, token_lifetime=30 * 60, zones=()):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.token_lifetime = token_lifetime
+        self.objects = {}
+        # namespace -> name -> id
+        self.names = collections.defaultdict(dict)
+        self.tokens = {}
+        self.policies = {uuid.uuid4().hex: {'name': self.ACCESS_POLICY, 'rules': []}}
+        self.stats = collections.Counter()
+        self._requests = collections.deque()
+        self._lock = threading.Lock()
+        for zone in zones:
+            self._create('securityzones', {'name': zone, 'interfaceMode': 'ROUTED'})
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'{host}:{port}'
+
+    def start(self) -> 'MockFMC':
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _throttled(self) -> int:
+        # seconds until a request slot frees up, 0 when the request is accepted
+        now = time.monotonic()
+        with self._lock:
+            while self._requests and now - self._requests[0] > 60:
+                self._requests.popleft()
+            if self.rate_limit and len(self._requests) >= self.rate_limit:
+                return math.ceil(60 - (now - self._requests[0]))
+            self._requests.append(now)
+        return 0
+
+    def _new_token(self) -> dict:
+        headers = {
+            'X-auth-access-token': uuid.uuid4().hex,
+            'X-auth-refresh-token': uuid.uuid4().hex,
+            'DOMAIN_UUID': DOMAIN_UUID,
+        }
+        with self._lock:
+            self.tokens[headers['X-auth-access-token']] = (time.monotonic(), headers['X-auth-refresh-token'])
+        return headers
+
+    def _token_valid(self, token: str) -> bool:
+        issued = self.tokens.get(token)
+        return issued is not None and time.monotonic() - issued[0] < self.token_lifetime
+
+    def _create(self, kind: str, item: dict):
+        with self._lock:
+            names = self.names[NAMESPACES[kind]]
+            if item.get('name') in names:
+                return None
+            obj = {**item, 'id': uuid.uuid4().hex, 'type': TYPES[kind]}
+            self.objects[obj['id']] = (kind, obj)
+            names[obj['name']] = obj['id']
+        return obj
+
+    def _handler(self):
+        fmc = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive like FMC, the client's pooled connections are reused
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body=None, headers=None):
+                data = json.dumps(body).encode() if body is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+                with fmc._lock:
+                    fmc.stats[status] += 1
+
+            def _error(self, status: int, description: str):
+                self._send(status, {'error': {'category': 'FRAMEWORK', 'severity': 'ERROR',
+                                              'messages': [{'description': description}]}})
+
+            def _body(self):
+                return json.loads(self._data) if self._data else None
+
+            def _dispatch(self, method: str):
+                # read even when the request is refused, leftovers would be taken for the next request
+                self._data = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                time.sleep(fmc.latency)
+                url = urlsplit(self.path)
+                query = parse_qs(url.query)
+                retry_after = fmc._throttled()
+                if retry_after:
+                    return self._send(429, headers={'Retry-After': str(retry_after)})
+
+                if url.path == '/api/fmc_platform/v1/auth/generatetoken' and method == 'POST':
+                    if 'Authorization' not in self.headers:
+                        return self._error(401, 'Missing credentials')
+                    return self._send(204, headers=fmc._new_token())
+                if url.path == '/api/fmc_platform/v1/auth/refreshtoken' and method == 'POST':
+                    issued = fmc.tokens.get(self.headers.get('X-auth-access-token'))
+                    if issued is None or issued[1] != self.headers.get('X-auth-refresh-token'):
+                        return self._error(401, 'Invalid refresh token')
+                    return self._send(204, headers=fmc._new_token())
+
+                if not fmc._token_valid(self.headers.get('X-auth-access-token')):
+                    return self._error(401, 'Access token invalid')
+
+                match = POLICY_PATH.match(url.path)
+                if match is not None:
+                    return self._policy(method, match['id'], match['rule'], query,
+                                        self._body() if method in ('POST', 'PUT') else None)
+
+                match = OBJECT_PATH.match(url.path)
+                if match is None or match['kind'] not in TYPES:
+                    return self._error(404, f'{url.path} not found')
+                kind, obj_id = match['kind'], match['id']
+
+                if method == 'GET':
+                    return self._get(kind, query)
+                if method == 'POST':
+                    return self._post(kind, self._body(), query.get('bulk') == ['true'])
+                if method == 'PUT' and obj_id:
+                    return self._put(kind, obj_id, self._body())
+                if method == 'DELETE' and obj_id:
+                    return self._delete(obj_id)
+                return self._error(405, f'{method} not allowed')
+
+            def _get(self, kind: str, query: dict):
+                limit = int(query.get('limit', ['25'])[0])
+                offset = int(query.get('offset', ['0'])[0])
+                items = [obj for obj_kind, obj in list(fmc.objects.values()) if obj_kind == kind]
+                if query.get('filter', [''])[0].startswith('nameOrValue:'):
+                    # case-insensitive substring of the name or the value, like FMC
+                    text = query['filter'][0][len('nameOrValue:'):].lower()
+                    items = [obj for obj in items
+                             if text in obj['name'].lower() or text in str(obj.get('value', '')).lower()]
+                page = items[offset:offset + limit]
+                if query.get('expanded') != ['true']:
+                    page = [{key: obj[key] for key in ('id', 'name', 'type')} for obj in page]
+                paging = {'offset': offset, 'limit': limit, 'count': len(items),
+                          'pages': (len(items) + limit - 1) // limit}
+                self._send(200, {'items': page, 'paging': paging})
+
+            def _post(self, kind: str, body, bulk: bool):
+                if not bulk:
+                    obj = fmc._create(kind, body)
+                    if obj is None:
+                        return self._error(400, f"The object name {body.get('name')} already exists. Enter a new name.")
+                    return self._send(201, obj)
+                if len(body) > 1000:
+                    return self._error(400, 'Bulk payload exceeds 1000 objects')
+                duplicates = [item['name'] for item in body if item.get('name') in fmc.names[NAMESPACES[kind]]]
+                if duplicates:
+                    # FMC rejects the whole batch and names the offending objects
+                    return self._send(400, {'error': {'category': 'FRAMEWORK', 'severity': 'ERROR', 'messages': [
+                        {'description': f'The object name {name} already exists. Enter a new name.'}
+                        for name in duplicates]}})
+                self._send(201, {'items': [fmc._create(kind, item) for item in body]})
+
+            def _policy(self, method: str, policy_id, rule_id, query: dict, body):
+                if policy_id is None and method == 'GET':
+                    items = [{'id': key, 'name': policy['name'], 'type': 'AccessPolicy'}
+                             for key, policy in fmc.policies.items()
+                             if 'name' not in query or policy['name'] == query['name'][0]]
+                    return self._send(200, {'items': items, 'paging': {'offset': 0, 'count': len(items), 'pages': 1}})
+                if policy_id not in fmc.policies:
+                    return self._error(404, f'{self.path} not found')
+                policy_rules = fmc.policies[policy_id]['rules']
+                if rule_id is not None:
+                    return self._rule(method, policy_rules, rule_id, body)
+                if method == 'GET':
+                    limit = int(query.get('limit', ['25'])[0])
+                    offset = int(query.get('offset', ['0'])[0])
+                    page = policy_rules[offset:offset + limit]
+                    if query.get('expanded') != ['true']:
+                        page = [{key: rule[key] for key in ('id', 'name', 'type')} for rule in page]
+                    return self._send(200, {'items': page, 'paging': {'offset': offset, 'limit': limit,
+                                                                      'count': len(policy_rules)}})
+                if method != 'POST':
+                    return self._error(405, f'{method} not allowed')
+                rules = body if query.get('bulk') == ['true'] else [body]
+                if len(rules) > 1000:
+                    return self._error(400, 'Bulk payload exceeds 1000 rules')
+                for rule in rules:
+                    if not rule.get('name') or rule.get('action') not in ('ALLOW', 'BLOCK', 'TRUST', 'MONITOR'):
+                        return self._error(400, f"Invalid access rule {rule.get('name')}")
+                with fmc._lock:
+                    names = {rule['name'] for rule in policy_rules}
+                    duplicates = [rule['name'] for rule in rules if rule['name'] in names]
+                    if not duplicates:
+                        # in request order, appended or in front of the rule at the 1-based insertBefore index
+                        created = [{**rule, 'id': uuid.uuid4().hex, 'type': 'AccessRule'} for rule in rules]
+                        at = int(query['insertBefore'][0]) - 1 if 'insertBefore' in query else len(policy_rules)
+                        policy_rules[at:at] = created
+                if duplicates:
+                    return self._send(400, {'error': {'category': 'FRAMEWORK', 'severity': 'ERROR', 'messages': [
+                        {'description': f'The rule name {name} already exists. Enter a new name.'}
+                        for name in duplicates]}})
+                if query.get('bulk') == ['true']:
+                    return self._send(201, {'items': created})
+                self._send(201, created[0])
+
+            def _rule(self, method: str, policy_rules: list, rule_id: str, body):
+                status, rule = 200, None
+                with fmc._lock:
+                    position = next((i for i, rule in enumerate(policy_rules) if rule['id'] == rule_id), None)
+                    if position is None:
+                        status = 404
+                    elif method == 'PUT':
+                        if any(other['name'] == body.get('name') for other in policy_rules if other['id'] != rule_id):
+                            status = 400
+                        else:
+                            rule = policy_rules[position] = {**body, 'id': rule_id, 'type': 'AccessRule'}
+                    elif method == 'DELETE':
+                        rule = policy_rules.pop(position)
+                    elif method == 'GET':
+                        rule = policy_rules[position]
+                    else:
+                        status = 405
+                if status == 404:
+                    return self._error(404, f'{rule_id} not found')
+                if status == 400:
+                    return self._error(400, f"The rule name {body.get('name')} already exists. Enter a new name.")
+                if status == 405:
+                    return self._error(405, f'{method} not allowed')
+                self._send(200, rule)
+
+            def _put(self, kind: str, obj_id: str, body: dict):
+                obj = {**body, 'id': obj_id, 'type': TYPES[kind]}
+                with fmc._lock:
+                    found = obj_id in fmc.objects
+                    if found:
+                        fmc.objects[obj_id] = (kind, obj)
+                if not found:
+                    return self._error(404, f'{obj_id} not found')
+                self._send(200, obj)
+
+            def _delete(self, obj_id: str):
+                with fmc._lock:
+                    entry = fmc.objects.pop(obj_id, None)
+                    if entry:
+                        fmc.names[NAMESPACES[entry[0]]].pop(entry[1]['name'], None)
+                if entry is None:
+                    return self._error(404, f'{obj_id} not found')
+                self._send(200, entry[1])
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def do_PUT(self):
+                self._dispatch('PUT')
+
+            def do_DELETE(self):
+                self._dispatch('DELETE')
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local stand-in for the FMC REST API')
+    parser.add_argument('--port', type=int, default=8443)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--rate-limit', type=int, default=120, help='requests per minute, 0 disables it')
+    parser.add_argument('--token-lifetime', type=int, default=30 * 60, help='seconds')
+    args = parser.parse_args()
+    mock = MockFMC(port=args.port, latency=args.latency, rate_limit=args.rate_limit,
+                   token_lifetime=args.token_lifetime)
+    print(f'Mock FMC listening on http://{mock.address}')
+    mock.server.serve_forever()
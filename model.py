@@ -1,51 +1,214 @@
+import json
+from collections.abc import MutableMapping
+
+
+class Record(MutableMapping):
+    # dict-compatible parse result with one slot per usual key, other keys go to a dict made when first needed
+    KEYS = ()
+    __slots__ = ('_extra',)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.SLOTS = frozenset(cls.KEYS)
+
+    def __init__(self, **fields):
+        self._extra = None
+        for key, value in fields.items():
+            self[key] = value
+
+    def __getitem__(self, key):
+        if key in self.SLOTS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self.SLOTS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self.SLOTS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is None:
+            raise KeyError(key)
+        else:
+            del self._extra[key]
+
+    def __iter__(self):
+        for key in self.KEYS:
+            if hasattr(self, key):
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(hasattr(self, key) for key in self.KEYS) + len(self._extra or ())
+
+    def __contains__(self, key):
+        if key in self.SLOTS:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def get(self, key, default=None):
+        if key in self.SLOTS:
+            return getattr(self, key, default)
+        return default if self._extra is None else self._extra.get(key, default)
+
+    def copy(self) -> dict:
+        return dict(self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class NetworkObject(Record):
+    KEYS = ('name', 'type', 'value', 'description', 'dnsResolution')
+    __slots__ = KEYS
+
+
+class Literal(Record):
+    KEYS = ('type', 'value')
+    __slots__ = KEYS
+
+
+class Ref(Record):
+    KEYS = ('name', 'type')
+    __slots__ = KEYS
+
+
+def plain(obj) -> dict:
+    # json default= hook, records are written as the dicts they stand for
+    if isinstance(obj, Record):
+        return dict(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+_encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, default=plain)
+
+
 class ApiClassTemplate:
-    VALID_JSON_DATA = []
+    # field whitelist and type of an FMC request body, the pipeline itself passes dicts and records
+    VALID_JSON_DATA = ()
+    TYPE = ""
     URL_SUFFIX = ""
+    # VALID_JSON_DATA as a set, filled in for every subclass
+    FIELDS = frozenset()
 
-    def __init__(self, **kwargs):
-        self.parse_kwargs(**kwargs)
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELDS = frozenset(cls.VALID_JSON_DATA)
 
-    def parse_kwargs(self, **kwargs):
-        for key in self.VALID_JSON_DATA:
-            if key in kwargs:
-                setattr(self, key, kwargs[key])
+    @classmethod
+    def payload(cls, item: dict) -> dict:
+        # request body of a pipeline dict, sent as it is when it only has fields of the model
+        if item.get('type') == cls.TYPE and item.keys() <= cls.FIELDS:
+            return item
+        data = {key: item[key] for key in cls.VALID_JSON_DATA if item.get(key) is not None}
+        data['type'] = cls.TYPE
+        return data
 
-    def format_data(self):
-        json_data = {}
-        for key in self.VALID_JSON_DATA:
-            if hasattr(self, key):
-                json_data[key] = getattr(self, key)
-        return json_data
+    @classmethod
+    def payloads(cls, items) -> list:
+        # payload() of every item of a bulk request, with the check inlined
+        return [item if item.get('type') == cls.TYPE and item.keys() <= cls.FIELDS else cls.payload(item)
+                for item in items]
+
+
+class Host(ApiClassTemplate):
+    VALID_JSON_DATA = ("id", "name", "type", "value", "description", "overridable")
+    TYPE = "Host"
+    URL_SUFFIX = "/object/hosts"
+
+
+class Network(ApiClassTemplate):
+    VALID_JSON_DATA = ("id", "name", "type", "value", "description", "overridable")
+    TYPE = "Network"
+    URL_SUFFIX = "/object/networks"
 
 
+class Range(ApiClassTemplate):
+    VALID_JSON_DATA = ("id", "name", "type", "value", "description", "overridable")
+    TYPE = "Range"
+    URL_SUFFIX = "/object/ranges"
+
 
 class NetworkObjectFQDN(ApiClassTemplate):
-    VALID_JSON_DATA = [
-        "id",
-        "name",
-        "type",
-        "value",
-        "description",
-        "dnsResolution",
-        "overridable",
-    ]
+    VALID_JSON_DATA = ("id", "name", "type", "value", "description", "dnsResolution", "overridable")
+    TYPE = "FQDN"
     URL_SUFFIX = "/object/fqdns"
-    VALID_FOR_DNS_RESOLUTION = ["IPV4_ONLY", "IPV6_ONLY", "IPV4_AND_IPV6"]
+    VALID_FOR_DNS_RESOLUTION = ("IPV4_ONLY", "IPV6_ONLY", "IPV4_AND_IPV6")
 
-    def __init__(self, **kwargs):
-        self.parse_kwargs(**kwargs)
-        self.type = 'fqdn'
+    @classmethod
+    def payload(cls, item: dict) -> dict:
+        data = super().payload(item)
+        if data.get('dnsResolution') not in cls.VALID_FOR_DNS_RESOLUTION:
+            data = {**data, 'dnsResolution': "IPV4_ONLY"}
+        return data
 
-    def parse_kwargs(self, **kwargs):
-        super().parse_kwargs(**kwargs)
-        if "dnsResolution" in kwargs:
-            if kwargs["dnsResolution"] in self.VALID_FOR_DNS_RESOLUTION:
-                self.dnsResolution = kwargs["dnsResolution"]
-        else:
-            self.dnsResolution = "IPV4_ONLY"
+    @classmethod
+    def payloads(cls, items) -> list:
+        return [cls.payload(item) for item in items]
+
+
+class NetworkGroup(ApiClassTemplate):
+    VALID_JSON_DATA = ("id", "name", "type", "objects", "literals", "description", "overridable")
+    TYPE = "NetworkGroup"
+    URL_SUFFIX = "/object/networkgroups"
+
+
+class ProtocolPortObject(ApiClassTemplate):
+    VALID_JSON_DATA = ("id", "name", "type", "protocol", "port", "description", "overridable")
+    TYPE = "ProtocolPortObject"
+    URL_SUFFIX = "/object/protocolportobjects"
+
+
+class ICMPv4Object(ApiClassTemplate):
+    VALID_JSON_DATA = ("id", "name", "type", "icmpType", "code", "description", "overridable")
+    TYPE = "ICMPV4Object"
+    URL_SUFFIX = "/object/icmpv4objects"
+
+
+class ICMPv6Object(ApiClassTemplate):
+    VALID_JSON_DATA = ("id", "name", "type", "icmpType", "code", "description", "overridable")
+    TYPE = "ICMPV6Object"
+    URL_SUFFIX = "/object/icmpv6objects"
+
+
+class PortObjectGroup(ApiClassTemplate):
+    VALID_JSON_DATA = ("id", "name", "type", "objects", "description", "overridable")
+    TYPE = "PortObjectGroup"
+    URL_SUFFIX = "/object/portobjectgroups"
+
+
+class AccessRule(ApiClassTemplate):
+    VALID_JSON_DATA = ("id", "name", "type", "action", "enabled", "sourceZones", "destinationZones", "sourceNetworks",
+                       "destinationNetworks", "sourcePorts", "destinationPorts", "logBegin", "logEnd", "sendEventsToFMC",
+                       "newComments")
+    TYPE = "AccessRule"
+    URL_SUFFIX = "/policy/accesspolicies/{policy_id}/accessrules"
+
+
+# FMC object type -> model class
+MODELS = {cls.TYPE: cls for cls in (
+    Host, Network, Range, NetworkObjectFQDN, NetworkGroup, ProtocolPortObject, ICMPv4Object, ICMPv6Object, PortObjectGroup,
+    AccessRule,
+)}
+
+
+def dump(payload: dict) -> bytes:
+    return _encoder.encode(payload).encode()
 
-    def __repr__(self):
-        return f'NetworkObject(name={self.name}, type={self.type}, value={self.value})'
 
-# netfqdn = NetworkObjectFQDN(name='asd', value='cisco.com')
-# print(netfqdn)
\ No newline at end of file
+def dump_many(payloads) -> bytes:
+    return _encoder.encode(list(payloads)).encode()
@@ -0,0 +1,189 @@
+import heapq
+import json
+import logging
+import os
+
+import acl
+import fmc_api
+from metrics import Metrics
+import model
+import scheduler
+import settings
+
+# stands in for the domain, policy and object ids FMC would hand out, same length as the real ones
+PLACEHOLDER_ID = '00000000-0000-0000-0000-000000000000'
+
+
+class Planner:
+    # replays the upload against an offline FMC client: same chunking and payloads, no requests sent
+    def __init__(self, latency=settings.PLAN_LATENCY, seconds_per_item=settings.PLAN_SECONDS_PER_ITEM,
+                 measured_report=settings.METRICS_REPORT, rate=settings.FMC_RATE_LIMIT,
+                 burst=settings.FMC_RATE_BURST, workers=settings.FMC_MAX_WORKERS):
+        self.fmc = fmc_api.FMC(login='', password='', max_workers=workers)
+        self.fmc.domain_uuid = PLACEHOLDER_ID
+        self.latency = latency
+        self.seconds_per_item = seconds_per_item
+        self.measured = self._measured(measured_report)
+        self.rate = rate
+        self.burst = burst
+        self.workers = workers
+        # (stage, workers, calls), stages run one after another
+        self.stages = []
+
+    @staticmethod
+    def _measured(file_name) -> dict:
+        # mean latency per endpoint from the run report of an earlier migration
+        try:
+            with open(file_name) as f:
+                endpoints = json.load(f).get('endpoints', {})
+        except (OSError, ValueError):
+            return {}
+        return {endpoint: data['latency']['sum'] / data['latency']['count']
+                for endpoint, data in endpoints.items() if data['latency']['count']}
+
+    def _call(self, method: str, url: str, params=None, items=0, data=b'') -> dict:
+        endpoint = Metrics.endpoint(method, url, params)
+        seconds = self.measured.get(endpoint, self.latency + self.seconds_per_item * items)
+        return {'endpoint': endpoint, 'bulk': bool(params and params.get('bulk')), 'items': items,
+                'bytes': len(data), 'seconds': seconds}
+
+    def plan_connect(self):
+        base = self.fmc.base_url
+        calls = [self._call('POST', f'{base}/api/fmc_platform/v1/auth/generatetoken')]
+        self.stages.append(('connect', 1, calls))
+        if settings.PREFETCH:
+            # an empty FMC answers every type with a single page
+            params = {'limit': settings.FMC_PAGE_LIMIT, 'offset': 0, 'expanded': 'true'}
+            calls = [self._call('GET', self.fmc._object_url(fmc_type), params) for fmc_type in fmc_api.OBJECT_PATHS]
+            self.stages.append(('prefetch', self.workers, calls))
+
+    def plan_objects(self, config_elements: dict):
+        layers = scheduler.DeploymentGraph.from_config(config_elements).layers()
+        for number, layer in enumerate(layers, start=1):
+            by_type = {}
+            for node in layer:
+                if node.kind in ('object-group', 'service-group'):
+                    self.fmc.resolve_refs([node.item])
+                if self.fmc.index.get_id(fmc_api.namespace(node.item['type']), node.name):
+                    # restored from the journal, post_objects_bulk skips it as well
+                    continue
+                by_type.setdefault(self.fmc._fmc_type(node.item), []).append(node.item)
+
+            calls = []
+            for fmc_type, items in by_type.items():
+                items = self.fmc.complete(items, fmc_type)
+                url = self.fmc._object_url(fmc_type)
+                for start in range(0, len(items), settings.FMC_BULK_LIMIT):
+                    chunk = items[start:start + settings.FMC_BULK_LIMIT]
+                    data = model.dump_many(model.MODELS[fmc_type].payloads(chunk))
+                    calls.append(self._call('POST', url, {'bulk': 'true'}, len(chunk), data))
+                for item in items:
+                    self.fmc.index.add(item['name'], PLACEHOLDER_ID, fmc_type)
+            self.stages.append((f'layer {number}', self.workers, calls))
+
+    def plan_access_rules(self, rules):
+        base = f'{self.fmc.base_url}/api/fmc_config/v1/domain/{PLACEHOLDER_ID}/policy/accesspolicies'
+        calls = [self._call('GET', base, {'name': settings.ACCESS_POLICY})]
+        url = f'{base}/{PLACEHOLDER_ID}/accessrules'
+        # the policy is assumed empty, its rules fit in one page and every rule is appended
+        calls.append(self._call('GET', url, {'limit': settings.FMC_PAGE_LIMIT, 'offset': 0, 'expanded': 'true'}))
+        chunk = []
+        for rule in rules:
+            for field in acl.ZONE_FIELDS:
+                for ref in rule[field]['objects']:
+                    if self.fmc.index.get('zone', ref['name']) is None:
+                        # zones come with the device interfaces, they are not created by the upload
+                        self.fmc.index.add(ref['name'], PLACEHOLDER_ID, 'SecurityZone')
+            access_rule = acl.to_access_rule(rule, self.fmc.index, self.fmc.failed)
+            if access_rule is None:
+                continue
+            chunk.append(access_rule)
+            if len(chunk) == settings.FMC_BULK_LIMIT:
+                calls.append(self._rules_call(url, chunk))
+                chunk = []
+        if chunk:
+            calls.append(self._rules_call(url, chunk))
+        # chunks go out one at a time to keep the rule order
+        self.stages.append(('access rules', 1, calls))
+
+    def _rules_call(self, url: str, chunk: list) -> dict:
+        data = model.dump_many(model.AccessRule.payload(rule) for rule in chunk)
+        return self._call('POST', url, {'bulk': 'true'}, len(chunk), data)
+
+    def project(self) -> list:
+        # same token bucket as RateGovernor, on a simulated clock
+        clock = 0.0
+        tokens, updated = float(self.burst), 0.0
+        fill_rate = self.rate / 60
+        durations = []
+        for stage, workers, calls in self.stages:
+            free = [clock] * workers
+            end = clock
+            for call in calls:
+                ready = heapq.heappop(free)
+                tokens = min(self.burst, tokens + (ready - updated) * fill_rate)
+                updated = ready
+                tokens -= 1
+                start = ready + max(-tokens / fill_rate, 0.0)
+                finish = start + call['seconds']
+                heapq.heappush(free, finish)
+                end = max(end, finish)
+            durations.append(end - clock)
+            clock = end
+        return durations
+
+    def run(self, config_elements: dict, rules=None) -> dict:
+        self.plan_connect()
+        self.plan_objects(config_elements)
+        if rules is not None:
+            self.plan_access_rules(rules)
+        durations = self.project()
+        total = sum(durations)
+
+        # proactive refreshes over the projected run, a new token once the refresh budget is used up
+        renewals = int(total // (settings.FMC_TOKEN_LIFETIME - settings.FMC_TOKEN_REFRESH_MARGIN))
+        generates = renewals // (settings.FMC_TOKEN_MAX_REFRESHES + 1)
+
+        stages = []
+        sequence = []
+        for (stage, _, calls), seconds in zip(self.stages, durations):
+            stages.append({
+                'stage': stage,
+                'calls': len(calls),
+                'bulk': sum(call['bulk'] for call in calls),
+                'items': sum(call['items'] for call in calls),
+                'bytes': sum(call['bytes'] for call in calls),
+                'seconds': round(seconds, 3),
+            })
+            sequence += [{'stage': stage, **call, 'seconds': round(call['seconds'], 3)} for call in calls]
+        bulk = sum(stage['bulk'] for stage in stages)
+        calls = sum(stage['calls'] for stage in stages) + renewals
+        report = {
+            'calls': {'total': calls, 'bulk': bulk, 'single': calls - bulk},
+            'token_refreshes': renewals - generates,
+            'token_generates': generates,
+            'payload_bytes': sum(stage['bytes'] for stage in stages),
+            'projected_seconds': round(total, 3),
+            'assumptions': {
+                'rate_limit': self.rate,
+                'burst': self.burst,
+                'workers': self.workers,
+                'latency': self.latency,
+                'seconds_per_item': self.seconds_per_item,
+                'measured_endpoints': len(self.measured),
+            },
+            'stages': stages,
+            'sequence': sequence,
+        }
+        self.fmc.close()
+        logging.info(f"Plan: {report['calls']['total']} calls ({report['calls']['bulk']} bulk), "
+                     f"{report['payload_bytes']} payload bytes in {len(stages)} stages, "
+                     f"projected {report['projected_seconds']}s")
+        return report
+
+
+def save(report: dict, file_name=settings.PLAN_REPORT):
+    os.makedirs(os.path.dirname(file_name) or '.', exist_ok=True)
+    with open(file_name, 'w') as f:
+        json.dump(report, f, indent=4)
+    logging.info(f'Plan saved to {file_name}')
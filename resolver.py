@@ -0,0 +1,99 @@
+import logging
+
+
+class ResolveError(Exception):
+    pass
+
+
+class Members:
+    # members of a network group: its own plus references to the Members of its nested groups, which are
+    # shared by every parent instead of copied, so a chain of n nested groups costs O(n) and not O(n^2)
+    __slots__ = ('own_objects', 'own_literals', 'children')
+
+    def __init__(self, objects=frozenset(), literals=frozenset(), children=()):
+        self.own_objects = objects
+        # (type, value) pairs
+        self.own_literals = literals
+        self.children = children
+
+    def _walk(self):
+        # every Members reachable from this one, once each
+        seen = {id(self)}
+        stack = [self]
+        while stack:
+            members = stack.pop()
+            yield members
+            for child in members.children:
+                if id(child) not in seen:
+                    seen.add(id(child))
+                    stack.append(child)
+
+    @property
+    def objects(self) -> frozenset:
+        # expanded on every access, callers keep the result if they need it more than once
+        return frozenset().union(*(members.own_objects for members in self._walk()))
+
+    @property
+    def literals(self) -> frozenset:
+        return frozenset().union(*(members.own_literals for members in self._walk()))
+
+    def __len__(self):
+        return len(self.objects) + len(self.literals)
+
+
+class GroupResolver:
+    def __init__(self, groups: dict):
+        self.groups = groups
+        self.resolved = {}
+
+    @staticmethod
+    def is_group(ref: dict) -> bool:
+        return ref.get('type') == 'NetworkGroup'
+
+    def resolve(self, name: str) -> Members:
+        members = self.resolved.get(name)
+        if members is not None:
+            return members
+        # depth-first with an explicit stack, nesting can go deeper than the recursion limit;
+        # a group is built once all of its children are resolved
+        resolving = set()
+        stack = [(name, False)]
+        while stack:
+            current, expanded = stack.pop()
+            if expanded:
+                resolving.discard(current)
+                self.resolved[current] = self._members(self.groups[current])
+                continue
+            if current in self.resolved:
+                continue
+            group = self.groups.get(current)
+            if group is None:
+                raise ResolveError(f'object-group {current} is not defined in config')
+            if current in resolving:
+                raise ResolveError(f'object-group {current} references itself')
+            resolving.add(current)
+            stack.append((current, True))
+            stack.extend((ref['name'], False) for ref in group['objects'] if self.is_group(ref))
+        return self.resolved[name]
+
+    def _members(self, group: dict) -> Members:
+        objects = frozenset(ref['name'] for ref in group['objects'] if not self.is_group(ref))
+        literals = frozenset((literal['type'], literal['value']) for literal in group['literals'])
+        children = [self.resolved[ref['name']] for ref in group['objects'] if self.is_group(ref)]
+        if len(children) == 1 and not objects and not literals:
+            # a wrapper around one group, share its members
+            return children[0]
+        return Members(objects, literals, tuple(children))
+
+    def flatten(self) -> int:
+        # replaces group-object references by the members they resolve to
+        flattened = 0
+        for name, group in self.groups.items():
+            if not any(self.is_group(ref) for ref in group['objects']):
+                continue
+            members = self.resolve(name)
+            group['objects'] = [{'name': obj} for obj in sorted(members.objects)]
+            group['literals'] = [{'type': literal_type, 'value': value} for literal_type, value in sorted(members.literals)]
+            flattened += 1
+        logging.info(f'{flattened} nested object-groups flattened, {len(self.resolved)} groups resolved')
+        return flattened
@@ -0,0 +1,124 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+from metrics import METRICS
+
+
+class CycleError(Exception):
+    pass
+
+
+class Node:
+    def __init__(self, kind: str, name: str, item: dict):
+        self.kind = kind
+        self.name = name
+        self.item = item
+        self.deps = set()
+
+    @property
+    def key(self) -> tuple:
+        return self.kind, self.name
+
+    def __repr__(self):
+        return f'Node(kind={self.kind}, name={self.name}, deps={len(self.deps)})'
+
+
+class DeploymentGraph:
+    # config_elements section -> node kind
+    SECTIONS = {
+        'object_network': 'object',
+        'object-group_network': 'object-group',
+        'object_service': 'service',
+        'object-group_service': 'service-group',
+    }
+
+    # group kind -> kinds its members are looked up in, in order
+    MEMBER_KINDS = {
+        'object-group': ('object-group', 'object'),
+        'service-group': ('service',),
+    }
+
+    def __init__(self):
+        self.nodes = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def add(self, kind: str, name: str, item: dict) -> Node:
+        node = Node(kind, name, item)
+        self.nodes[node.key] = node
+        return node
+
+    @classmethod
+    def from_config(cls, config_elements: dict) -> 'DeploymentGraph':
+        graph = cls()
+        for section, kind in cls.SECTIONS.items():
+            for name, item in config_elements.get(section, {}).items():
+                graph.add(kind, name, item)
+
+        for node in graph.nodes.values():
+            if node.kind not in cls.MEMBER_KINDS:
+                continue
+            for ref in node.item.get('objects', []):
+                if ref.get('id'):
+                    # already on FMC
+                    continue
+                member = next((key for key in ((kind, ref['name']) for kind in cls.MEMBER_KINDS[node.kind])
+                               if key in graph.nodes), None)
+                if member:
+                    node.deps.add(member)
+                else:
+                    logging.warning(f"{node.name}: member {ref['name']} is not defined in config!")
+        return graph
+
+    def layers(self) -> list:
+        pending = {key: set(node.deps) for key, node in self.nodes.items()}
+        dependants = {key: [] for key in self.nodes}
+        for key, deps in pending.items():
+            for dep in deps:
+                dependants[dep].append(key)
+
+        layers = []
+        ready = [key for key, deps in pending.items() if not deps]
+        while ready:
+            layers.append([self.nodes[key] for key in ready])
+            next_ready = []
+            for key in ready:
+                del pending[key]
+                for dependant in dependants[key]:
+                    pending[dependant].discard(key)
+                    if not pending[dependant]:
+                        next_ready.append(dependant)
+            ready = next_ready
+
+        if pending:
+            names = ', '.join(name for _, name in sorted(pending))
+            raise CycleError(f'Circular references between: {names}')
+        return layers
+
+
+def _timed_handler(kind: str, handler, items: list):
+    with METRICS.phase(f'upload.{kind}'):
+        handler(items)
+
+
+def run(graph: DeploymentGraph, handlers: dict) -> None:
+    layers = graph.layers()
+    logging.info(f'Deploying {len(graph)} items in {len(layers)} layers...')
+    with ThreadPoolExecutor(max_workers=max(len(handlers), 1), thread_name_prefix='layer') as executor:
+        for number, layer in enumerate(layers, start=1):
+            by_kind = {}
+            for node in layer:
+                by_kind.setdefault(node.kind, []).append(node.item)
+
+            futures = []
+            for kind, items in by_kind.items():
+                handler = handlers.get(kind)
+                if handler is None:
+                    logging.warning(f'Layer {number}: no handler for {len(items)} {kind} items, skipped')
+                    continue
+                logging.info(f'Layer {number}: deploying {len(items)} {kind} items...')
+                futures.append(executor.submit(_timed_handler, kind, handler, items))
+            # the next layer needs the ids created by this one
+            for future in futures:
+                future.result()
@@ -0,0 +1,109 @@
+import logging
+from typing import Union
+
+import fmc_api
+import settings
+
+# FMC spells out TCP and UDP, every other protocol goes by its number
+PROTOCOL_NAMES = {'6': 'TCP', '17': 'UDP'}
+PORT_TYPES = ('ProtocolPortObject', 'ICMPV4Object', 'ICMPV6Object')
+# parsed icmp literal type -> FMC object type
+ICMP_TYPES = {'ICMPv4PortLiteral': 'ICMPV4Object', 'ICMPv6PortLiteral': 'ICMPV6Object'}
+
+
+def port_object(name: str, element: dict) -> Union[None, dict]:
+    # parsed service object or port literal -> FMC protocolportobject/icmpv4object/icmpv6object item
+    protocol = element.get('protocol')
+    if element.get('type') in ICMP_TYPES:
+        item = {'name': name, 'type': ICMP_TYPES[element['type']]}
+        if 'icmpType' in element:
+            item['icmpType'] = element['icmpType']
+        return item
+    if protocol is None or protocol == settings.protocol_mapping['ip']:
+        return None
+    item = {'name': name, 'type': 'ProtocolPortObject', 'protocol': PROTOCOL_NAMES.get(protocol, protocol)}
+    if element.get('port'):
+        item['port'] = element['port']
+    if element.get('direction'):
+        # not sent to FMC, access rules need it to put the object on the right side
+        item['direction'] = element['direction']
+    return item
+
+
+def literal_name(item: dict) -> str:
+    if item['type'] == 'ICMPV4Object':
+        return f"ICMP_{item.get('icmpType', 'any')}"
+    if item['type'] == 'ICMPV6Object':
+        return f"ICMP6_{item.get('icmpType', 'any')}"
+    protocol = item['protocol'] if item['protocol'] in PROTOCOL_NAMES.values() else f"PROTO_{item['protocol']}"
+    return f"{protocol}_{item['port']}" if 'port' in item else protocol
+
+
+class ServiceMapper:
+    def __init__(self, index: Union[None, fmc_api.ObjectIndex] = None):
+        # (FMC type, port value) -> name of the port object reused for it
+        self.by_key = {}
+        self.index = index
+        if index is not None:
+            for (_, name), entry in list(index.by_name.items()):
+                if entry['type'] in PORT_TYPES and entry['value_key']:
+                    self.by_key.setdefault(entry['value_key'], name)
+
+    @staticmethod
+    def key(item: dict) -> tuple:
+        return item['type'], fmc_api.object_value(item)
+
+    def _free_name(self, name: str, item: dict, ports: dict) -> str:
+        # a config or FMC object may already use the generated name for other content
+        candidate, number = name, 1
+        item_namespace = fmc_api.namespace(item['type'])
+        while candidate in ports or (self.index is not None and self.index.get(item_namespace, candidate)):
+            number += 1
+            candidate = f'{name}_{number}'
+        return candidate
+
+    def run(self, config_elements: dict) -> None:
+        # replaces the parsed service sections with FMC port objects and port object groups
+        ports = {}
+        for name, element in config_elements.get('object_service', {}).items():
+            if element.get('unsupported'):
+                logging.warning(f"Service object {name}: {element['unsupported']} have no FMC port object, skipped")
+                continue
+            item = port_object(name, element)
+            if item is None:
+                logging.warning(f'Service object {name}: protocol {element.get("protocol")} has no FMC port object, skipped')
+                continue
+            ports[name] = item
+            self.by_key.setdefault(self.key(item), name)
+
+        groups = {}
+        created = 0
+        for name, element in config_elements.get('object-group_service', {}).items():
+            if element.get('unsupported'):
+                logging.warning(f"Service object-group {name}: {element['unsupported']} have no FMC equivalent, skipped")
+                continue
+            items = [port_object('', literal) for literal in element['destinationPorts']['literals']]
+            refs = {}
+            for item in items:
+                ref_name = self.by_key.get(self.key(item))
+                if ref_name is None:
+                    item['name'] = ref_name = self._free_name(literal_name(item), item, ports)
+                    ports[ref_name] = item
+                    self.by_key[self.key(item)] = ref_name
+                    created += 1
+                if ref_name not in refs:
+                    refs[ref_name] = {'name': ref_name}
+                    entry = None
+                    if self.index is not None and ref_name not in ports:
+                        entry = self.index.get(fmc_api.namespace(item['type']), ref_name)
+                    if entry:
+                        # reused FMC object, nothing in this run creates it
+                        refs[ref_name].update(id=entry['id'], type=entry['type'])
+            if not refs:
+                logging.warning(f'Service object-group {name} has no members, skipped')
+                continue
+            groups[name] = {'name': name, 'type': 'PortObjectGroup', 'objects': list(refs.values())}
+
+        logging.info(f'{len(ports)} port objects ({created} for group literals) and {len(groups)} port object groups')
+        config_elements['object_service'] = ports
+        config_elements['object-group_service'] = groups
@@ -7,6 +7,44 @@ ASA_CONFIG = 'asa_config.txt'
 FMC_LOGIN = os.getenv('login')
 FMC_PASSWORD = os.getenv('password')
 FMC_HOST = '172.18.59.15'
+FMC_SCHEME = 'https'
+FMC_BULK_LIMIT = 1000  # max objects per ?bulk=true request
+FMC_PAGE_LIMIT = 1000  # max objects per page of a GET request
+FMC_MAX_WORKERS = 8  # concurrent in-flight requests to FMC
+FMC_TOKEN_LIFETIME = 30 * 60  # seconds
+FMC_TOKEN_REFRESH_MARGIN = 5 * 60  # refresh token this long before expiry
+FMC_TOKEN_MAX_REFRESHES = 3  # FMC allows 3 refreshes before a new token must be generated
+FMC_TIMEOUT = 60  # seconds per request
+FMC_RATE_LIMIT = 120  # requests per minute accepted by FMC
+FMC_RATE_BURST = 10  # requests allowed back to back before pacing kicks in
+FMC_MAX_RETRIES = 5  # retries on 429/5xx and connection errors
+FMC_BACKOFF_BASE = 1  # seconds, doubled on every retry
+FMC_BACKOFF_MAX = 60  # seconds
+PREFETCH = True  # index existing FMC objects before upload, can be turned off when resuming from the journal
+ACCESS_POLICY = None  # FMC access policy that receives the access-list rules, None skips them
+ACCESS_LISTS = None  # names of the access-lists to migrate, None for all applied by an access-group
+SECURITY_ZONES = {}  # ASA interface nameif -> FMC security zone of its access-group rules, default: the nameif
+ANALYZE_RULES = False  # report shadowed, redundant and mergeable access-list rules before upload
+EXCLUDE_UNREACHABLE_RULES = False  # leave shadowed and redundant rules out of the upload
+ANALYSIS_REPORT = './log/analysis.json'
+JOURNAL_FILE = './log/journal.jsonl'
+JOURNAL_BATCH_SIZE = 500  # records buffered before an fsync, every bulk chunk is flushed as well
+OWNED_OBJECTS_FILE = './log/owned.json'  # objects this tool created over all runs, the only ones sync --delete removes
+OWNED_RULES_FILE = './log/owned_rules.json'  # access rules this tool created, the only ones it moves or deletes
+PARSE_CACHE = True
+PARSE_CACHE_DIR = './cache'
+PARSE_CACHE_MAX_SIZE = 256 * 1024 * 1024  # bytes, least recently used entries are evicted above it
+DEDUPLICATE = True  # upload objects with the same value once, groups reference the kept one
+ALIAS_MAP_FILE = './log/aliases.json'
+FLATTEN_NESTED_GROUPS = False  # replace group-object references by the members they resolve to
+AGGREGATE_GROUPS = False  # merge adjacent/overlapping group literals into the smallest CIDR set
+AGGREGATE_INCLUDE_OBJECTS = False  # also fold host/subnet/range member objects into the literals
+METRICS_REPORT = './log/report.json'
+METRICS_PROMETHEUS = None  # path for a Prometheus text format copy of the report
+PLAN_LATENCY = 1.0  # seconds per request assumed by `plan` for endpoints without a measurement in METRICS_REPORT
+PLAN_SECONDS_PER_ITEM = 0.01  # extra seconds per object in a bulk request, same fallback
+PLAN_REPORT = './log/plan.json'
+LOG_FILE = './log/app.log'
 LOG_FILE_SIZE = 5 * 1024 * 1024
 LOGGING_LEVEL = 10  # 20-INFO, 10- DEBUG
 
@@ -105,13 +143,14 @@ protocol_mapping = {
 "pcp":"108",
 "pim":"103",
 "pptp":"47",
+"sctp":"132",
 "snp":"109",
 "tcp":"6",
 "udp":"17",
 }
 imcp_codes = {
-"0":"echo-reply",
-"3":"unreachable",
+"echo-reply":"0",
+"unreachable":"3",
 "source-quench":"4",
 "redirect":"5",
 "alternate-address":"6",
@@ -129,4 +168,21 @@ imcp_codes = {
 "traceroute":"30",
 "conversion-error":"31",
 "mobile-redirect":"32",
-}
\ No newline at end of file
+}
+icmp6_codes = {
+"unreachable":"1",
+"packet-too-big":"2",
+"time-exceeded":"3",
+"parameter-problem":"4",
+"echo":"128",
+"echo-reply":"129",
+"membership-query":"130",
+"membership-report":"131",
+"membership-reduction":"132",
+"router-solicitation":"133",
+"router-advertisement":"134",
+"neighbor-solicitation":"135",
+"neighbor-advertisement":"136",
+"neighbor-redirect":"137",
+"router-renumbering":"138",
+}
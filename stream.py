@@ -0,0 +1,102 @@
+from contextlib import contextmanager
+import json
+import logging
+import sys
+
+import model
+
+# one JSON record per line, the header line comes first
+FORMAT = 'asa-config-ndjson'
+VERSION = 3
+SECTIONS = ('object_network', 'object-group_network', 'object_service', 'object-group_service')
+ACCESS_RULE = 'access_rule'
+
+
+class StreamError(Exception):
+    pass
+
+
+@contextmanager
+def open_output(file_name: str):
+    if file_name == '-':
+        yield sys.stdout
+        sys.stdout.flush()
+        return
+    with open(file_name, 'w', encoding='utf-8') as f:
+        yield f
+
+
+class Writer:
+    def __init__(self, file, parser_version=None):
+        # parser_version: asa_api.PARSER_VERSION of the records, only those of the current parser are read back
+        self.file = file
+        self.count = 0
+        self.file.write(json.dumps({'format': FORMAT, 'version': VERSION, 'parser_version': parser_version}) + '\n')
+
+    def write(self, section: str, name: str, item: dict):
+        self.file.write(json.dumps({'section': section, 'name': name, 'item': item}, separators=(',', ':'),
+                                   default=model.plain) + '\n')
+        self.count += 1
+
+    def write_sections(self, config_elements: dict):
+        for section in SECTIONS:
+            items = config_elements.get(section, {})
+            if isinstance(items, dict):
+                for name, item in items.items():
+                    self.write(section, name, item)
+            else:
+                for item in items:
+                    self.write(section, item.get('name'), item)
+
+    def write_rules(self, rules):
+        for rule in rules:
+            self.write(ACCESS_RULE, rule['name'], rule)
+
+
+def read(file_name: str):
+    # asa_api writes through this module, it is imported once the export is read
+    from asa_api import PARSER_VERSION
+
+    with open(file_name, encoding='utf-8') as f:
+        header = json.loads(f.readline() or '{}')
+        if header.get('format') != FORMAT:
+            raise StreamError(f'{file_name} is not an {FORMAT} export')
+        if header.get('version') != VERSION:
+            raise StreamError(f"{file_name} has version {header.get('version')}, expected {VERSION}")
+        if header.get('parser_version') != PARSER_VERSION:
+            raise StreamError(f"{file_name} was written by parser version {header.get('parser_version')}, "
+                              f"expected {PARSER_VERSION}: re-run parse to export it again")
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_sections(file_name: str) -> dict:
+    # objects are needed as a whole to order the upload, access rules are left in the file
+    config_elements = {section: {} for section in SECTIONS}
+    count = 0
+    for record in read(file_name):
+        if record['section'] == ACCESS_RULE:
+            # written after all objects
+            break
+        if record['section'] in config_elements:
+            config_elements[record['section']][record['name']] = record['item']
+            count += 1
+    logging.info(f'{count} objects imported from {file_name}')
+    return config_elements
+
+
+def access_rules(file_name: str, acl_names=None, aliases=None):
+    acl_names = set(acl_names) if acl_names else None
+    aliases = aliases or {}
+    for record in read(file_name):
+        if record['section'] != ACCESS_RULE:
+            continue
+        rule = record['item']
+        if acl_names is not None and rule['acl'] not in acl_names:
+            continue
+        for field in ('sourceNetworks', 'destinationNetworks'):
+            for ref in rule[field]['objects']:
+                # exported before deduplication dropped the duplicate objects
+                ref['name'] = aliases.get(ref['name'], ref['name'])
+        yield rule
@@ -0,0 +1,88 @@
+import logging
+import threading
+
+import fmc_api
+
+
+class SyncPlan:
+    def __init__(self):
+        self.create = []
+        self.update = []
+        self.unchanged = []
+
+    def __repr__(self):
+        return f'SyncPlan(create={len(self.create)}, update={len(self.update)}, unchanged={len(self.unchanged)})'
+
+
+def diff(items: list, index: fmc_api.ObjectIndex) -> SyncPlan:
+    plan = SyncPlan()
+    for item in items:
+        entry = index.get(fmc_api.namespace(item['type']), item['name'])
+        if entry is None:
+            plan.create.append(item)
+            continue
+        item['id'] = entry['id']
+        if entry['fingerprint'] == fmc_api.fingerprint(item):
+            plan.unchanged.append(item)
+        else:
+            plan.update.append(item)
+    return plan
+
+
+class Sync:
+    def __init__(self, fmc: fmc_api.FMC, delete=False, ownership=None):
+        self.fmc = fmc
+        self.delete = delete
+        # journal.Ownership, without it nothing is deleted
+        self.ownership = ownership
+        # (namespace, name) of the objects in the config
+        self.seen = set()
+        self.stats = {'created': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+        self._lock = threading.Lock()
+
+    def handlers(self) -> dict:
+        return {
+            'object': lambda items: self.sync(items, item_type='object'),
+            'object-group': lambda items: self.sync(items, item_type='object-group'),
+            'service': lambda items: self.sync(items, item_type='service'),
+            'service-group': lambda items: self.sync(items, item_type='service-group'),
+        }
+
+    def sync(self, items: list, item_type: str):
+        if item_type in ('object-group', 'service-group'):
+            self.fmc.resolve_refs(items)
+        plan = diff(items, self.fmc.index)
+        logging.info(f'{item_type}: {plan}')
+        self.fmc.post_objects_bulk(items=plan.create, item_type=item_type)
+        self.fmc.put_objects(items=plan.update, item_type=item_type)
+        with self._lock:
+            for item in items:
+                item_namespace = fmc_api.namespace(item['type'])
+                self.seen.add((item_namespace, item['name']))
+                # reused FMC objects are members without an item of their own
+                self.seen.update((item_namespace, ref['name']) for ref in item.get('objects', []))
+            self.stats['created'] += len(plan.create)
+            self.stats['updated'] += len(plan.update)
+            self.stats['unchanged'] += len(plan.unchanged)
+
+    def remove_stale(self):
+        if not self.delete:
+            return
+        if self.ownership is None:
+            logging.warning('No record of the objects created by this tool, nothing is deleted')
+            return
+        # zones come with the device interfaces, they are never deleted
+        missing = [key for key in self.fmc.index.by_name if key[0] != 'zone' and key not in self.seen]
+        # predefined objects and objects of other teams or migrations in the domain are left alone
+        stale = [key for key in missing if self.ownership.owns(*key, self.fmc.index.get_id(*key))]
+        if len(stale) < len(missing):
+            logging.info(f'{len(missing) - len(stale)} FMC objects missing from config were not created by this tool, kept')
+        # groups go first, they may still reference the objects
+        groups = [key for key in stale if self.fmc.index.get(*key)['type'] in fmc_api.GROUP_TYPES]
+        objects = [key for key in stale if self.fmc.index.get(*key)['type'] not in fmc_api.GROUP_TYPES]
+        logging.info(f'Deleting {len(groups)} object-groups and {len(objects)} objects missing from config...')
+        self.fmc.delete_objects(groups)
+        self.fmc.delete_objects(objects)
+        deleted = [key for key in stale if self.fmc.index.get(*key) is None]
+        self.ownership.discard(deleted)
+        self.stats['deleted'] = len(deleted)
@@ -0,0 +1,58 @@
+import os
+import sys
+
+# the modules live at the top level of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import fmc_api
+from mock_fmc import MockFMC
+import settings
+
+
+# items in the shape the parser produces, shared by the tests
+
+def host(name: str, value: str) -> dict:
+    return {'name': name, 'type': 'Host', 'value': value}
+
+
+def group(name: str, objects=(), groups=(), literals=()) -> dict:
+    # literals are host addresses or (type, value) pairs
+    return {'name': name, 'type': 'NetworkGroup',
+            'objects': [{'name': obj} for obj in objects] + [{'name': child, 'type': 'NetworkGroup'} for child in groups],
+            'literals': [{'type': 'Host', 'value': literal} if isinstance(literal, str)
+                         else {'type': literal[0], 'value': literal[1]} for literal in literals]}
+
+
+def service_group(destination: list, source=()) -> dict:
+    return {'destinationPorts': {'literals': destination}, 'sourcePorts': {'literals': list(source)}}
+
+
+def config(objects=(), groups=(), services=(), service_groups=()) -> dict:
+    # objects are items or names of hosts, services names of port objects
+    return {
+        'object_network': {obj['name']: obj for obj in (host(obj, '10.0.0.1') if isinstance(obj, str) else obj
+                                                        for obj in objects)},
+        'object-group_network': {item['name']: item for item in groups},
+        'object_service': {name: {'name': name, 'type': 'ProtocolPortObject'} for name in services},
+        'object-group_service': {item['name']: item for item in service_groups},
+    }
+
+
+@pytest.fixture
+def mock_fmc():
+    mock = MockFMC(rate_limit=0).start()
+    yield mock
+    mock.stop()
+
+
+@pytest.fixture
+def fmc(mock_fmc, monkeypatch):
+    monkeypatch.setattr(settings, 'FMC_SCHEME', 'http')
+    client = fmc_api.FMC(login='test', password='test', host=mock_fmc.address, max_workers=2)
+    # the mock has no rate limit, neither does the client
+    client.governor = fmc_api.RateGovernor(rate=60_000, burst=1000)
+    client.connect()
+    yield client
+    client.close()
@@ -0,0 +1,119 @@
+import pytest
+
+import acl
+import asa_api
+import journal
+from mock_fmc import MockFMC
+
+
+def rules(config: str) -> list:
+    parser = asa_api.AccessListParser(asa_api.SinglePassParser().parse([]))
+    parsed = (parser.parse(line) for line in config.strip().splitlines())
+    return [rule for rule in parsed if rule is not None]
+
+
+def upload(fmc, ownership: journal.Ownership, config: str) -> dict:
+    uploader = acl.RuleUploader(fmc, policy_name=MockFMC.ACCESS_POLICY, chunk_size=2, ownership=ownership)
+    return uploader.upload(lambda: rules(config))
+
+
+@pytest.fixture
+def ownership(tmp_path):
+    return journal.Ownership(file_name=str(tmp_path / 'owned_rules.json'))
+
+
+def policy(mock_fmc) -> list:
+    # (action, destination, port) of every rule in policy order
+    policy_rules, = (policy['rules'] for policy in mock_fmc.policies.values())
+    return [(rule['action'],
+             [literal['value'] for literal in rule.get('destinationNetworks', {}).get('literals', [])],
+             [literal.get('port') for literal in rule.get('destinationPorts', {}).get('literals', [])])
+            for rule in policy_rules]
+
+
+def test_inserted_rule_is_put_in_place(fmc, mock_fmc, ownership):
+    upload(fmc, ownership, '''
+access-list in extended permit tcp any host 10.0.0.1 eq 22
+access-list in extended deny ip any any
+''')
+    stats = upload(fmc, ownership, '''
+access-list in extended permit tcp any host 10.0.0.2 eq 22
+access-list in extended permit tcp any host 10.0.0.1 eq 22
+access-list in extended deny ip any any
+''')
+    assert policy(mock_fmc) == [('ALLOW', ['10.0.0.2'], ['22']), ('ALLOW', ['10.0.0.1'], ['22']), ('BLOCK', [], [])]
+    assert stats['created'] == 1 and stats['unchanged'] == 2 and stats['deleted'] == 0
+
+
+def test_repeated_upload_changes_nothing(fmc, mock_fmc, ownership):
+    config = '''
+access-list in extended permit tcp any host 10.0.0.1 eq 22
+access-list in extended permit tcp any host 10.0.0.1 eq 22
+access-list in extended deny ip any any
+'''
+    upload(fmc, ownership, config)
+    stats = upload(fmc, ownership, config)
+    assert stats['unchanged'] == 3 and stats['created'] == stats['updated'] == stats['deleted'] == 0
+    assert len(policy(mock_fmc)) == 3
+
+
+def test_removed_and_reordered_rules_follow_the_acl(fmc, mock_fmc, ownership):
+    policy_rules, = (policy['rules'] for policy in mock_fmc.policies.values())
+    policy_rules.append({'id': 'manual', 'name': 'manual', 'type': 'AccessRule', 'action': 'BLOCK'})
+    upload(fmc, ownership, '''
+access-list in extended permit tcp any host 10.0.0.1 eq 22
+access-list in extended permit tcp any host 10.0.0.2 eq 22
+access-list in extended permit tcp any host 10.0.0.3 eq 22
+''')
+    stats = upload(fmc, ownership, '''
+access-list in extended permit tcp any host 10.0.0.3 eq 22 log
+access-list in extended permit tcp any host 10.0.0.1 eq 22
+''')
+    assert policy(mock_fmc) == [('BLOCK', [], []), ('ALLOW', ['10.0.0.3'], ['22']), ('ALLOW', ['10.0.0.1'], ['22'])]
+    assert stats['moved'] == 1 and stats['unchanged'] == 1
+    logged = [rule for rule in policy_rules if rule.get('logEnd')]
+    assert [rule['destinationNetworks']['literals'][0]['value'] for rule in logged] == ['10.0.0.3']
+
+
+def test_only_rules_recorded_as_created_are_adopted_or_deleted(fmc, mock_fmc, ownership):
+    (policy_id, policy), = mock_fmc.policies.items()
+    for number, rule in enumerate(rules('''
+access-list in extended permit tcp any host 10.0.0.1 eq 22
+access-list in extended deny ip any any
+access-list in extended permit tcp any host 10.0.0.9 eq 22
+'''), start=1):
+        policy['rules'].append({**acl.to_access_rule(rule, fmc.index), 'name': f'in_{number}', 'id': f'id-{number}'})
+    # an older run created the first two, the third was added by hand after the same naming
+    ownership.add({(acl.OWNED_RULES, 'id-1'): policy_id, (acl.OWNED_RULES, 'id-2'): policy_id})
+    stats = upload(fmc, ownership, '''
+access-list in extended permit tcp any host 10.0.0.1 eq 22
+access-list in extended deny ip any any
+''')
+    assert stats['updated'] == 2 and stats['created'] == stats['deleted'] == 0
+    assert [rule['id'] for rule in policy['rules']] == ['id-1', 'id-2', 'id-3']
+    assert policy['rules'][2]['name'] == 'in_3'
+
+
+def test_new_rules_are_sent_in_chunks_in_front_of_the_kept_ones(fmc, mock_fmc, ownership):
+    upload(fmc, ownership, '''
+access-list in extended permit tcp any host 10.0.0.1 eq 22
+access-list in extended deny ip any any
+''')
+    stats = upload(fmc, ownership, '''
+access-list in extended permit tcp any host 10.0.0.2 eq 22
+access-list in extended permit tcp any host 10.0.0.3 eq 22
+access-list in extended permit tcp any host 10.0.0.4 eq 22
+access-list in extended permit tcp any host 10.0.0.1 eq 22
+access-list in extended permit tcp any host 10.0.0.5 eq 22
+access-list in extended deny ip any any
+access-list in extended permit tcp any host 10.0.0.6 eq 22
+''')
+    assert [destination for _, destination, _ in policy(mock_fmc)] == [
+        ['10.0.0.2'], ['10.0.0.3'], ['10.0.0.4'], ['10.0.0.1'], ['10.0.0.5'], [], ['10.0.0.6']]
+    assert stats['created'] == 5 and stats['unchanged'] == 2
+    assert len(ownership.objects[acl.OWNED_RULES]) == 7
+
+
+def test_longest_increasing():
+    assert acl._longest_increasing([(0, 2), (1, 0), (2, 1), (3, 3)]) == [(1, 0), (2, 1), (3, 3)]
+    assert acl._longest_increasing([]) == []
@@ -0,0 +1,58 @@
+import aggregate
+from conftest import group
+
+
+def test_adjacent_and_overlapping_intervals_are_merged():
+    intervals = [(4, 0, 9), (4, 10, 19), (4, 15, 30), (4, 40, 50), (4, 41, 42)]
+    assert aggregate.merge(intervals) == [[4, 0, 30], [4, 40, 50]]
+
+
+def test_ipv4_and_ipv6_are_never_merged():
+    # ::ffff:ffff and 0.0.0.1 are adjacent as integers
+    intervals = [(6, 0, 0xffffffff), (4, 0, 0), (4, 1, 1)]
+    assert aggregate.merge(intervals) == [[4, 0, 1], [6, 0, 0xffffffff]]
+
+
+def test_literals_are_the_smallest_cidr_set():
+    intervals = aggregate.merge([aggregate.to_interval('Network', '10.0.0.0/25'),
+                                 aggregate.to_interval('Network', '10.0.0.128/25'),
+                                 aggregate.to_interval('Host', '10.0.1.0'),
+                                 aggregate.to_interval('Network', '2001:db8::/64')])
+    assert aggregate.to_literals(intervals) == [
+        {'type': 'Network', 'value': '10.0.0.0/24'},
+        {'type': 'Host', 'value': '10.0.1.0'},
+        {'type': 'Network', 'value': '2001:0db8:0000:0000:0000:0000:0000:0000/64'},
+    ]
+
+
+def test_group_literals_are_aggregated_and_counted():
+    config_elements = {'object_network': {}, 'object-group_network': {'g': group('g', literals=[
+        ('Network', '10.0.0.0/25'), ('Network', '10.0.0.128/25'), ('Host', '10.0.0.7'),
+        ('Host', '2001:db8::1'), ('Host', '2001:db8::1'),
+    ])}}
+    aggregator = aggregate.Aggregator()
+    assert aggregator.run(config_elements) == 3
+    assert config_elements['object-group_network']['g']['literals'] == [
+        {'type': 'Network', 'value': '10.0.0.0/24'}, {'type': 'Host', 'value': '2001:db8::1'}]
+
+
+def test_member_objects_are_folded_in_only_when_asked():
+    objects = {'h1': {'name': 'h1', 'type': 'host', 'value': '10.0.0.1'},
+               'net': {'name': 'net', 'type': 'subnet', 'value': '10.0.0.0/24'},
+               'f1': {'name': 'f1', 'type': 'fqdn', 'value': 'example.com'}}
+    kept = group('g', objects=['h1', 'net', 'f1'], literals=['10.0.0.2'])
+    assert aggregate.Aggregator().aggregate_group(kept, objects) == 0
+    assert [ref['name'] for ref in kept['objects']] == ['h1', 'net', 'f1']
+
+    folded = group('g', objects=['h1', 'net', 'f1'], literals=['10.0.0.2'])
+    assert aggregate.Aggregator(include_objects=True).aggregate_group(folded, objects) == 2
+    assert [ref['name'] for ref in folded['objects']] == ['f1']
+    assert folded['literals'] == [{'type': 'Network', 'value': '10.0.0.0/24'}]
+
+
+def test_group_is_left_alone_when_a_folded_range_takes_more_literals():
+    objects = {'r1': {'name': 'r1', 'type': 'range', 'value': '10.0.0.1-10.0.0.6'}}
+    unchanged = group('g', objects=['r1'], literals=['192.168.0.1'])
+    aggregator = aggregate.Aggregator(include_objects=True)
+    assert aggregator.aggregate_group(unchanged, objects) == 0 and aggregator.removed == 0
+    assert unchanged == group('g', objects=['r1'], literals=['192.168.0.1'])
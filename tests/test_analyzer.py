@@ -0,0 +1,40 @@
+import analyzer
+import asa_api
+
+
+def analyze(config: str) -> dict:
+    lines = [line + '\n' for line in config.strip('\n').splitlines()]
+    sections = asa_api.SinglePassParser().parse(lines)
+    parser = asa_api.AccessListParser(sections)
+    rules = (parser.parse(line) for line in lines if line.startswith('access-list '))
+    return analyzer.RuleAnalyzer(sections).run(rule for rule in rules if rule is not None)
+
+
+def test_shadowed_redundant_and_mergeable():
+    report = analyze('''
+access-list A extended permit tcp 10.0.0.0 255.0.0.0 any eq 443
+access-list A extended deny tcp host 10.1.1.1 any eq 443
+access-list A extended permit tcp 10.2.0.0 255.255.0.0 any range 400 500
+access-list A extended permit udp any any eq 53
+access-list A extended permit udp any any eq 54
+''')
+    assert report['shadowed'] == [{'rule': 'A_2', 'by': 'A_1'}]
+    assert report['redundant'] == []
+    assert {'rules': ['A_4', 'A_5']} in report['mergeable']
+
+
+def test_protocol_names_do_not_stop_the_analysis():
+    report = analyze('''
+access-list A extended permit sctp any any
+access-list A extended permit ip any any
+''')
+    assert report['unanalyzable'] == []
+
+
+def test_report_directory_is_created(tmp_path):
+    rule_analyzer = analyzer.RuleAnalyzer({'object_network': {}, 'object-group_network': {}, 'object_service': {},
+                                           'object-group_service': {}})
+    rule_analyzer.run([])
+    file_name = tmp_path / 'log' / 'analysis.json'
+    rule_analyzer.save(str(file_name))
+    assert file_name.exists()
@@ -0,0 +1,275 @@
+import pytest
+
+import asa_api
+
+
+def parse(config: str) -> dict:
+    return asa_api.SinglePassParser().parse(line + '\n' for line in config.strip('\n').splitlines())
+
+
+def rules(config: str, bindings=None) -> list:
+    # as Asa.access_rules feeds them
+    parser = asa_api.AccessListParser(parse(config), bindings=bindings)
+    parsed = (parser.parse(line) for line in config.splitlines() if line.startswith('access-list '))
+    return [rule for rule in parsed if rule is not None]
+
+
+def ports(literals: list) -> list:
+    return [(literal['protocol'], literal.get('port')) for literal in literals]
+
+
+@pytest.mark.parametrize('tokens, expected', [
+    (['eq', '80'], (['80'], 2)),
+    (['eq', 'https'], (['443'], 2)),
+    (['range', '1000', '2000'], (['1000-2000'], 3)),
+    (['gt', '1023'], (['1024-65535'], 2)),
+    (['gt', '65534'], (['65535'], 2)),
+    (['lt', '1024'], (['1-1023'], 2)),
+    (['neq', '80'], (['1-79', '81-65535'], 2)),
+    (['neq', '1'], (['2-65535'], 2)),
+])
+def test_port_ranges(tokens, expected):
+    assert asa_api._port_ranges(tokens) == expected
+
+
+def test_protocols():
+    assert asa_api._protocols('tcp-udp') == ['6', '17']
+    assert asa_api._protocols('sctp') == ['132']
+    assert asa_api._protocols('99') == ['99']
+    with pytest.raises(ValueError):
+        asa_api._protocols('bogus')
+
+
+@pytest.mark.parametrize('tokens', [['lt', '1'], ['gt', '65535'], ['bogus', '1']])
+def test_port_ranges_rejects_empty_and_unknown(tokens):
+    with pytest.raises(ValueError):
+        asa_api._port_ranges(tokens)
+
+
+def test_network_objects_and_groups():
+    sections = parse('''
+object network h1
+ host 10.0.0.1
+ description web server
+object network n1
+ subnet 10.1.0.0 255.255.0.0
+object network r1
+ range 10.2.0.1 10.2.0.9
+object network f1
+ fqdn v4 www.example.com
+object-group network g1
+ network-object object h1
+ network-object host 10.0.0.2
+ network-object 10.3.0.0 255.255.255.0
+ group-object g2
+object-group network g2
+ network-object object n1
+''')
+    objects = sections['object_network']
+    assert objects['h1'] == {'name': 'h1', 'type': 'Host', 'value': '10.0.0.1', 'description': 'web server'}
+    assert objects['n1']['value'] == '10.1.0.0/16'
+    assert objects['r1']['value'] == '10.2.0.1-10.2.0.9'
+    assert objects['f1']['dnsResolution'] == 'IPV4_ONLY'
+    group = sections['object-group_network']['g1']
+    assert group['objects'] == [{'name': 'h1'}, {'name': 'g2', 'type': 'NetworkGroup'}]
+    assert group['literals'] == [{'type': 'Host', 'value': '10.0.0.2'}, {'type': 'Network', 'value': '10.3.0.0/24'}]
+
+
+def test_service_object():
+    service = parse('''
+object service s1
+ service tcp destination eq 443
+''')['object_service']['s1']
+    assert service == {'protocol': '6', 'type': 'PortLiteral', 'direction': 'destination', 'port': '443'}
+
+
+@pytest.mark.parametrize('line', [
+    ' service tcp destination neq 80',
+    ' service tcp destination lt 1',
+    ' service tcp source eq 1000 destination eq 22',
+])
+def test_service_object_without_fmc_equivalent_is_flagged(line):
+    service = parse('object service s1\n' + line)['object_service']['s1']
+    assert service['unsupported']
+    assert 'port' not in service
+
+
+def test_service_group_neq_member_takes_two_ranges():
+    group = parse('''
+object-group service g1
+ service-object tcp-udp destination neq 53
+''')['object-group_service']['g1']
+    assert 'unsupported' not in group
+    assert sorted(ports(group['destinationPorts']['literals'])) == [
+        ('17', '1-52'), ('17', '54-65535'), ('6', '1-52'), ('6', '54-65535')]
+
+
+def test_service_group_member_with_both_sides_is_flagged():
+    group = parse('''
+object-group service g1
+ service-object tcp source eq 1000 destination eq 22
+''')['object-group_service']['g1']
+    assert group['unsupported']
+
+
+def test_service_group_inherits_flag_from_object_and_nested_group():
+    groups = parse('''
+object-group service g1
+ service-object object s1
+object-group service g2
+ group-object g1
+object service s1
+ service tcp destination neq 80
+''')['object-group_service']
+    assert groups['g1']['unsupported']
+    assert groups['g2']['unsupported']
+
+
+@pytest.mark.parametrize('member', [' service-object ip', ' service-object udp source eq 53'])
+def test_service_group_that_fmc_would_narrow_is_flagged(member):
+    config = f'''
+object-group service g1
+ service-object tcp destination eq 443
+{member}
+access-list A extended deny object-group g1 any any
+'''
+    assert parse(config)['object-group_service']['g1']['unsupported']
+    assert rules(config) == []
+
+
+def test_port_object_group():
+    group = parse('''
+object-group service web tcp
+ port-object eq www
+ port-object range 8000 8080
+''')['object-group_service']['web']
+    assert ports(group['destinationPorts']['literals']) == [('6', '80'), ('6', '8000-8080')]
+
+
+def test_access_list_rules():
+    config = '''
+object network h1
+ host 10.0.0.1
+object service s1
+ service tcp destination eq 443
+access-list A remark allow web
+access-list A extended permit object s1 any object h1 log
+access-list A extended deny tcp 10.1.0.0 255.255.0.0 host 10.0.0.2 neq 22
+access-list A extended permit icmp any any echo inactive
+'''
+    parsed = rules(config)
+    assert [rule['name'] for rule in parsed] == ['A_1', 'A_2', 'A_3']
+    first, second, third = parsed
+    assert first['remarks'] == ['allow web'] and first['log']
+    assert first['destinationPorts']['objects'] == [{'name': 's1'}]
+    assert first['destinationNetworks']['objects'] == [{'name': 'h1'}]
+    assert second['action'] == 'deny'
+    assert second['sourceNetworks']['literals'] == [{'type': 'Network', 'value': '10.1.0.0/16'}]
+    assert ports(second['destinationPorts']['literals']) == [('6', '1-21'), ('6', '23-65535')]
+    assert not third['enabled']
+    assert third['destinationPorts']['literals'] == [{'protocol': '1', 'type': 'ICMPv4PortLiteral', 'icmpType': '8'}]
+
+
+def test_access_list_skips_rules_without_fmc_equivalent():
+    config = '''
+object service bad
+ service tcp destination lt 1
+object-group service badgroup
+ service-object tcp source eq 1000 destination eq 22
+access-list A extended permit object bad any any
+access-list A extended permit object-group badgroup any any
+access-list A extended permit tcp any any eq 80 time-range WORK
+access-list A extended permit tcp any any eq 80
+'''
+    parsed = rules(config)
+    # numbering follows the config, skipped lines keep their number
+    assert [rule['name'] for rule in parsed] == ['A_4']
+
+
+def test_access_list_zones_follow_access_group():
+    config = '''
+access-list A extended permit ip any any
+access-list B extended permit ip any any
+access-list G extended permit ip any any
+access-list U extended permit ip any any
+access-group A in interface outside
+access-group A in interface dmz
+access-group B out interface inside
+access-group G global
+'''
+    parsed = {rule['acl']: rule for rule in rules(config, bindings=asa_api.access_groups(config.splitlines()))}
+    assert sorted(parsed) == ['A', 'B', 'G']
+    assert parsed['A']['sourceZones']['objects'] == [{'name': 'outside'}, {'name': 'dmz'}]
+    assert parsed['B']['destinationZones']['objects'] == [{'name': 'inside'}]
+    assert not parsed['G']['sourceZones']['objects'] and not parsed['G']['destinationZones']['objects']
+
+
+def test_unknown_protocols_are_flagged_or_skipped():
+    config = '''
+object service s1
+ service bogus
+object-group service g1
+ service-object bogus
+access-list A extended permit bogus any any
+access-list A extended permit sctp any any
+'''
+    sections = parse(config)
+    assert sections['object_service']['s1']['unsupported']
+    assert sections['object-group_service']['g1']['unsupported']
+    parsed = rules(config)
+    assert [rule['name'] for rule in parsed] == ['A_2']
+    assert parsed[0]['destinationPorts']['literals'] == [{'protocol': '132', 'type': 'PortLiteral'}]
+
+
+def test_icmp6_types_are_parsed_like_icmp():
+    config = '''
+object service s1
+ service icmp6 echo
+object-group service g1
+ service-object icmp6 echo-reply
+ service-object icmp 0
+access-list A extended permit icmp6 any any neighbor-solicitation log
+'''
+    sections = parse(config)
+    assert sections['object_service']['s1'] == {'protocol': '58', 'type': 'ICMPv6PortLiteral', 'icmpType': '128'}
+    assert sections['object-group_service']['g1']['destinationPorts']['literals'] == [
+        {'protocol': '58', 'type': 'ICMPv6PortLiteral', 'icmpType': '129'},
+        {'protocol': '1', 'type': 'ICMPv4PortLiteral', 'icmpType': '0'}]
+    rule, = rules(config)
+    assert rule['destinationPorts']['literals'] == [{'protocol': '58', 'type': 'ICMPv6PortLiteral', 'icmpType': '135'}]
+    assert rule['log']
+
+
+@pytest.mark.parametrize('block, line', [
+    ('object service s1', ' service icmp bogus'),
+    ('object service s1', ' service icmp6 bogus'),
+    ('object service s1', ' service tcp destination'),
+    ('object-group service s1', ' service-object icmp bogus'),
+    ('object-group service s1', ' service-object tcp destination eq'),
+    ('object-group service s1 tcp', ' port-object eq'),
+])
+def test_malformed_service_lines_are_flagged(block, line):
+    sections = parse(f'{block}\n{line}\nobject network h1\n host 10.0.0.1')
+    section = 'object_service' if block.startswith('object ') else 'object-group_service'
+    assert sections[section]['s1']['unsupported']
+    assert sections['object_network']['h1']['value'] == '10.0.0.1'
+
+
+def test_blocks_without_a_name_are_skipped():
+    sections = parse('''
+object network
+ host 10.0.0.9
+object network h1
+ host 10.0.0.1
+''')
+    assert sections['object_network'] == {'h1': {'name': 'h1', 'type': 'Host', 'value': '10.0.0.1'}}
+
+
+def test_access_list_with_unknown_icmp_type_is_skipped():
+    config = '''
+access-list A extended permit icmp any any bogus
+access-list A extended permit icmp any any log
+'''
+    parsed = rules(config)
+    assert [rule['name'] for rule in parsed] == ['A_2']
+    assert parsed[0]['destinationPorts']['literals'] == [{'protocol': '1', 'type': 'ICMPv4PortLiteral'}]
@@ -0,0 +1,38 @@
+import batch
+from conftest import config, group, host
+
+
+def test_identical_items_are_merged():
+    merged = batch.merge({
+        'a/fw1.cfg': config([host('h1', '10.0.0.1')]),
+        'b/fw2.cfg': config([host('h1', '10.0.0.1')]),
+    })
+    assert merged['object_network'] == {'h1': {**host('h1', '10.0.0.1'), 'source': 'fw1.cfg'}}
+
+
+def test_conflicting_names_are_namespaced_and_references_follow():
+    merged = batch.merge({
+        'fw1.cfg': config([host('h1', '10.0.0.1')], [group('g1', objects=['h1']), group('outer', groups=['g1'])]),
+        'fw2.cfg': config([host('h1', '10.9.9.9'), host('h2', '10.0.0.2')],
+                          [group('g1', objects=['h1']), group('outer', groups=['g1']),
+                           group('other', objects=['h2'])]),
+    })
+    objects = merged['object_network']
+    groups = merged['object-group_network']
+    assert objects['h1']['value'] == '10.0.0.1'
+    assert objects['fw2_h1'] == {**host('fw2_h1', '10.9.9.9'), 'source': 'fw2.cfg'}
+    # same members by name, but h1 of fw2 is another address
+    assert groups['g1']['objects'] == [{'name': 'h1'}]
+    assert groups['fw2_g1']['objects'] == [{'name': 'fw2_h1'}]
+    assert groups['fw2_outer']['objects'] == [{'name': 'fw2_g1', 'type': 'NetworkGroup'}]
+    assert groups['other']['source'] == 'fw2.cfg'
+    assert groups['outer']['objects'] == [{'name': 'g1', 'type': 'NetworkGroup'}]
+
+
+def test_namespaced_name_does_not_take_an_existing_one():
+    merged = batch.merge({
+        'fw1.cfg': config([host('h1', '10.0.0.1')]),
+        'fw2.cfg': config([host('h1', '10.9.9.9'), host('fw2_h1', '10.0.0.3')]),
+    })
+    assert merged['object_network']['fw2_h1_2']['value'] == '10.9.9.9'
+    assert merged['object_network']['fw2_h1']['value'] == '10.0.0.3'
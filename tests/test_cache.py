@@ -0,0 +1,56 @@
+import os
+
+import asa_api
+from cache import ParseCache
+
+
+def entry(cache: ParseCache, key: str, mtime: float):
+    cache.store(key, {'object_network': {key: {'name': key, 'type': 'host', 'value': '10.0.0.1'}}})
+    os.utime(cache._path(key), (mtime, mtime))
+
+
+def test_stored_entry_is_loaded_back(tmp_path):
+    cache = ParseCache(directory=str(tmp_path))
+    key = cache.key(b'object network h1\n host 10.0.0.1\n', asa_api.PARSER_VERSION)
+    cache.store(key, {'object_network': {'h1': {'name': 'h1'}}})
+    assert cache.load(key) == {'object_network': {'h1': {'name': 'h1'}}}
+    assert cache.load(cache.key(b'other config', asa_api.PARSER_VERSION)) is None
+
+
+def test_new_parser_version_misses_the_old_entries(tmp_path, monkeypatch):
+    config_file = tmp_path / 'asa.cfg'
+    config_file.write_text('object network h1\n host 10.0.0.1\n')
+    asa = asa_api.Asa(str(config_file), use_cache=False)
+    asa.cache = ParseCache(directory=str(tmp_path / 'cache'))
+    asa.read()
+    asa.parse()
+    old_key = asa._cache_key
+
+    monkeypatch.setattr(asa_api, 'PARSER_VERSION', asa_api.PARSER_VERSION + '-next')
+    asa = asa_api.Asa(str(config_file), use_cache=False)
+    asa.cache = ParseCache(directory=str(tmp_path / 'cache'))
+    asa.read()
+    assert asa._cache_key != old_key
+    assert asa.cache.load(asa._cache_key) is None
+    assert asa.parse()['object_network']['h1']['value'] == '10.0.0.1'
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ParseCache(directory=str(tmp_path))
+    entry(cache, 'a', 1000)
+    entry(cache, 'b', 2000)
+    size = os.path.getsize(cache._path('a'))
+    # loading an entry makes it the most recently used
+    assert cache.load('a') is not None
+    cache.max_size = 2 * size
+    entry(cache, 'c', 3000)
+    assert sorted(os.listdir(tmp_path)) == ['a.cache', 'c.cache']
+
+
+def test_unreadable_entry_is_a_miss_and_gets_replaced(tmp_path):
+    cache = ParseCache(directory=str(tmp_path))
+    with open(cache._path('a'), 'wb') as f:
+        f.write(b'not a cache entry')
+    assert cache.load('a') is None
+    cache.store('a', {'object_network': {}})
+    assert cache.load('a') == {'object_network': {}}
@@ -0,0 +1,32 @@
+import json
+
+from conftest import host
+import dedup
+import fmc_api
+
+
+def test_objects_with_a_value_already_on_fmc_reuse_it():
+    index = fmc_api.ObjectIndex()
+    index.add('fmc-web', 'id-1', 'Host', '10.0.0.1')
+    index.add('db', 'id-2', 'Host', '10.0.0.2')
+    config_elements = {
+        'object_network': {'web': host('web', '10.0.0.1'), 'web2': host('web2', '10.0.0.1'),
+                           # db is changed by this config, its old value is not reused
+                           'db': host('db', '10.0.0.3'), 'old-db': host('old-db', '10.0.0.2')},
+        'object-group_network': {'g1': {'name': 'g1', 'type': 'NetworkGroup', 'objects': [{'name': 'web2'}],
+                                        'literals': [{'type': 'Host', 'value': '10.0.0.1'}]}},
+    }
+    aliases = dedup.Deduplicator(index).run(config_elements)
+    assert aliases == {'web': 'fmc-web', 'web2': 'fmc-web'}
+    assert sorted(config_elements['object_network']) == ['db', 'old-db']
+    assert config_elements['object-group_network']['g1']['objects'] == [{'name': 'fmc-web', 'id': 'id-1', 'type': 'Host'}]
+    assert config_elements['object-group_network']['g1']['literals'] == []
+    assert index.find('Host', '10.0.0.1') == 'fmc-web'
+
+
+def test_alias_map_directory_is_created(tmp_path):
+    deduplicator = dedup.Deduplicator()
+    deduplicator.run({'object_network': {'web': host('web', '10.0.0.1'), 'web2': host('web2', '10.0.0.1')}})
+    file_name = tmp_path / 'log' / 'aliases.json'
+    deduplicator.save(str(file_name))
+    assert json.loads(file_name.read_text()) == {'web2': 'web'}
@@ -0,0 +1,236 @@
+import email.utils
+import threading
+import time
+
+import pytest
+import requests
+
+import acl
+from conftest import host
+import fmc_api
+import journal
+from metrics import Metrics
+from mock_fmc import MockFMC
+import settings
+
+
+def test_throttled_time_counts_overlapping_waits_once():
+    governor = fmc_api.RateGovernor(rate=60, burst=1)
+    # three callers queued at t=10 for 1, 2 and 3 seconds, one more held back from t=20
+    for wait in (1.0, 2.0, 3.0):
+        governor._throttle(10.0, wait)
+    governor._throttle(20.0, 0.5)
+    assert governor.throttled_time == 3.5
+    assert governor.thread_wait_time == 6.5
+
+
+def rule(name: str, networks: list) -> dict:
+    empty = {'objects': [], 'literals': []}
+    return {'name': name, 'acl': 'A', 'action': 'permit', 'enabled': True, 'log': False, **{field: empty for field in acl.FIELDS},
+            'destinationNetworks': {'objects': [{'name': network} for network in networks], 'literals': []}}
+
+
+def test_bulk_post_reports_rejected_items_and_creates_the_rest(fmc, mock_fmc):
+    # created after the prefetch, FMC is asked for its id
+    mock_fmc._create('hosts', {'name': 'taken', 'value': '10.0.0.9'})
+    items = [host('taken', '10.0.0.1'), host('web', '10.0.0.2'), host('db', '10.0.0.3')]
+    ids = fmc.post_objects_bulk(items, item_type='object')
+    names = mock_fmc.names['network']
+    assert ids['taken'] == names['taken']
+    assert ids['web'] == names['web'] and ids['db'] == names['db']
+    assert fmc.index.get_id('network', 'web') == ids['web']
+
+
+def test_chunks_posted_in_parallel_map_each_name_to_its_id(fmc, mock_fmc, monkeypatch):
+    monkeypatch.setattr(settings, 'FMC_BULK_LIMIT', 3)
+    mock_fmc.latency = 0.05
+    timed = fmc._timed
+    lock = threading.Lock()
+    calls = {'posts': 0, 'active': 0, 'peak': 0}
+
+    def tracked(method, url, **kwargs):
+        with lock:
+            calls['posts'] += method == 'POST'
+            calls['active'] += 1
+            calls['peak'] = max(calls['peak'], calls['active'])
+        try:
+            return timed(method, url, **kwargs)
+        finally:
+            with lock:
+                calls['active'] -= 1
+
+    items = [host(f'h{i}', f'10.0.0.{i}') for i in range(10)] + [
+        {'name': f'n{i}', 'type': 'Network', 'value': f'10.{i}.0.0/16'} for i in range(5)]
+    monkeypatch.setattr(fmc, '_timed', tracked)
+    ids = fmc.post_objects_bulk(items, item_type='object')
+    names = mock_fmc.names['network']
+    # 4 chunks of hosts and 2 of networks, more than one in flight at a time
+    assert calls['posts'] == 6 and calls['peak'] > 1
+    assert len(set(ids.values())) == 15 and ids == {item['name']: names[item['name']] for item in items}
+    assert all(item['id'] == names[item['name']] for item in items)
+    assert all(fmc.index.get_id('network', item['name']) == item['id'] for item in items)
+
+
+def test_bulk_post_retried_after_a_committed_server_error_keeps_the_ids(fmc, mock_fmc, monkeypatch):
+    monkeypatch.setattr(fmc_api.time, 'sleep', lambda seconds: None)
+    timed = fmc._timed
+    failures = []
+
+    def commit_then_fail(method, url, **kwargs):
+        r = timed(method, url, **kwargs)
+        if method == 'POST' and (kwargs.get('params') or {}).get('bulk') and not failures:
+            failures.append(r)
+            return response(503)
+        return r
+
+    monkeypatch.setattr(fmc, '_timed', commit_then_fail)
+    items = [host('web', '10.0.0.2'), host('db', '10.0.0.3')]
+    ids = fmc.post_objects_bulk(items, item_type='object')
+    names = mock_fmc.names['network']
+    assert failures and ids == {'web': names['web'], 'db': names['db']}
+    groups = [{'name': 'servers', 'type': 'NetworkGroup', 'objects': [{'name': 'web'}, {'name': 'db'}]}]
+    fmc.resolve_refs(groups)
+    fmc.post_objects_bulk(groups, item_type='object-group')
+    assert not fmc.failed and 'servers' in names
+
+
+def test_failed_items_are_matched_by_name():
+    class Response:
+        @staticmethod
+        def json():
+            return {'error': {'messages': [{'description': "The object name 'web' already exists."}]}}
+
+    assert fmc_api.FMC._failed_items(Response(), [{'name': 'web'}, {'name': 'db'}]) == {
+        'web': "The object name 'web' already exists."}
+
+
+def test_groups_with_unresolved_members_are_not_uploaded(fmc, mock_fmc, tmp_path):
+    fmc.post_objects_bulk([host('web', '10.0.0.2')], item_type='object')
+    groups = [{'name': 'broken', 'type': 'NetworkGroup', 'objects': [{'name': 'web'}, {'name': 'bad-host'}]},
+              {'name': 'servers', 'type': 'NetworkGroup', 'objects': [{'name': 'web'}]}]
+    fmc.resolve_refs(groups)
+    fmc.post_objects_bulk(groups, item_type='object-group')
+    outer = [{'name': 'outer', 'type': 'NetworkGroup', 'objects': [{'name': 'broken'}]}]
+    fmc.resolve_refs(outer)
+    fmc.post_objects_bulk(outer, item_type='object-group')
+    assert fmc.failed == {('network', 'broken'), ('network', 'outer')}
+    names = mock_fmc.names['network']
+    assert 'broken' not in names and 'outer' not in names and 'servers' in names
+
+    uploader = acl.RuleUploader(fmc, policy_name=MockFMC.ACCESS_POLICY,
+                                ownership=journal.Ownership(file_name=str(tmp_path / 'owned_rules.json')))
+    uploader.upload(lambda: [rule('r1', ['broken']), rule('r2', ['servers'])])
+    assert uploader.stats['skipped'] == 1 and uploader.stats['created'] == 1
+
+
+def test_objects_named_like_a_zone_are_created_and_kept_apart(fmc, mock_fmc):
+    mock_fmc._create('securityzones', {'name': 'dmz', 'interfaceMode': 'ROUTED'})
+    fmc.prefetch()
+    items = [{'name': 'dmz', 'type': 'Network', 'value': '10.1.0.0/24'}]
+    fmc.post_objects_bulk(items, item_type='object')
+    assert items[0]['id'] == mock_fmc.names['network']['dmz']
+    assert fmc.index.get('zone', 'dmz')['id'] == mock_fmc.names['zone']['dmz']
+
+    zone_rule = {**rule('r1', ['dmz']), 'sourceZones': {'objects': [{'name': 'dmz'}], 'literals': []}}
+    access_rule = acl.to_access_rule(zone_rule, fmc.index)
+    assert access_rule['sourceZones']['objects'][0]['type'] == 'SecurityZone'
+    assert access_rule['destinationNetworks']['objects'][0] == {'name': 'dmz', 'id': items[0]['id'], 'type': 'Network'}
+
+
+def test_objects_named_like_a_port_object_are_created(fmc, mock_fmc):
+    mock_fmc._create('protocolportobjects', {'name': 'DNS', 'protocol': 'UDP', 'port': '53'})
+    fmc.prefetch()
+    items = [host('DNS', '10.0.0.53')]
+    fmc.post_objects_bulk(items, item_type='object')
+    assert items[0]['id'] == mock_fmc.names['network']['DNS']
+    groups = [{'name': 'resolvers', 'type': 'NetworkGroup', 'objects': [{'name': 'DNS'}]},
+              {'name': 'dns-ports', 'type': 'PortObjectGroup', 'objects': [{'name': 'DNS'}]}]
+    fmc.resolve_refs(groups)
+    assert groups[0]['objects'][0] == {'name': 'DNS', 'id': items[0]['id'], 'type': 'Host'}
+    assert groups[1]['objects'][0] == {'name': 'DNS', 'id': mock_fmc.names['port']['DNS'], 'type': 'ProtocolPortObject'}
+
+
+def expire(mock_fmc, token: str):
+    issued, refresh_token = mock_fmc.tokens[token]
+    mock_fmc.tokens[token] = (issued - mock_fmc.token_lifetime, refresh_token)
+
+
+def test_rejected_token_is_refreshed_and_the_request_repeated(fmc, mock_fmc):
+    token = fmc.token.access_token
+    expire(mock_fmc, token)
+    r = fmc._request('GET', fmc._object_url('Host'))
+    assert r.status_code == 200
+    assert fmc.token.access_token != token
+    assert fmc.token.refresh_count == 1
+
+
+def test_token_is_refreshed_before_it_expires(fmc):
+    token = fmc.token.access_token
+    fmc.token.issued_at -= fmc.token.lifetime - fmc.token.refresh_margin + 1
+    assert fmc._request('GET', fmc._object_url('Host')).status_code == 200
+    assert fmc.token.access_token != token
+    assert fmc.token.refresh_count == 1
+
+
+def test_new_token_is_generated_once_the_refresh_budget_is_used_up(fmc, mock_fmc):
+    fmc.token.refresh_count = fmc.token.max_refreshes
+    token = fmc.token.access_token
+    expire(mock_fmc, token)
+    assert fmc._request('GET', fmc._object_url('Host')).status_code == 200
+    assert fmc.token.access_token != token
+    assert fmc.token.refresh_count == 0
+
+
+def response(status: int, headers=None) -> requests.Response:
+    r = requests.Response()
+    r.status_code = status
+    r.headers.update(headers or {})
+    return r
+
+
+def test_429_holds_back_for_retry_after(monkeypatch):
+    mock = MockFMC(rate_limit=1).start()
+    sleeps = []
+
+    def sleep(seconds):
+        # time passes at once, the mock's rate window with it
+        if seconds:
+            sleeps.append(seconds)
+            mock._requests.clear()
+
+    monkeypatch.setattr(settings, 'FMC_SCHEME', 'http')
+    monkeypatch.setattr(fmc_api.time, 'sleep', sleep)
+    monkeypatch.setattr(fmc_api, 'METRICS', Metrics())
+    with fmc_api.FMC(login='test', password='test', host=mock.address, max_workers=1) as client:
+        client.connect()
+        r = client._request('GET', client._object_url('Host'))
+    mock.stop()
+    assert r.status_code == 200
+    assert mock.stats[429] == 1 and client.governor.retries == 1
+    assert len(sleeps) == 1 and 59 <= sleeps[0] <= 60
+    assert client.governor.throttled_time == pytest.approx(sleeps[0], abs=0.1)
+    # counted for the endpoint that was held back
+    endpoints = fmc_api.METRICS.report()['endpoints']
+    hosts = endpoints['GET /api/fmc_config/v1/domain/{id}/object/hosts']
+    assert hosts['retries'] == 1 and hosts['status_codes'] == {'429': 1, '200': 1}
+    assert hosts['throttle_wait'] == pytest.approx(sleeps[0], abs=0.1)
+    assert endpoints['POST /api/fmc_platform/v1/auth/generatetoken']['retries'] == 0
+
+
+def test_server_errors_are_retried_with_capped_backoff(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(fmc_api.time, 'sleep', sleeps.append)
+    governor = fmc_api.RateGovernor(rate=60_000, burst=100, max_retries=2, backoff_base=1, backoff_max=60)
+    script = iter([response(503), response(502), response(503)])
+    assert governor.send(lambda: next(script)).status_code == 503
+    assert governor.retries == 2
+    # attempt n waits between half and all of base * 2 ** n
+    assert 0.5 <= sleeps[0] <= 1 and 1 <= sleeps[1] <= 2
+
+
+def test_retry_after_takes_seconds_or_a_date():
+    governor = fmc_api.RateGovernor()
+    assert governor.retry_delay(response(429, {'Retry-After': '12'}), 0) == 12
+    date = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 28 <= governor.retry_delay(response(429, {'Retry-After': date}), 0) <= 30
+    assert 0.5 <= governor.retry_delay(response(429, {'Retry-After': 'soon'}), 0) <= 1
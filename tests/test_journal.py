@@ -0,0 +1,75 @@
+from conftest import host
+import fmc_api
+import journal
+
+
+def test_resume_skips_objects_recorded_in_the_journal(fmc, mock_fmc, tmp_path):
+    file_name = str(tmp_path / 'journal.jsonl')
+    fmc.journal = journal.Journal(file_name=file_name)
+    fmc.journal.open()
+    fmc.post_objects_bulk([host('web', '10.0.0.1'), host('db', '10.0.0.2')], item_type='object')
+    fmc.journal.close()
+    # a crash in the middle of a write leaves a damaged last line
+    with open(file_name, 'a') as f:
+        f.write('{"name": "cut')
+
+    resumed = journal.Journal(file_name=file_name)
+    client = fmc_api.FMC(login='test', password='test', host=fmc.host, max_workers=2, journal=resumed)
+    client.restore(resumed.open(resume=True))
+    client.connect()
+    items = [host('web', '10.0.0.1'), host('db', '10.0.0.2'), host('app', '10.0.0.3')]
+    ids = client.post_objects_bulk(items, item_type='object')
+    resumed.close()
+    client.close()
+
+    names = mock_fmc.names['network']
+    assert ids == {'app': names['app']}
+    assert [item['id'] for item in items] == [names['web'], names['db'], names['app']]
+    assert mock_fmc.stats[400] == 0
+    assert resumed.created == {('network', name): obj_id for name, obj_id in names.items()}
+    entries = journal.Journal(file_name=file_name).load()
+    assert set(entries) == {('network', 'web'), ('network', 'db'), ('network', 'app')}
+
+
+def test_a_new_run_starts_a_new_journal(tmp_path):
+    file_name = str(tmp_path / 'journal.jsonl')
+    first = journal.Journal(file_name=file_name)
+    first.open()
+    first.record('web', 'Host', 'fingerprint', 'id-1')
+    first.close()
+    second = journal.Journal(file_name=file_name)
+    assert second.open() == {}
+    second.close()
+    assert second.load() == {}
+
+
+def test_resume_keeps_a_network_and_a_port_object_of_the_same_name(fmc, mock_fmc, tmp_path):
+    file_name = str(tmp_path / 'journal.jsonl')
+    dns_port = {'name': 'DNS', 'type': 'ProtocolPortObject', 'protocol': 'UDP', 'port': '53'}
+    fmc.journal = journal.Journal(file_name=file_name)
+    fmc.journal.open()
+    fmc.post_objects_bulk([host('DNS', '10.0.0.53')], item_type='object')
+    fmc.post_objects_bulk([dict(dns_port)], item_type='service')
+    fmc.journal.close()
+
+    resumed = journal.Journal(file_name=file_name)
+    client = fmc_api.FMC(login='test', password='test', host=fmc.host, max_workers=2, journal=resumed)
+    client.restore(resumed.open(resume=True))
+    client.connect()
+    items = [host('DNS', '10.0.0.53'), dict(dns_port)]
+    client.post_objects_bulk(items, item_type='object')
+    resumed.close()
+    client.close()
+
+    assert [item['id'] for item in items] == [mock_fmc.names['network']['DNS'], mock_fmc.names['port']['DNS']]
+    assert mock_fmc.stats[400] == 0 and len(mock_fmc.objects) == 2
+    assert resumed.created == {('network', 'DNS'): items[0]['id'], ('port', 'DNS'): items[1]['id']}
+
+
+def test_ownership_files_without_namespaces_are_still_read(tmp_path):
+    file_name = tmp_path / 'owned.json'
+    file_name.write_text('{"web": "id-1"}')
+    ownership = journal.Ownership(file_name=str(file_name))
+    assert ownership.owns('network', 'web', 'id-1') and not ownership.owns('network', 'web', 'id-2')
+    ownership.discard([('network', 'web')])
+    assert not ownership.owns('network', 'web', 'id-1')
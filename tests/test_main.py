@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import main
+import settings
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    # what cli() dispatched to, the commands themselves are not run
+    calls = []
+    monkeypatch.setattr(main, 'setup_logging', lambda: None)
+    for name in ('main', 'export', 'plan'):
+        monkeypatch.setattr(main, name, lambda *args, name=name, **kwargs: calls.append((name, args, kwargs)))
+    return calls
+
+
+def test_plan_leaves_the_upload_reports_alone(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / settings.ASA_CONFIG).write_text(
+        'object network web\n host 10.0.0.1\nobject network db\n host 10.0.0.1\n'
+        'access-list A extended permit ip any object web\naccess-group A in interface inside\n')
+    monkeypatch.setattr(settings, 'PARSE_CACHE', False)
+    monkeypatch.setattr(settings, 'ANALYZE_RULES', True)
+    assert main.plan(output=str(tmp_path / 'plan.json'))
+    # neither the alias map nor the analysis report of the last upload is overwritten
+    assert not (tmp_path / 'log').exists()
+
+
+def test_parse_exports_the_configs(calls):
+    main.cli(['parse', '--config', 'a.cfg', 'b.cfg', '--workers', '2', '-o', 'out.ndjson'])
+    assert calls == [('export', ('out.ndjson',), {'configs': ['a.cfg', 'b.cfg'], 'workers': 2})]
+
+
+def test_upload_and_sync_run_main(calls):
+    main.cli(['upload', '--import', 'out.ndjson', '--resume'])
+    main.cli(['sync', '--config', 'a.cfg', '--delete'])
+    assert calls == [
+        ('main', (), {'sync_mode': False, 'delete': False, 'configs': None, 'workers': None, 'resume': True,
+                      'import_file': 'out.ndjson'}),
+        ('main', (), {'sync_mode': True, 'delete': True, 'configs': ['a.cfg'], 'workers': None, 'resume': False,
+                      'import_file': None}),
+    ]
+
+
+def test_no_command_uploads(calls):
+    main.cli([])
+    assert calls == [('main', (), {})]
+
+
+def test_import_has_no_side_effects(tmp_path):
+    # nothing is created in the working directory and the heavy modules are imported on demand only
+    repository = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "import sys, main; print(sorted({'asa_api', 'fmc_api', 'requests', 'stream'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path, capture_output=True, text=True,
+                            env={**os.environ, 'PYTHONPATH': repository}, check=True)
+    assert result.stdout.strip() == '[]'
+    assert not list(tmp_path.iterdir())
+
+
+def test_access_rules_of_a_single_config_file_are_migrated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config_file = tmp_path / 'asa.cfg'
+    config_file.write_text('object network web\n host 10.0.0.1\n'
+                           'access-list A extended permit ip any object web\naccess-group A in interface inside\n')
+    monkeypatch.setattr(settings, 'PARSE_CACHE', False)
+    monkeypatch.setattr(settings, 'DEDUPLICATE', False)
+    monkeypatch.setattr(settings, 'ANALYZE_RULES', False)
+    config_elements, rule_source, _ = main.prepare(configs=[str(config_file)], save=False)
+    assert set(config_elements['object_network']) == {'web'}
+    rules = list(rule_source())
+    assert len(rules) == 1 and rules[0]['destinationNetworks']['objects'] == [{'name': 'web'}]
@@ -0,0 +1,58 @@
+import json
+import pickle
+
+import pytest
+
+import model
+
+
+def test_items_in_fmc_shape_are_sent_as_they_are():
+    item = {'name': 'h1', 'type': 'Host', 'value': '10.0.0.1', 'description': 'web'}
+    assert model.Host.payload(item) is item
+
+
+def test_other_items_are_reduced_to_the_model_fields():
+    item = {'name': 'TCP_443', 'type': 'ProtocolPortObject', 'protocol': 'TCP', 'port': '443', 'direction': 'destination'}
+    assert model.ProtocolPortObject.payload(item) == {'name': 'TCP_443', 'type': 'ProtocolPortObject', 'protocol': 'TCP',
+                                                      'port': '443'}
+    # exports of older parses use the parser's type names
+    assert model.Host.payload({'name': 'h1', 'type': 'host', 'value': '10.0.0.1'})['type'] == 'Host'
+    assert 'direction' in item
+
+
+def test_fqdn_resolution_defaults_to_ipv4():
+    item = {'name': 'f1', 'type': 'FQDN', 'value': 'example.com'}
+    assert model.NetworkObjectFQDN.payload(item)['dnsResolution'] == 'IPV4_ONLY'
+    assert 'dnsResolution' not in item
+
+
+def test_dump_many_is_compact_json():
+    payloads = [{'name': 'h1', 'type': 'Host', 'value': '10.0.0.1'}, {'name': 'é', 'type': 'Host', 'value': '::1'}]
+    data = model.dump_many(iter(payloads))
+    assert json.loads(data) == payloads
+    assert b' ' not in data and 'é'.encode() in data
+
+
+def test_payloads_match_payload():
+    items = [{'name': 'h1', 'type': 'Host', 'value': '10.0.0.1'}, {'name': 'h2', 'type': 'host', 'value': '10.0.0.2'}]
+    assert model.Host.payloads(items) == [model.Host.payload(item) for item in items]
+    assert model.Host.payloads(items)[0] is items[0]
+    fqdns = [{'name': 'f1', 'type': 'FQDN', 'value': 'example.com'}]
+    assert model.NetworkObjectFQDN.payloads(fqdns)[0]['dnsResolution'] == 'IPV4_ONLY'
+
+
+def test_records_behave_like_the_dicts_they_replace():
+    record = model.NetworkObject(name='h1')
+    record['type'] = 'Host'
+    record['value'] = '10.0.0.1'
+    record['id'] = 'abc'
+    assert record == {'name': 'h1', 'type': 'Host', 'value': '10.0.0.1', 'id': 'abc'}
+    assert 'description' not in record and record.get('description') is None
+    with pytest.raises(KeyError):
+        record['description']
+    del record['id']
+    assert len(record) == 3 and not hasattr(record, '__dict__')
+    assert pickle.loads(pickle.dumps(record)) == record
+    assert model.Host.payload(record) is record
+    assert json.loads(model.dump_many([record, model.Literal(type='Host', value='10.0.0.2')])) == [
+        {'name': 'h1', 'type': 'Host', 'value': '10.0.0.1'}, {'type': 'Host', 'value': '10.0.0.2'}]
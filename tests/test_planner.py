@@ -0,0 +1,9 @@
+import json
+
+import planner
+
+
+def test_report_directory_is_created(tmp_path):
+    file_name = tmp_path / 'log' / 'plan.json'
+    planner.save({'calls': {'total': 0}}, str(file_name))
+    assert json.loads(file_name.read_text()) == {'calls': {'total': 0}}
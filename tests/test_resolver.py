@@ -0,0 +1,53 @@
+import time
+
+import pytest
+
+from conftest import group
+import resolver
+
+
+def test_nested_members_are_resolved_and_shared():
+    groups = {
+        'inner': group('inner', objects=['h1'], literals=['10.0.0.1']),
+        'wrapper': group('wrapper', groups=['inner']),
+        'outer': group('outer', objects=['h2'], groups=['wrapper', 'inner']),
+    }
+    group_resolver = resolver.GroupResolver(groups)
+    outer = group_resolver.resolve('outer')
+    assert outer.objects == {'h1', 'h2'}
+    assert outer.literals == {('Host', '10.0.0.1')}
+    assert group_resolver.resolve('wrapper') is group_resolver.resolve('inner')
+    assert outer.children[0] is group_resolver.resolve('inner')
+    assert len(outer) == 3
+
+
+def test_long_chains_resolve_in_linear_time():
+    depth = 3000
+    groups = {f'g{i}': group(f'g{i}', objects=[f'h{i}'], groups=[f'g{i - 1}'] if i else []) for i in range(depth)}
+    group_resolver = resolver.GroupResolver(groups)
+    start = time.perf_counter()
+    # the top first, nothing below it resolved yet
+    assert len(group_resolver.resolve(f'g{depth - 1}').objects) == depth
+    assert time.perf_counter() - start < 1
+    assert len(group_resolver.resolved) == depth
+    # one own member per level, nothing copied from the children
+    assert all(len(members.own_objects) == 1 for members in group_resolver.resolved.values())
+
+
+def test_cycles_and_missing_groups_are_reported():
+    groups = {'a': group('a', groups=['b']), 'b': group('b', groups=['a']), 'c': group('c', groups=['missing'])}
+    with pytest.raises(resolver.ResolveError):
+        resolver.GroupResolver(groups).resolve('a')
+    with pytest.raises(resolver.ResolveError):
+        resolver.GroupResolver(groups).resolve('c')
+
+
+def test_flatten_rewrites_nested_groups():
+    groups = {
+        'inner': group('inner', objects=['h1'], literals=['10.0.0.1']),
+        'outer': group('outer', objects=['h2'], groups=['inner']),
+    }
+    assert resolver.GroupResolver(groups).flatten() == 1
+    assert groups['outer']['objects'] == [{'name': 'h1'}, {'name': 'h2'}]
+    assert groups['outer']['literals'] == [{'type': 'Host', 'value': '10.0.0.1'}]
+    assert groups['inner']['objects'] == [{'name': 'h1'}]
@@ -0,0 +1,51 @@
+import pytest
+
+from conftest import config, group
+import scheduler
+
+
+def layer_names(layers: list) -> list:
+    return [sorted(node.name for node in layer) for layer in layers]
+
+
+def test_nested_groups_come_after_their_members():
+    graph = scheduler.DeploymentGraph.from_config(config(
+        objects=['h1', 'h2'],
+        groups=[group('outer', objects=['h2'], groups=['inner']), group('inner', objects=['h1']),
+                group('top', groups=['outer'])],
+    ))
+    assert layer_names(graph.layers()) == [['h1', 'h2'], ['inner'], ['outer'], ['top']]
+
+
+def test_service_groups_depend_on_service_objects_only():
+    service_group = {'name': 'web', 'type': 'PortObjectGroup', 'objects': [{'name': 'https'}]}
+    graph = scheduler.DeploymentGraph.from_config(config(
+        objects=['https'], services=['https'], service_groups=[service_group]))
+    web = graph.nodes['service-group', 'web']
+    assert web.deps == {('service', 'https')}
+
+
+def test_members_already_on_fmc_or_missing_add_no_dependency():
+    outer = group('outer', objects=['fmc-host', 'undefined'])
+    outer['objects'][0]['id'] = 'id-1'
+    graph = scheduler.DeploymentGraph.from_config(config(groups=[outer]))
+    assert graph.nodes['object-group', 'outer'].deps == set()
+    assert layer_names(graph.layers()) == [['outer']]
+
+
+def test_cycle_is_reported():
+    graph = scheduler.DeploymentGraph.from_config(config(
+        objects=['h1'], groups=[group('a', groups=['b']), group('b', groups=['c']), group('c', groups=['a']),
+                               group('ok', objects=['h1'])]))
+    with pytest.raises(scheduler.CycleError, match='a, b, c'):
+        graph.layers()
+
+
+def test_run_deploys_layer_by_layer():
+    graph = scheduler.DeploymentGraph.from_config(config(
+        objects=['h1'], groups=[group('outer', groups=['inner']), group('inner', objects=['h1'])]))
+    calls = []
+    handlers = {kind: (lambda items, kind=kind: calls.append((kind, [item['name'] for item in items])))
+                for kind in ('object', 'object-group')}
+    scheduler.run(graph, handlers)
+    assert calls == [('object', ['h1']), ('object-group', ['inner']), ('object-group', ['outer'])]
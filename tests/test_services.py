@@ -0,0 +1,40 @@
+from conftest import service_group
+import services
+
+
+def test_groups_map_to_port_object_groups():
+    config_elements = {
+        'object_service': {'https': {'protocol': '6', 'type': 'PortLiteral', 'direction': 'destination', 'port': '443'}},
+        'object-group_service': {'web': service_group([{'protocol': '6', 'type': 'PortLiteral', 'port': '443'},
+                                                       {'protocol': '17', 'type': 'PortLiteral', 'port': '53'}])},
+    }
+    services.ServiceMapper().run(config_elements)
+    assert config_elements['object-group_service']['web']['objects'] == [{'name': 'https'}, {'name': 'UDP_53'}]
+    assert config_elements['object_service']['UDP_53'] == {'name': 'UDP_53', 'type': 'ProtocolPortObject',
+                                                           'protocol': 'UDP', 'port': '53'}
+
+
+def test_groups_flagged_by_the_parser_are_not_uploaded():
+    tcp = {'protocol': '6', 'type': 'PortLiteral', 'port': '443'}
+    config_elements = {
+        'object_service': {},
+        'object-group_service': {
+            'flagged': {**service_group([tcp]), 'unsupported': 'source and destination ports'},
+        },
+    }
+    services.ServiceMapper().run(config_elements)
+    assert config_elements['object-group_service'] == {}
+
+
+def test_icmp6_maps_to_icmpv6_objects():
+    config_elements = {
+        'object_service': {'ping6': {'protocol': '58', 'type': 'ICMPv6PortLiteral', 'icmpType': '128'}},
+        'object-group_service': {
+            'nd': service_group([{'protocol': '58', 'type': 'ICMPv6PortLiteral', 'icmpType': '135'}]),
+        },
+    }
+    services.ServiceMapper().run(config_elements)
+    assert config_elements['object_service'] == {
+        'ping6': {'name': 'ping6', 'type': 'ICMPV6Object', 'icmpType': '128'},
+        'ICMP6_135': {'name': 'ICMP6_135', 'type': 'ICMPV6Object', 'icmpType': '135'},
+    }
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+import asa_api
+import model
+import stream
+
+CONFIG = '''
+object network web
+ host 10.0.0.1
+object network web-copy
+ host 10.0.0.1
+object network db
+ host 10.0.0.2
+object-group network servers
+ network-object object web
+ network-object 10.1.0.0 255.255.0.0
+object service https
+ service tcp destination eq 443
+access-list in extended permit tcp any object web-copy eq 443
+access-list in extended permit ip object-group servers host 10.0.0.2
+access-list other extended deny ip any any
+access-group in in interface outside
+access-group other in interface inside
+'''
+
+
+@pytest.fixture
+def exported(tmp_path):
+    config_file = tmp_path / 'asa.cfg'
+    config_file.write_text(CONFIG)
+    asa = asa_api.Asa(str(config_file), use_cache=False)
+    asa.read()
+    asa.parse()
+    file_name = str(tmp_path / 'export.ndjson')
+    asa.export(file_name)
+    return asa, file_name
+
+
+def test_sections_and_rules_round_trip(exported):
+    asa, file_name = exported
+    config_elements = stream.load_sections(file_name)
+    for section in stream.SECTIONS:
+        assert config_elements[section] == json.loads(json.dumps(asa.config_elements.get(section, {}), default=model.plain))
+    assert set(config_elements['object_network']) == {'web', 'web-copy', 'db'}
+    rules = list(stream.access_rules(file_name))
+    assert len(rules) == 3 and rules == json.loads(json.dumps(list(asa.access_rules())))
+
+
+def test_access_rules_are_filtered_and_follow_the_aliases(exported):
+    _, file_name = exported
+    rules = list(stream.access_rules(file_name, acl_names=['in'], aliases={'web-copy': 'web'}))
+    assert [rule['acl'] for rule in rules] == ['in', 'in']
+    assert rules[0]['destinationNetworks']['objects'][0]['name'] == 'web'
+
+
+def test_other_formats_and_versions_are_rejected(tmp_path):
+    file_name = tmp_path / 'export.ndjson'
+    file_name.write_text(json.dumps({'format': stream.FORMAT, 'version': stream.VERSION - 1}) + '\n')
+    with pytest.raises(stream.StreamError, match='version'):
+        stream.load_sections(str(file_name))
+    header = {'format': stream.FORMAT, 'version': stream.VERSION, 'parser_version': '1'}
+    file_name.write_text(json.dumps(header) + '\n')
+    with pytest.raises(stream.StreamError, match='re-run parse'):
+        list(stream.access_rules(str(file_name)))
+    file_name.write_text('{"object_network": {}}\n')
+    with pytest.raises(stream.StreamError, match='not an'):
+        list(stream.access_rules(str(file_name)))
@@ -0,0 +1,80 @@
+from conftest import host
+import journal
+import sync
+
+
+def run(fmc, items: list, ownership: journal.Ownership, delete=False) -> sync.Sync:
+    fmc.prefetch()
+    syncer = sync.Sync(fmc, delete=delete, ownership=ownership)
+    fmc.journal = journal.Journal(file_name=f'{ownership.file_name}.jsonl')
+    fmc.journal.open()
+    syncer.sync(items, item_type='object')
+    fmc.journal.close()
+    ownership.add(fmc.journal.created)
+    syncer.remove_stale()
+    return syncer
+
+
+def test_delete_removes_only_stale_objects_created_by_the_tool(fmc, mock_fmc, tmp_path):
+    mock_fmc._create('hosts', {'name': 'foreign', 'value': '10.9.9.9'})
+    ownership = journal.Ownership(file_name=str(tmp_path / 'owned.json'))
+    run(fmc, [host('web', '10.0.0.1'), host('db', '10.0.0.2'), host('old', '10.0.0.3')], ownership)
+    assert set(ownership.objects['network']) == {'web', 'db', 'old'}
+
+    # someone else recreates db under the same name
+    mock_fmc.objects.pop(mock_fmc.names['network'].pop('db'))
+    mock_fmc._create('hosts', {'name': 'db', 'value': '10.0.0.2'})
+
+    syncer = run(fmc, [host('web', '10.0.0.1')], journal.Ownership(file_name=ownership.file_name), delete=True)
+    assert set(mock_fmc.names['network']) == {'web', 'db', 'foreign'}
+    assert syncer.stats['deleted'] == 1 and syncer.stats['unchanged'] == 1
+    assert set(journal.Ownership(file_name=ownership.file_name).objects['network']) == {'web', 'db'}
+
+
+def test_delete_removes_a_network_and_a_port_object_of_the_same_name(fmc, mock_fmc, tmp_path):
+    ownership = journal.Ownership(file_name=str(tmp_path / 'owned.json'))
+    dns_port = {'name': 'DNS', 'type': 'ProtocolPortObject', 'protocol': 'UDP', 'port': '53'}
+    run(fmc, [host('DNS', '10.0.0.53'), dns_port, host('web', '10.0.0.1')], ownership)
+    assert ownership.owns('port', 'DNS', mock_fmc.names['port']['DNS'])
+
+    syncer = run(fmc, [host('web', '10.0.0.1')], journal.Ownership(file_name=ownership.file_name), delete=True)
+    assert syncer.stats['deleted'] == 2
+    assert set(mock_fmc.names['network']) == {'web'} and not mock_fmc.names['port']
+
+
+def test_delete_without_ownership_record_deletes_nothing(fmc, mock_fmc):
+    mock_fmc._create('hosts', {'name': 'foreign', 'value': '10.9.9.9'})
+    fmc.prefetch()
+    syncer = sync.Sync(fmc, delete=True)
+    syncer.sync([host('web', '10.0.0.1')], item_type='object')
+    syncer.remove_stale()
+    assert set(mock_fmc.names['network']) == {'web', 'foreign'}
+    assert syncer.stats['deleted'] == 0
+
+
+def test_diff_does_not_take_a_port_object_for_a_host(fmc, mock_fmc):
+    mock_fmc._create('protocolportobjects', {'name': 'DNS', 'protocol': 'UDP', 'port': '53'})
+    fmc.prefetch()
+    plan = sync.diff([host('DNS', '10.0.0.53')], fmc.index)
+    assert len(plan.create) == 1 and not plan.update
+
+
+def test_changed_value_is_updated_in_place(fmc, mock_fmc, tmp_path, monkeypatch):
+    ownership = journal.Ownership(file_name=str(tmp_path / 'owned.json'))
+    run(fmc, [host('web', '10.0.0.1'), host('db', '10.0.0.2')], ownership)
+    web_id = mock_fmc.names['network']['web']
+
+    requests = []
+    request = fmc._request
+
+    def recording_request(method: str, url: str, **kwargs):
+        requests.append((method, url))
+        return request(method, url, **kwargs)
+
+    monkeypatch.setattr(fmc, '_request', recording_request)
+    syncer = run(fmc, [host('web', '10.0.0.9'), host('db', '10.0.0.2')], journal.Ownership(file_name=ownership.file_name))
+    puts = [url for method, url in requests if method == 'PUT']
+    assert len(puts) == 1 and puts[0].endswith(f'/{web_id}')
+    assert syncer.stats['updated'] == 1 and syncer.stats['unchanged'] == 1 and syncer.stats['created'] == 0
+    assert mock_fmc.names['network']['web'] == web_id
+    assert mock_fmc.objects[web_id][1]['value'] == '10.0.0.9'